@@ -1,35 +1,154 @@
+from math import ceil
+
 from django.contrib import admin
-from .models import Task, SubTask, Category, Priority, Note
-class SubTaskInline(admin.TabularInline):
+from django.forms.models import BaseInlineFormSet
+from . import refdata
+from .models import Task, SubTask, Category, Priority, Note, DeletionJob
+from .pagination import EstimatedCountPaginator
+from .search import search_tasks, search_subtasks, search_notes
+
+
+class ReferenceFieldListFilter(admin.RelatedFieldListFilter):
+    """Related filter whose choices come from the reference data cache"""
+
+    def field_choices(self, field, request, model_admin):
+        return [(obj.pk, str(obj)) for obj in refdata.get_objects(field.related_model)]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with many rows: estimated totals for the
+    unfiltered list (see pagination.EstimatedCountPaginator), no second
+    COUNT(*) of the whole table next to a filtered one, and search through
+    the full-text indexes of hangarin.search instead of ``icontains`` scans.
+    ``search_fields`` only turns the search box (and autocomplete) on.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_function = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if self.search_function is None or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return self.search_function(queryset, search_term), False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """
+    Inline formset holding one page of the related rows instead of all of
+    them; the page is chosen by ``?<prefix>_page=`` on the change view.
+    """
+    per_page = 20
+    page_number = 1
+    # Parent field storing the number of related rows (see hangarin.progress)
+    count_field = None
+    query = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            queryset = super().get_queryset()
+            start = (self.page_number - 1) * self.per_page
+            self._queryset = queryset[start:start + self.per_page]
+        return self._queryset
+
+    @property
+    def page_parameter(self):
+        return f'{self.prefix}_page'
+
+    @property
+    def total(self):
+        if self.instance.pk is None:
+            return 0
+        if self.count_field:
+            return getattr(self.instance, self.count_field)
+        return self.queryset.count()
+
+    @property
+    def num_pages(self):
+        return max(1, ceil(self.total / self.per_page))
+
+    def page_url(self, number):
+        query = self.query.copy()
+        query[self.page_parameter] = number
+        return f'?{query.urlencode()}'
+
+    def previous_url(self):
+        return self.page_url(self.page_number - 1) if self.page_number > 1 else None
+
+    def next_url(self):
+        return self.page_url(self.page_number + 1) if self.page_number < self.num_pages else None
+
+
+class PaginatedInline:
+    """Inline showing ``per_page`` related rows at a time, with page links below"""
+    formset = PaginatedInlineFormSet
+    template = 'admin/hangarin/paginated_inline.html'
+    base_template = None
+    per_page = 20
+    count_field = None
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        try:
+            page_number = max(1, int(request.GET.get(f'{formset.get_default_prefix()}_page', 1)))
+        except ValueError:
+            page_number = 1
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_number': page_number,
+            'count_field': self.count_field,
+            'query': request.GET,
+        })
+
+
+class SubTaskInline(PaginatedInline, admin.TabularInline):
     model = SubTask
     extra = 1
     fields = ("title", "status")
     show_change_link = True
-class NoteInline(admin.StackedInline):
+    base_template = "admin/edit_inline/tabular.html"
+    count_field = "subtask_count"
+
+
+class NoteInline(PaginatedInline, admin.StackedInline):
     model = Note
     extra = 1
     fields = ("content", "created_at")
     readonly_fields = ("created_at",)
+    base_template = "admin/edit_inline/stacked.html"
+    per_page = 10
+    count_field = "note_count"
+
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
-    list_display = ("title", "status", "deadline", "priority", "category")
-    list_filter = ("status", "priority", "category")
-    search_fields = ("title", "description")
+class TaskAdmin(LargeTableAdmin):
+    list_display = ("title", "status", "deadline", "priority", "category", "subtask_count", "note_count")
+    list_filter = (
+        "status",
+        ("priority", ReferenceFieldListFilter),
+        ("category", ReferenceFieldListFilter),
+    )
+    list_select_related = ("priority", "category")
+    search_fields = ("title",)
+    search_function = staticmethod(search_tasks)
     ordering = ("-created_at",)
 
     inlines = [SubTaskInline, NoteInline]
 
+
 @admin.register(SubTask)
-class SubTaskAdmin(admin.ModelAdmin):
+class SubTaskAdmin(LargeTableAdmin):
     list_display = ("title", "status", "parent_task_name")
     list_filter = ("status",)
+    list_select_related = ("parent_task",)
     search_fields = ("title",)
+    search_function = staticmethod(search_subtasks)
+    autocomplete_fields = ("parent_task",)
+    ordering = ("-created_at",)
 
+    @admin.display(description="Parent Task", ordering="parent_task__title")
     def parent_task_name(self, obj):
         return obj.parent_task.title
-    parent_task_name.admin_order_field = "task__title"
-    parent_task_name.short_description = "Parent Task"
 
 
 @admin.register(Category)
@@ -45,10 +164,23 @@ class PriorityAdmin(admin.ModelAdmin):
 
 
 @admin.register(Note)
-class NoteAdmin(admin.ModelAdmin):
+class NoteAdmin(LargeTableAdmin):
     list_display = ("task", "content", "created_at")
     list_filter = ("created_at",)
+    list_select_related = ("task",)
     search_fields = ("content",)
+    search_function = staticmethod(search_notes)
+    autocomplete_fields = ("task",)
     ordering = ("-created_at",)
 
 
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ("object_repr", "model_label", "status", "percent_done", "total_tasks", "created_at", "finished_at")
+    list_filter = ("status",)
+    readonly_fields = ("model_label", "object_id", "object_repr", "total_tasks", "deleted_tasks", "error", "finished_at")
+    ordering = ("-created_at",)
+
+    def has_add_permission(self, request):
+        # Jobs are scheduled by the delete views
+        return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class HangarinConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hangarin'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from hangarin import checks, signals  # checks registers itself
+
+        post_migrate.connect(signals.reinstall_search_indexes, sender=self)
@@ -0,0 +1,184 @@
+"""
+Hangarin Task Management System - Archive of completed tasks
+
+Completed tasks nobody has touched for ``HANGARIN_ARCHIVE_AFTER_DAYS`` days
+are moved out of the live tables by ``manage.py archive_tasks``, meant to
+run from cron. Each batch is one transaction: the tasks are copied into
+ArchivedTask under their own ids, with their subtasks and notes embedded as
+JSON, the per category, priority and status ArchiveTotal rows are
+incremented, and the live rows are deleted set-based (see hangarin.deletion;
+the FTS triggers drop them from the search index).
+
+The live pages keep reading ``hangarin_task`` alone, so its indexes, its
+search index and the list probes stay the size of the working set. The task
+list adds the archive on request (``?archived=include``) through a UNION ALL
+of the two tables, or lists it alone (``?archived=only``), see
+with_archived(); search falls back to
+``icontains`` over the archive, which has no full-text index. A link to the
+detail page of an archived task redirects to its archived copy. The
+dashboard counters fold in the ArchiveTotal rows (a handful, not one per
+task) instead of counting the archive, see hangarin.stats.
+"""
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, F, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from hangarin import refdata, versions
+from hangarin.deletion import delete_rows
+from hangarin.models import Task, SubTask, Note, ArchivedTask, ArchiveTotal
+
+
+# ``?archived=`` values of the task list
+ARCHIVE_CHOICES = ('include', 'only')
+
+# Model -> (field pointing at the task, columns kept in the archive)
+ARCHIVED_CHILDREN = {
+    SubTask: ('parent_task_id', ('id', 'title', 'status', 'created_at', 'updated_at')),
+    Note: ('task_id', ('id', 'content', 'created_at', 'updated_at')),
+}
+
+# Live-only columns: only live tasks are archived (see hangarin.trash)
+LIVE_ONLY_COLUMNS = ('deleted_at',)
+
+# Task columns copied as they are (ArchivedTask has the same ones)
+TASK_COLUMNS = [field.attname for field in Task._meta.concrete_fields if field.attname not in LIVE_ONLY_COLUMNS]
+
+# Archive-only columns, left out of the UNION with the live table
+ARCHIVE_ONLY_COLUMNS = ('archived_at', 'subtasks', 'notes')
+
+
+@dataclass
+class ArchiveResult:
+    tasks: int = 0
+    subtasks: int = 0
+    notes: int = 0
+    seconds: float = 0.0
+
+
+def _batch_size(batch_size):
+    return batch_size or getattr(settings, 'HANGARIN_ARCHIVE_BATCH_SIZE', 500)
+
+
+def archivable(days=None, now=None):
+    """Completed tasks not updated for ``days`` days (``HANGARIN_ARCHIVE_AFTER_DAYS``)"""
+    if days is None:
+        days = getattr(settings, 'HANGARIN_ARCHIVE_AFTER_DAYS', 90)
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    # Served by task_status_updated_idx
+    return Task.objects.filter(status='Completed', updated_at__lt=cutoff)
+
+
+def _children(model, task_ids, using):
+    """Task id -> archived rows of ``model``, oldest first"""
+    task_field, columns = ARCHIVED_CHILDREN[model]
+    rows = {}
+    for row in model.objects.using(using).filter(**{f'{task_field}__in': task_ids}).order_by('id').values(task_field, *columns):
+        rows.setdefault(row.pop(task_field), []).append(row)
+    return rows
+
+
+def _add_totals(counts, using):
+    for (category_id, priority_id, status), count in counts.items():
+        totals = ArchiveTotal.objects.using(using).filter(category_id=category_id, priority_id=priority_id, status=status)
+        if not totals.update(count=F('count') + count):
+            ArchiveTotal.objects.using(using).create(
+                category_id=category_id, priority_id=priority_id, status=status, count=count,
+            )
+
+
+def archive_batch(queryset, batch_size, result):
+    """Move the first ``batch_size`` tasks of ``queryset`` to the archive; return how many moved"""
+    using = queryset.db
+    with transaction.atomic(using=using):
+        # Read inside the transaction: a task changed meanwhile is not archived stale
+        tasks = list(queryset.select_for_update().order_by('pk')[:batch_size])
+        if not tasks:
+            return 0
+        task_ids = [task.pk for task in tasks]
+        subtasks = _children(SubTask, task_ids, using)
+        notes = _children(Note, task_ids, using)
+        now = timezone.now()
+        ArchivedTask.objects.using(using).bulk_create([
+            ArchivedTask(
+                **{column: getattr(task, column) for column in TASK_COLUMNS},
+                archived_at=now,
+                subtasks=subtasks.get(task.pk, []),
+                notes=notes.get(task.pk, []),
+            )
+            for task in tasks
+        ])
+        _add_totals(Counter((task.category_id, task.priority_id, task.status) for task in tasks), using)
+
+        moved = {}
+        for model, rows in ((SubTask, subtasks), (Note, notes)):
+            moved[model] = sum(len(task_rows) for task_rows in rows.values())
+            # Soft-deleted ones too (see hangarin.trash): they are not archived
+            task_field = ARCHIVED_CHILDREN[model][0]
+            ids = list(model.all_objects.using(using).filter(**{f'{task_field}__in': task_ids}).values_list('pk', flat=True))
+            # Bounded IN lists, as in hangarin.deletion
+            for start in range(0, len(ids), batch_size):
+                delete_rows(model, ids[start:start + batch_size], using)
+        # Also invalidates the dashboard counters, which fold in ArchiveTotal
+        delete_rows(Task, task_ids, using)
+        versions.changed(ArchivedTask, using=using)
+    result.tasks += len(tasks)
+    result.subtasks += moved[SubTask]
+    result.notes += moved[Note]
+    return len(tasks)
+
+
+def archive_tasks(queryset, batch_size=None, progress=None):
+    """
+    Move the tasks of ``queryset`` with their subtasks and notes to the
+    archive, ``batch_size`` tasks per transaction, and return an
+    ArchiveResult. ``progress`` is called with it after every batch.
+    """
+    batch_size = _batch_size(batch_size)
+    result = ArchiveResult()
+    start = time.perf_counter()
+    while archive_batch(queryset, batch_size, result):
+        result.seconds = time.perf_counter() - start
+        if progress:
+            progress(result)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def with_archived(tasks, archived, only=False):
+    """
+    One queryset of the live ``tasks`` and the ArchivedTask rows of
+    ``archived``, or of the latter alone with ``only``; every row has an
+    ``archived`` flag. Both must be filtered already: a UNION can only be
+    ordered and sliced. Categories and priorities are not joined, see
+    load_references().
+    """
+    archived = archived.defer(*ARCHIVE_ONLY_COLUMNS).annotate(archived=Value(True, BooleanField()))
+    if only:
+        return archived
+    tasks = tasks.select_related(None).defer(*LIVE_ONLY_COLUMNS).annotate(archived=Value(False, BooleanField()))
+    return tasks.union(archived, all=True)
+
+
+def load_references(tasks):
+    """Set the category and priority of rows from with_archived() from the reference data cache"""
+    categories = {category.pk: category for category in refdata.categories()}
+    priorities = {priority.pk: priority for priority in refdata.priorities()}
+    for task in tasks:
+        task.category = categories.get(task.category_id)
+        task.priority = priorities.get(task.priority_id)
+    return tasks
+
+
+def archived_rows(rows):
+    """Subtasks or notes of an ArchivedTask with their timestamps parsed back from JSON"""
+    return [
+        {**row, 'created_at': parse_datetime(row['created_at']), 'updated_at': parse_datetime(row['updated_at'])}
+        for row in rows
+    ]
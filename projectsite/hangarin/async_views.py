@@ -0,0 +1,157 @@
+"""
+Hangarin Task Management System - Async read path
+
+Under ASGI the most visited pages (the dashboard, the task list and the task
+detail) are served by the async views below. Their queries go through the
+async ORM (``acount()``, ``aaggregate()``, ``aget()``, ``async for``), and
+the independent ones are awaited together with ``asyncio.gather()``, so a
+worker keeps serving other requests while these wait on the database. Cache
+lookups, URL reversing and the page context are otherwise those of the sync
+views in hangarin.views; templates still render in a worker thread.
+
+AsyncURLConfMiddleware sends requests to ``settings.HANGARIN_ASYNC_URLCONF``
+only when the middleware stack runs async, i.e. under ASGI; under WSGI it
+removes itself and the sync views keep serving every route.
+"""
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.utils.translation import gettext as _
+
+from hangarin import refdata, stats, views
+from hangarin.conditional import aconditional_response, afreshness
+from hangarin.models import ArchivedTask
+
+
+class AsyncURLConfMiddleware:
+    """Resolve ASGI requests against ``settings.HANGARIN_ASYNC_URLCONF``"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        # Only an async stack gets an async get_response: under WSGI the
+        # async views would each run in an event loop of their own
+        if not iscoroutinefunction(get_response) or not getattr(settings, 'HANGARIN_ASYNC_URLCONF', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        markcoroutinefunction(self)
+
+    async def __call__(self, request):
+        request.urlconf = settings.HANGARIN_ASYNC_URLCONF
+        return await self.get_response(request)
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """LoginRequiredMixin for views whose handlers are coroutines"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Loaded once without blocking; sync code further down (templates,
+        # ETags) then reads it without touching the database
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+@login_required
+async def home(request):
+    """Dashboard home view"""
+    request.user = await request.auser()
+    # Independent reads: the cached counters (rebuilt by one grouped query
+    # on a miss) and the reference data (reloaded after a change)
+    counters, categories, priorities = await asyncio.gather(
+        sync_to_async(stats.get_counters)(),
+        sync_to_async(refdata.categories)(),
+        sync_to_async(refdata.priorities)(),
+    )
+    context = stats.build_dashboard_stats(counters, categories, priorities)
+    dashboard = dict(context)
+    context.update({
+        'categories': categories,
+        'priorities': priorities,
+    })
+
+    async def get_state():
+        return (dashboard,), None
+
+    async def render():
+        return TemplateResponse(request, 'home.html', context)
+
+    return await aconditional_response(request, get_state, render)
+
+
+class TaskListView(AsyncLoginRequiredMixin, views.TaskListView):
+    """Display list of all tasks"""
+    # Filled by apaginate_queryset() before the context is built
+    page_result = None
+
+    async def get(self, request, *args, **kwargs):
+        return await aconditional_response(request, self.aget_conditional_state, self.arender)
+
+    async def aget_conditional_state(self):
+        # Building them may probe the connection for full-text search support
+        querysets = await sync_to_async(self.get_probe_querysets)()
+        probes = await asyncio.gather(*(afreshness(queryset) for queryset in querysets))
+        return self.combine_probes(probes)
+
+    async def arender(self):
+        # Filtering may probe the connection for full-text search support
+        self.object_list = await sync_to_async(self.get_queryset)()
+        page_size = self.get_paginate_by(self.object_list)
+        if page_size:
+            self.page_result = await self.apaginate_queryset(self.object_list, page_size)
+        # The rows are fetched; what is left may read the reference data
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.page_result
+
+
+class TaskDetailView(AsyncLoginRequiredMixin, views.TaskDetailView):
+    """Display task details"""
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            return await aconditional_response(request, self.aget_conditional_state, self.arender)
+        except Http404:
+            # Archived since the link was made: the archive keeps the task's id
+            if not await ArchivedTask.objects.filter(pk=self.kwargs['pk']).aexists():
+                raise
+            return redirect('archived-task-detail', pk=self.kwargs['pk'])
+
+    async def aget_object(self):
+        if not hasattr(self, '_object'):
+            queryset = self.get_queryset()
+            try:
+                self._object = await queryset.aget(pk=self.kwargs.get(self.pk_url_kwarg))
+            except queryset.model.DoesNotExist:
+                raise Http404(
+                    _('No %(verbose_name)s found matching the query')
+                    % {'verbose_name': queryset.model._meta.verbose_name}
+                )
+        return self._object
+
+    async def aget_conditional_state(self):
+        try:
+            await self.aget_object()
+        except Http404:
+            return None
+        # get_object() now returns the loaded task
+        return self.get_conditional_state()
+
+    async def arender(self):
+        self.object = await self.aget_object()
+        subtask_page, note_page = await asyncio.gather(
+            views.task_subtask_paginator(self.object.pk).apage(),
+            views.task_note_paginator(self.object.pk).apage(),
+        )
+        context = self.get_context_data(object=self.object, subtask_page=subtask_page, note_page=note_page)
+        return self.render_to_response(context)
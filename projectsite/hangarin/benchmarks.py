@@ -0,0 +1,128 @@
+"""
+Hangarin Task Management System - Benchmark helpers
+
+Shared plumbing for the ``benchmark_*`` management commands: throwaway
+databases so benchmarks never touch real data, quick synthetic rows, and
+latency and memory summaries.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils import timezone
+
+from hangarin import versions
+from hangarin.models import Task, SubTask, Note
+from hangarin.progress import initial_counts
+from hangarin.seeding import ensure_reference_data
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """Run the block against a freshly migrated test database"""
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+def add_sqlite_database(alias, path, **options):
+    """Register a SQLite file as the database ``alias`` (``options`` as in DATABASES)"""
+    connections.settings[alias] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+        alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path), **options},
+    })[alias]
+
+
+def remove_database(alias):
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+def word_list():
+    from faker.providers.lorem.en_US import Provider
+    return Provider.word_list
+
+
+def grow_dataset(size, batch_size=5000, seed=0):
+    """
+    Add synthetic tasks (with one subtask and one note each) until the task
+    table holds ``size`` rows. Text is drawn from the Faker lorem vocabulary
+    without going through Faker itself, which keeps 1M-row datasets quick.
+    """
+    rng = random.Random(seed + Task.objects.count())
+    words = word_list()
+    categories, priorities = ensure_reference_data()
+    statuses = [value for value, _ in Task.STATUS_CHOICES]
+    now = timezone.now()
+
+    def sentence(count):
+        return ' '.join(rng.choices(words, k=count)).capitalize()
+
+    remaining = size - Task.objects.count()
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        tasks = [
+            Task(
+                title=sentence(5),
+                description=sentence(20),
+                status=rng.choice(statuses),
+                deadline=now + timezone.timedelta(days=rng.randint(-365, 365)),
+                category=rng.choice(categories),
+                priority=rng.choice(priorities),
+            )
+            for _ in range(batch)
+        ]
+        subtasks = [SubTask(title=sentence(4), status=rng.choice(statuses)) for _ in tasks]
+        for task, subtask in zip(tasks, subtasks):
+            for name, value in initial_counts([subtask.status], 1).items():
+                setattr(task, name, value)
+        tasks = Task.objects.bulk_create(tasks)
+        for task, subtask in zip(tasks, subtasks):
+            subtask.parent_task = task
+        SubTask.objects.bulk_create(subtasks)
+        Note.objects.bulk_create([Note(task=task, content=sentence(15)) for task in tasks])
+        remaining -= batch
+    versions.changed(Task, SubTask, Note)
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return the latencies in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'min_ms': round(min(samples), 3),
+    }
+
+
+def peak_memory(func):
+    """Call ``func`` once under tracemalloc and return its peak allocation in KiB"""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,58 @@
+"""
+Hangarin Task Management System - Bulk actions
+
+Mass status, category and priority changes and deletions, applied to a
+whole queryset at once: an update is a single ``UPDATE`` statement and a
+delete a single collector pass, instead of one request (and a handful of
+queries) per row. Tasks, subtasks and notes are only marked deleted, a task
+with its subtasks and notes, and can be restored with bulk_restore() until
+they are purged (see hangarin.trash). ``QuerySet.update()`` does not run
+``auto_now``, so ``updated_at`` is set explicitly. Task signals are suspended for the
+operation and the dashboard counters invalidated once (see
+stats.deferred_updates); the versions of the changed models are likewise
+bumped once (see hangarin.versions). Changes to subtasks and notes recount
+the progress counters of their tasks once, at the end (see
+progress.deferred_updates).
+"""
+from contextlib import nullcontext
+
+from django.apps import apps
+from django.db import transaction
+from django.utils import timezone
+
+from hangarin import progress, stats, versions
+from hangarin.models import Task, SoftDeleteModel
+from hangarin.trash import restore_rows, soft_delete_rows
+
+
+def _deferred(queryset):
+    if queryset.model is Task:
+        return stats.deferred_updates(queryset.db)
+    if queryset.model in progress.TASK_FIELDS:
+        return progress.deferred_updates(queryset)
+    return nullcontext()
+
+
+def bulk_update(queryset, **changes):
+    """Apply ``changes`` to every row of ``queryset``; return the number of rows"""
+    with transaction.atomic(using=queryset.db), _deferred(queryset):
+        updated = queryset.update(updated_at=timezone.now(), **changes)
+        versions.changed(queryset.model, using=queryset.db)
+    return updated
+
+
+def bulk_delete(queryset):
+    """Delete every row of ``queryset``; return the deleted (or marked) counts per model label"""
+    if issubclass(queryset.model, SoftDeleteModel):
+        with _deferred(queryset):
+            return soft_delete_rows(queryset)
+    with transaction.atomic(using=queryset.db), _deferred(queryset):
+        _, counts = queryset.delete()
+        versions.changed(*[apps.get_model(label) for label in counts], using=queryset.db)
+    return counts
+
+
+def bulk_restore(queryset):
+    """Restore the rows of ``queryset`` marked by bulk_delete(); return the counts per model label"""
+    with _deferred(queryset):
+        return restore_rows(queryset)
@@ -0,0 +1,29 @@
+"""
+Hangarin Task Management System - System checks
+"""
+from django.conf import settings
+from django.core import checks
+
+
+# Backends whose entries live in the memory of one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """The model versions and dashboard counters must be shared by every worker"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Warning(
+        f"The 'default' cache ({backend}) is private to each process.",
+        hint=(
+            'Model versions and dashboard counters changed by one worker stay stale in the others. '
+            'Set HANGARIN_REDIS_URL, or point CACHES["default"] at another shared backend '
+            '(Memcached, the database cache), unless a single process serves the site.'
+        ),
+        id='hangarin.W001',
+    )]
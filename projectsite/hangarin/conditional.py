@@ -0,0 +1,147 @@
+"""
+Hangarin Task Management System - Conditional GET
+
+Pages answer ``If-None-Match`` with 304 Not Modified when nothing they show
+has changed, without running the page queries or rendering the template.
+Each view describes its content with a cheap probe: a COUNT and
+MAX(updated_at) over the rows it lists, scoped to the current filters (the
+count catches deletions, which leave no timestamp behind). The probe is
+hashed into the ETag together with everything else that shows on the page:
+the URL with its query string, the user, the CSRF secret behind the
+tokens of the page's forms, the reference data versions and
+``HANGARIN_ETAG_SALT``.
+
+The probe's timestamp is sent as Last-Modified for information, but only the
+ETag decides a 304: a deletion does not move MAX(updated_at), so a request
+carrying If-Modified-Since alone always gets the full page.
+
+afreshness() and aconditional_response() do the same for the async views
+of hangarin.async_views.
+"""
+import asyncio
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from hangarin import refdata
+
+
+def freshness(queryset):
+    """``(count, last modified)`` of a queryset"""
+    queryset = queryset.order_by()
+    # Two queries: COUNT alone is answered from an index and MAX(updated_at)
+    # alone from task_updated_idx, but together they scan the table rows
+    return queryset.count(), queryset.aggregate(last_modified=Max('updated_at'))['last_modified']
+
+
+async def afreshness(queryset):
+    """freshness() through the async ORM, both queries in flight at once"""
+    queryset = queryset.order_by()
+    count, aggregate = await asyncio.gather(
+        queryset.acount(),
+        queryset.aaggregate(last_modified=Max('updated_at')),
+    )
+    return count, aggregate['last_modified']
+
+
+def make_etag(request, *parts):
+    """Strong ETag for the page at the requested URL, as seen by this user"""
+    # Pages embed CSRF tokens derived from the secret; a login rotates it,
+    # and a kept page would then post a stale token. get_token() creates
+    # the secret (and its cookie) now if the page would only do so later.
+    get_token(request)
+    parts += (
+        request.get_full_path(),
+        request.user.pk,
+        request.META['CSRF_COOKIE'],
+        refdata.version(),
+        getattr(settings, 'HANGARIN_ETAG_SALT', ''),
+    )
+    return '"%s"' % hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def _applies(request):
+    return getattr(settings, 'HANGARIN_CONDITIONAL_GET', True) and request.method in ('GET', 'HEAD')
+
+
+def _has_messages(request):
+    # Flash messages are shown once: a cached copy would not have them
+    return bool(len(get_messages(request)))
+
+
+def _add_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Browsers keep the page but revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_response(request, get_state, render):
+    """
+    Return 304 if the page described by ``get_state()`` is unchanged, else
+    ``render()`` with ETag and Last-Modified headers.
+
+    ``get_state()`` returns ``(parts, last_modified)``, or None when the page
+    cannot be validated (it is then rendered as usual, e.g. into a 404).
+    """
+    if not _applies(request) or _has_messages(request):
+        return render()
+
+    state = get_state()
+    if state is None:
+        return render()
+    parts, last_modified = state
+    etag = make_etag(request, *parts)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+    return _add_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, get_state, render):
+    """
+    conditional_response() for async views: ``get_state`` and ``render`` are
+    coroutine functions. ``request.user`` must already be loaded.
+    """
+    # The message storage may read the session
+    if not _applies(request) or await sync_to_async(_has_messages)(request):
+        return await render()
+
+    state = await get_state()
+    if state is None:
+        return await render()
+    parts, last_modified = state
+    etag = make_etag(request, *parts)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await render()
+        if response.status_code != 200:
+            return response
+    return _add_validators(response, etag, last_modified)
+
+
+class ConditionalGetMixin:
+    """Serve GET through conditional_response(); views override get_conditional_state()"""
+
+    def get_conditional_state(self):
+        """``(parts, last_modified)`` of the page; None renders it without validators"""
+        return None
+
+    def get(self, request, *args, **kwargs):
+        return conditional_response(
+            request,
+            self.get_conditional_state,
+            lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs),
+        )
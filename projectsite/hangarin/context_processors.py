@@ -0,0 +1,22 @@
+"""
+Hangarin Task Management System - Template context processors
+"""
+from django.conf import settings
+
+from hangarin.routers import reading_from_replica
+from hangarin.versions import ModelVersions
+
+
+def fragment_cache(request):
+    """
+    Model version tokens and the timeout for ``{% cache %}`` fragments, e.g.
+    ``{% cache fragment_cache_timeout name model_versions.task using="fragments" %}``
+
+    Pages read from a replica use stored fragments but store none: their rows
+    may be older than the versions in the key (see hangarin.routers).
+    """
+    timeout = getattr(settings, 'HANGARIN_FRAGMENT_CACHE_TIMEOUT', 3600)
+    return {
+        'model_versions': ModelVersions(),
+        'fragment_cache_timeout': 0 if reading_from_replica() else timeout,
+    }
@@ -0,0 +1,181 @@
+"""
+Hangarin Task Management System - Batched deletes
+
+Deleting a category or a priority cascades to its tasks, and a task to its
+subtasks and notes. Django's collector does that in Python: it loads every
+dependent row (to send its delete signals) before deleting anything, in one
+transaction. A category with 200k tasks takes the memory of every row, and
+holds the write lock for as long as that lasts.
+
+delete_tasks() deletes in batches of ``HANGARIN_DELETE_BATCH_SIZE`` rows
+instead, each in a short transaction of its own. Subtasks and notes go first,
+with one set-based ``DELETE ... WHERE id IN (...)`` per batch: what an
+``ON DELETE CASCADE`` foreign key would do in the database, which Django 5.2
+cannot declare. Then the tasks of the batch go. The per-row signal work is
+done once per batch: the dashboard counters are invalidated and the model
+versions bumped. The FTS triggers keep the search index in sync on their
+own. A category or priority itself is deleted through the ORM, once no task
+points at it any more.
+
+A delete interrupted half-way leaves whole rows behind, never dangling ones.
+Running it again finishes the job.
+
+Deletes too large for a request are scheduled as a DeletionJob and carried
+out by ``manage.py run_deletion_jobs``.
+"""
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from hangarin import stats, versions
+from hangarin.models import Task, SubTask, Note, Category, Priority, DeletionJob, ArchivedTask
+
+
+# Models whose rows own tasks -> the task field pointing at them
+OWNER_FIELDS = {
+    Category: 'category',
+    Priority: 'priority',
+}
+
+# Rows deleted along with their task -> the field pointing at it
+DEPENDENT_FIELDS = {
+    SubTask: 'parent_task',
+    Note: 'task',
+}
+
+
+@dataclass
+class DeleteResult:
+    deleted: Counter = field(default_factory=Counter)
+    seconds: float = 0.0
+
+    @property
+    def tasks(self):
+        return self.deleted[Task._meta.label]
+
+    def counts(self):
+        """Rows deleted per model label, as ``QuerySet.delete()`` reports them"""
+        return {label: count for label, count in self.deleted.items() if count}
+
+
+def _batch_size(batch_size):
+    return batch_size or getattr(settings, 'HANGARIN_DELETE_BATCH_SIZE', 1000)
+
+
+def delete_rows(model, ids, using):
+    """One set-based DELETE of ``ids``, without the collector"""
+    with transaction.atomic(using=using):
+        # _raw_delete() is the statement Django itself runs for fast deletes
+        deleted = model._base_manager.filter(pk__in=ids)._raw_delete(using)
+        if model is Task:
+            transaction.on_commit(stats.invalidate_counters, using=using)
+        versions.changed(model, using=using)
+    return deleted
+
+
+def delete_tasks(queryset, batch_size=None, progress=None):
+    """
+    Delete the tasks of ``queryset`` with their subtasks and notes and
+    return a DeleteResult.
+
+    ``progress`` is called with the running result after every batch.
+    """
+    batch_size = _batch_size(batch_size)
+    using = queryset.db
+    result = DeleteResult()
+    start = time.perf_counter()
+    task_ids = queryset.order_by().values_list('pk', flat=True)
+    while True:
+        batch = list(task_ids[:batch_size])
+        if not batch:
+            break
+        for model, task_field in DEPENDENT_FIELDS.items():
+            # Soft-deleted rows too (see hangarin.trash)
+            rows = model.all_objects.using(using).filter(**{f'{task_field}__in': batch}).values_list('pk', flat=True)
+            while True:
+                ids = list(rows[:batch_size])
+                if not ids:
+                    break
+                result.deleted[model._meta.label] += delete_rows(model, ids, using)
+        result.deleted[Task._meta.label] += delete_rows(Task, batch, using)
+        result.seconds = time.perf_counter() - start
+        if progress:
+            progress(result)
+    return result
+
+
+def dependent_tasks(obj):
+    """The tasks deleted along with ``obj`` (a category, a priority or a task), soft-deleted ones included"""
+    if isinstance(obj, Task):
+        return Task.all_objects.filter(pk=obj.pk)
+    return Task.all_objects.filter(**{OWNER_FIELDS[type(obj)]: obj})
+
+
+def delete_object(obj, batch_size=None, progress=None):
+    """Delete a category, priority or task with everything cascading from it, batch by batch"""
+    result = delete_tasks(dependent_tasks(obj), batch_size, progress)
+    if not isinstance(obj, Task):
+        # The tasks are gone: nothing left for the collector to load but
+        # archived tasks (see hangarin.archive), which it deletes set-based
+        _, counts = obj.delete()
+        result.deleted.update(counts)
+        if counts.get(ArchivedTask._meta.label):
+            transaction.on_commit(stats.invalidate_counters)
+            versions.changed(ArchivedTask)
+    return result
+
+
+def schedule(obj):
+    """The DeletionJob deleting ``obj``; an unfinished one is reused"""
+    label = obj._meta.label
+    job = DeletionJob.objects.filter(
+        model_label=label, object_id=obj.pk, status__in=['Pending', 'Running'],
+    ).first()
+    if job is None:
+        job = DeletionJob.objects.create(
+            model_label=label, object_id=obj.pk, object_repr=str(obj)[:200],
+            total_tasks=dependent_tasks(obj).count(),
+        )
+    return job
+
+
+def run_job(job, batch_size=None, progress=None):
+    """
+    Carry out a pending DeletionJob; return False if another worker claimed
+    it first. Progress is saved on the job after every batch, then passed
+    to ``progress``.
+    """
+    claimed = DeletionJob.objects.filter(pk=job.pk, status='Pending').update(
+        status='Running', updated_at=timezone.now(),
+    )
+    if not claimed:
+        return False
+
+    def save_progress(result):
+        DeletionJob.objects.filter(pk=job.pk).update(deleted_tasks=result.tasks, updated_at=timezone.now())
+        if progress:
+            progress(result)
+
+    job.refresh_from_db()
+    # deleted_tasks is saved by save_progress(): the copy on ``job`` is stale
+    # unless the delete finished
+    fields = ['status', 'error', 'finished_at', 'updated_at']
+    try:
+        obj = job.target()
+        if obj is not None:
+            result = delete_object(obj, batch_size, save_progress)
+            job.deleted_tasks = result.tasks
+            fields.append('deleted_tasks')
+        job.status = 'Completed'
+    except Exception as exc:
+        job.status = 'Failed'
+        job.error = repr(exc)
+        raise
+    finally:
+        job.finished_at = timezone.now()
+        job.save(update_fields=fields)
+    return True
@@ -0,0 +1,106 @@
+"""
+Hangarin Task Management System - Streaming export
+
+Serializes tasks, with their category and priority names and optionally
+their subtasks and notes, as CSV or NDJSON (one JSON object per line).
+Rows are generated lazily from ``QuerySet.iterator(chunk_size=...)``, with
+subtasks and notes prefetched one chunk at a time, so memory use does not
+grow with the table and the header goes out before the first query runs.
+Used by TaskExportView and the ``export_tasks`` management command.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from hangarin.models import SubTask, Note
+
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+INCLUDES = ('subtasks', 'notes')
+TASK_FIELDS = ['id', 'title', 'description', 'status', 'deadline', 'category', 'priority',
+               'created_at', 'updated_at']
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(queryset, include=()):
+    """Prepare a task queryset for export: denormalized names, nested rows, id order"""
+    queryset = queryset.select_related('category', 'priority').order_by('id')
+    if 'subtasks' in include:
+        queryset = queryset.prefetch_related(
+            Prefetch('subtasks', queryset=SubTask.objects.order_by('id').only('id', 'title', 'status', 'parent_task'))
+        )
+    if 'notes' in include:
+        queryset = queryset.prefetch_related(
+            Prefetch('notes', queryset=Note.objects.order_by('id').only('id', 'content', 'created_at', 'task'))
+        )
+    return queryset
+
+
+def task_records(queryset, include=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one dict per task of an export_queryset()"""
+    for task in queryset.iterator(chunk_size=chunk_size):
+        record = {
+            'id': task.id,
+            'title': task.title,
+            'description': task.description,
+            'status': task.status,
+            'deadline': task.deadline,
+            'category': task.category.name,
+            'priority': task.priority.name,
+            'created_at': task.created_at,
+            'updated_at': task.updated_at,
+        }
+        if 'subtasks' in include:
+            record['subtasks'] = [
+                {'id': subtask.id, 'title': subtask.title, 'status': subtask.status}
+                for subtask in task.subtasks.all()
+            ]
+        if 'notes' in include:
+            record['notes'] = [
+                {'id': note.id, 'content': note.content, 'created_at': note.created_at}
+                for note in task.notes.all()
+            ]
+        yield record
+
+
+def _json(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def stream_csv(records, include=()):
+    """
+    Yield CSV lines. Nested subtasks and notes go into one column each,
+    encoded as a JSON array, so a task stays one row.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(TASK_FIELDS + list(include))
+    for record in records:
+        row = [record[field] for field in TASK_FIELDS]
+        row = [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+        yield writer.writerow(row + [_json(record[name]) for name in include])
+
+
+def stream_ndjson(records, include=()):
+    for record in records:
+        yield _json(record) + '\n'
+
+
+def stream_export(queryset, export_format='csv', include=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generator of text chunks exporting ``queryset`` in ``export_format``"""
+    include = [name for name in INCLUDES if name in include]
+    records = task_records(export_queryset(queryset, include), include, chunk_size)
+    if export_format == 'ndjson':
+        return stream_ndjson(records, include)
+    return stream_csv(records, include)
@@ -1,6 +1,8 @@
 from django.forms import ModelForm
 from django import forms
 from .models import Task, SubTask, Category, Priority, Note
+from .refdata import ReferenceChoiceField
+from .widgets import AutocompleteSelect
 
 
 class TaskForm(ModelForm):
@@ -10,8 +12,6 @@ class TaskForm(ModelForm):
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
-            'category': forms.Select(attrs={'class': 'form-control'}),
-            'priority': forms.Select(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
             'deadline': forms.DateTimeInput(
                 format='%Y-%m-%dT%H:%M:%S',
@@ -23,6 +23,10 @@ class TaskForm(ModelForm):
             ),
         }
 
+    # Choices come from the reference data cache instead of a query per render
+    category = ReferenceChoiceField(Category, widget=forms.Select(attrs={'class': 'form-control'}))
+    priority = ReferenceChoiceField(Priority, widget=forms.Select(attrs={'class': 'form-control'}))
+
     # Accept datetime-local values including seconds
     deadline = forms.DateTimeField(
         widget=forms.DateTimeInput(format='%Y-%m-%dT%H:%M:%S', attrs={'type': 'datetime-local', 'class': 'form-control', 'step': '1'}),
@@ -47,7 +51,7 @@ class SubTaskWithParentForm(ModelForm):
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'status': forms.Select(attrs={'class': 'form-control'}),
-            'parent_task': forms.Select(attrs={'class': 'form-control'}),
+            'parent_task': AutocompleteSelect('task-autocomplete', attrs={'class': 'form-control'}),
         }
 
 
@@ -83,6 +87,81 @@ class NoteWithTaskForm(ModelForm):
         model = Note
         fields = ['task', 'content']
         widgets = {
-            'task': forms.Select(attrs={'class': 'form-control'}),
+            'task': AutocompleteSelect('task-autocomplete', attrs={'class': 'form-control'}),
             'content': forms.Textarea(attrs={'class': 'form-control', 'rows': 4}),
         }
+
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField(
+        help_text='CSV or NDJSON with the columns of the task export',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ndjson,.jsonl'}),
+    )
+    create_missing = forms.BooleanField(
+        required=False,
+        label='Create missing categories and priorities',
+    )
+
+
+class IdListField(forms.Field):
+    """A list of primary keys posted as repeated fields (e.g. row checkboxes)"""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return [int(pk) for pk in value or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Enter a list of ids.', code='invalid')
+
+
+class BulkActionForm(forms.Form):
+    """
+    A bulk action on the selected rows (``scope=ids``) or on every row
+    matching the list filters (``scope=filter``). Subclasses add a field per
+    action holding the new value.
+    """
+    SCOPE_CHOICES = [('ids', 'Selected'), ('filter', 'All matching')]
+
+    action = forms.ChoiceField()
+    scope = forms.ChoiceField(choices=SCOPE_CHOICES, required=False)
+    ids = IdListField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        cleaned_data['scope'] = cleaned_data.get('scope') or 'ids'
+        if cleaned_data['scope'] == 'ids' and not cleaned_data.get('ids'):
+            raise forms.ValidationError('Select at least one item.')
+        if action and action != 'delete' and cleaned_data.get(action) in (None, ''):
+            self.add_error(action, 'Choose the new value.')
+        return cleaned_data
+
+    def changes(self):
+        """Field changes for QuerySet.update(), or None for a delete"""
+        action = self.cleaned_data['action']
+        if action == 'delete':
+            return None
+        return {action: self.cleaned_data[action]}
+
+
+class TaskBulkActionForm(BulkActionForm):
+    status = forms.ChoiceField(choices=[('', 'Status')] + Task.STATUS_CHOICES, required=False)
+    category = ReferenceChoiceField(Category, required=False)
+    priority = ReferenceChoiceField(Priority, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['action'].choices = [
+            ('status', 'Change status'),
+            ('category', 'Change category'),
+            ('priority', 'Change priority'),
+            ('delete', 'Delete'),
+        ]
+
+
+class SubTaskBulkActionForm(BulkActionForm):
+    status = forms.ChoiceField(choices=[('', 'Status')] + SubTask.STATUS_CHOICES, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['action'].choices = [('status', 'Change status'), ('delete', 'Delete')]
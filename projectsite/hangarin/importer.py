@@ -0,0 +1,271 @@
+"""
+Hangarin Task Management System - Bulk import
+
+Loads tasks, with nested subtasks and notes, from the CSV and NDJSON files
+that hangarin.export writes (or anything with the same columns). The file
+is read as a stream and handled in batches:
+
+* every row is validated with the field rules of TaskForm,
+  SubTaskWithParentForm and NoteWithTaskForm, without building a form per
+  row;
+* category and priority names are resolved through an in-memory map loaded
+  once, instead of a ModelChoiceField query per row;
+* the valid rows of a batch are inserted with ``bulk_create`` in one
+  transaction, and invalid rows are reported with their line number.
+
+A file that stops being readable part way (bad encoding, broken CSV
+quoting) ends the import: the batches already written stay, and the report
+names the last row they hold.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from hangarin import stats, versions
+from hangarin.forms import TaskForm, SubTaskWithParentForm, NoteWithTaskForm
+from hangarin.models import Task, SubTask, Note, Category, Priority
+from hangarin.progress import initial_counts
+
+
+DEFAULT_BATCH_SIZE = 2000
+
+
+@dataclass
+class RowError:
+    line: int
+    field: str
+    message: str
+
+
+@dataclass
+class ImportResult:
+    tasks: int = 0
+    subtasks: int = 0
+    notes: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows(self):
+        return self.tasks + self.subtasks + self.notes
+
+    @property
+    def rows_per_minute(self):
+        return self.rows / self.seconds * 60 if self.seconds else 0.0
+
+    def write_report(self, out):
+        """Write the errors as CSV: line, field, message"""
+        writer = csv.writer(out)
+        writer.writerow(['line', 'field', 'message'])
+        for error in self.errors:
+            writer.writerow([error.line, error.field, error.message])
+
+
+class UnreadableFile(Exception):
+    """The stream could not be decoded or parsed past ``line``"""
+
+    def __init__(self, line, message):
+        super().__init__(message)
+        self.line = line
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def read_records(stream, import_format):
+    """
+    Yield ``(line, record)`` from a text stream. CSV cells holding the nested
+    subtasks and notes are JSON arrays, as written by the export.
+
+    Raise UnreadableFile when the stream cannot be decoded or the CSV cannot
+    be parsed; ``line`` is the last line read.
+    """
+    line = 0
+    try:
+        if import_format == 'ndjson':
+            for line, text in enumerate(stream, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except ValueError as e:
+                    record = {'__error__': f'Invalid JSON: {e}'}
+                yield line, record if isinstance(record, dict) else {'__error__': 'Expected a JSON object'}
+            return
+
+        reader = csv.DictReader(stream)
+        for record in reader:
+            line = reader.line_num
+            for name in ('subtasks', 'notes'):
+                if record.get(name):
+                    try:
+                        record[name] = json.loads(record[name])
+                    except ValueError:
+                        record[name] = {'__error__': 'Invalid JSON array'}
+            yield line, record
+    except UnicodeDecodeError as e:
+        raise UnreadableFile(line, f'The file is not valid UTF-8 ({e.reason})') from e
+    except csv.Error as e:
+        raise UnreadableFile(line, f'Invalid CSV: {e}') from e
+
+
+class RowValidator:
+    """
+    Cleans import rows with the form field rules.
+
+    The foreign keys are left out of the form fields: category and priority
+    are looked up by name (case-insensitively) in maps loaded once, and the
+    parent of nested subtasks and notes is the row's task.
+    """
+
+    def __init__(self, create_missing=False):
+        self.task_fields = self._fields(TaskForm, exclude=('category', 'priority'))
+        self.subtask_fields = self._fields(SubTaskWithParentForm, exclude=('parent_task',))
+        self.note_fields = self._fields(NoteWithTaskForm, exclude=('task',))
+        self.create_missing = create_missing
+        self.categories = {c.name.lower(): c.id for c in Category.objects.only('id', 'name')}
+        self.priorities = {p.name.lower(): p.id for p in Priority.objects.only('id', 'name')}
+
+    @staticmethod
+    def _fields(form_class, exclude):
+        return {name: f for name, f in form_class().fields.items() if name not in exclude}
+
+    def _clean(self, fields, record, prefix, errors):
+        cleaned = {}
+        for name, form_field in fields.items():
+            try:
+                cleaned[name] = form_field.clean(record.get(name))
+            except ValidationError as e:
+                value = record.get(name)
+                # Exports write ISO 8601 datetimes with an offset, which the
+                # datetime-local formats of TaskForm do not accept
+                deadline = parse_datetime(value) if name == 'deadline' and isinstance(value, str) else None
+                if deadline:
+                    # Without an offset: in the current time zone, like the form would
+                    if timezone.is_naive(deadline):
+                        deadline = timezone.make_aware(deadline, timezone.get_current_timezone())
+                    cleaned[name] = deadline
+                    continue
+                errors.append((prefix + name, ' '.join(e.messages)))
+        return cleaned
+
+    def _lookup(self, model, names, value, errors):
+        if not value:
+            errors.append((model._meta.model_name, 'This field is required.'))
+            return None
+        key = str(value).strip().lower()
+        if key not in names and self.create_missing:
+            names[key] = model.objects.create(name=str(value).strip()).id
+        if key not in names:
+            errors.append((model._meta.model_name, f'Unknown {model._meta.verbose_name}: {value}'))
+            return None
+        return names[key]
+
+    def _nested(self, fields, record, name, errors):
+        items = record.get(name) or []
+        if not isinstance(items, list):
+            errors.append((name, 'Expected a list'))
+            return []
+        cleaned = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append((f'{name}[{index}]', 'Expected an object'))
+                continue
+            cleaned.append(self._clean(fields, item, f'{name}[{index}].', errors))
+        return cleaned
+
+    def clean(self, record):
+        """Return ``(task kwargs, subtasks, notes, errors)`` for one record"""
+        errors = []
+        if '__error__' in record:
+            return None, [], [], [('row', record['__error__'])]
+        task = self._clean(self.task_fields, record, '', errors)
+        task['category_id'] = self._lookup(Category, self.categories, record.get('category'), errors)
+        task['priority_id'] = self._lookup(Priority, self.priorities, record.get('priority'), errors)
+        subtasks = self._nested(self.subtask_fields, record, 'subtasks', errors)
+        notes = self._nested(self.note_fields, record, 'notes', errors)
+        return task, subtasks, notes, errors
+
+
+def write_batch(batch):
+    """Insert one batch of cleaned rows in a single transaction"""
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(**task, **initial_counts([subtask.get('status') for subtask in subtasks], len(notes)))
+            for task, subtasks, notes in batch
+        ])
+        subtasks = SubTask.objects.bulk_create([
+            SubTask(parent_task=task, **subtask)
+            for task, (_, nested, _) in zip(tasks, batch)
+            for subtask in nested
+        ])
+        notes = Note.objects.bulk_create([
+            Note(task=task, **note)
+            for task, (_, _, nested) in zip(tasks, batch)
+            for note in nested
+        ])
+    return len(tasks), len(subtasks), len(notes)
+
+
+def import_tasks(stream, import_format='csv', batch_size=DEFAULT_BATCH_SIZE, create_missing=False,
+                 dry_run=False):
+    """
+    Import the tasks of a text stream and return an ImportResult.
+
+    Invalid rows are skipped and reported; valid rows are still imported.
+    bulk_create bypasses the model signals, so the dashboard counters are
+    rebuilt and the model versions bumped at the end.
+    """
+    validator = RowValidator(create_missing=create_missing and not dry_run)
+    result = ImportResult()
+    start = time.perf_counter()
+    batch = []
+    # Line of the last row appended to the batch, and of the last one written
+    read_line = written_line = 0
+
+    def flush():
+        nonlocal written_line
+        if batch:
+            written_line = read_line
+        if batch and not dry_run:
+            created = write_batch(batch)
+            result.tasks += created[0]
+            result.subtasks += created[1]
+            result.notes += created[2]
+        elif batch:
+            result.tasks += len(batch)
+            result.subtasks += sum(len(subtasks) for _, subtasks, _ in batch)
+            result.notes += sum(len(notes) for _, _, notes in batch)
+        batch.clear()
+
+    unreadable = None
+    try:
+        for line, record in read_records(stream, import_format):
+            task, subtasks, notes, errors = validator.clean(record)
+            if errors:
+                result.errors.extend(RowError(line, name, message) for name, message in errors)
+                continue
+            batch.append((task, subtasks, notes))
+            read_line = line
+            if len(batch) >= batch_size:
+                flush()
+    except UnreadableFile as e:
+        unreadable = e
+    flush()
+    if unreadable:
+        verb = 'validated' if dry_run else 'imported'
+        kept = f'rows up to line {written_line} were {verb}' if written_line else f'no rows were {verb}'
+        result.errors.append(RowError(unreadable.line + 1, 'file', f'{unreadable}; stopped here, {kept}.'))
+
+    if result.tasks and not dry_run:
+        stats.rebuild_counters()
+        versions.changed(Task, SubTask, Note)
+    result.seconds = time.perf_counter() - start
+    return result
@@ -0,0 +1,151 @@
+"""
+Hangarin Task Management System - Request instrumentation
+
+QueryBudgetMiddleware measures every request: the number of SQL queries,
+the time spent in the database, the time spent rendering the template and
+the total latency. The figures are exposed as a ``Server-Timing`` header
+(visible in the browser's network panel), and GET requests are checked
+against the per-view query budgets, keyed by URL name. Form submissions
+write, so they are not budgeted.
+
+``settings.HANGARIN_QUERY_BUDGETS`` holds the budgets with warm caches and
+``HANGARIN_COLD_QUERY_BUDGETS`` the higher limits of the views that also
+rebuild the dashboard counters or reload the reference data when their
+cache is empty. A request cannot tell which case it was, so the middleware
+checks the cold limit; hangarin.testing asserts both.
+
+A request over budget is logged to the ``hangarin.performance`` logger, or
+raises QueryBudgetExceeded when ``HANGARIN_QUERY_BUDGET_MODE = 'raise'``
+(handy in development). hangarin.testing turns the budgets into tests.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('hangarin.performance')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class RequestMetrics:
+    queries: int = 0
+    db_ms: float = 0.0
+    template_ms: float = 0.0
+    total_ms: float = 0.0
+    view_name: str = None
+    sql: list = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Connection execute wrapper: count and time every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.sql.append(sql)
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_ms:.1f};desc="Template"',
+            f'total;dur={self.total_ms:.1f};desc="Total"',
+        ])
+
+
+def get_query_budget(view_name, cold=False):
+    """The query budget of a URL name (with cold caches if ``cold``), or None if it has none"""
+    budget = getattr(settings, 'HANGARIN_QUERY_BUDGETS', {}).get(view_name)
+    if cold:
+        return getattr(settings, 'HANGARIN_COLD_QUERY_BUDGETS', {}).get(view_name, budget)
+    return budget
+
+
+def check_budget(request, metrics):
+    if request.method not in ('GET', 'HEAD'):
+        return
+    budget = get_query_budget(metrics.view_name, cold=True)
+    if budget is None or metrics.queries <= budget:
+        return
+    message = f'{metrics.view_name} ran {metrics.queries} queries (budget {budget})'
+    if getattr(settings, 'HANGARIN_QUERY_BUDGET_MODE', 'log') == 'raise':
+        raise QueryBudgetExceeded(message + ':\n' + '\n'.join(metrics.sql))
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    """
+    Measure queries and latency per request and enforce the query budgets.
+
+    Goes first in MIDDLEWARE so the session and authentication queries are
+    counted too. Template time is measured for TemplateResponses, which
+    render after the view returns; it includes queries run by the template.
+    The body of a streaming response is produced after this returns, so its
+    queries are not counted. Runs natively on both stacks, so it does not
+    force Django to switch an ASGI request over to sync.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with self.instrument(metrics):
+            response = self.get_response(request)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        # The async ORM runs its queries in the request's thread-sensitive
+        # executor thread, whose connections are not the event loop's: the
+        # wrappers have to be installed (and removed) in that thread
+        stack = await sync_to_async(self.instrument)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, metrics, start)
+
+    def instrument(self, metrics):
+        """Install ``metrics`` on every connection of this thread; close the stack to remove it"""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def finish(self, request, response, metrics, start):
+        metrics.total_ms = (time.perf_counter() - start) * 1000
+        if request.resolver_match:
+            metrics.view_name = request.resolver_match.view_name
+        if getattr(settings, 'HANGARIN_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing()
+        check_budget(request, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        render_start = time.perf_counter()
+
+        def rendered(response):
+            request.metrics.template_ms = (time.perf_counter() - render_start) * 1000
+
+        response.add_post_render_callback(rendered)
+        return response
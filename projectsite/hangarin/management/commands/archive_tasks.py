@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin.archive import archivable, archive_tasks
+
+
+class Command(BaseCommand):
+    help = ('Move completed tasks not updated for a number of days, with their subtasks and notes, '
+            'from the live tables to the archive')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive tasks completed and untouched this long (default: HANGARIN_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Tasks per transaction (default: HANGARIN_ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many tasks would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        tasks = archivable(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'{tasks.count()} tasks would be archived.')
+            return
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{result.tasks} tasks archived, {result.seconds:.1f}s')
+
+        result = archive_tasks(tasks, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {result.tasks} tasks with {result.subtasks} subtasks and {result.notes} notes '
+            f'in {result.seconds:.1f}s.'
+        ))
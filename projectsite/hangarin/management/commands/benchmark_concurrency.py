@@ -0,0 +1,197 @@
+import asyncio
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from hangarin.benchmarks import isolated_database, grow_dataset, percentile
+from hangarin.management.commands.benchmark_routes import current_commit
+from hangarin.models import Task
+
+
+# The pages with an async view under ASGI (see projectsite.asgi_urls)
+ROUTES = {
+    'home': lambda task: reverse('home'),
+    'task-list': lambda task: reverse('task-list'),
+    'task-detail': lambda task: reverse('task-detail', args=[task.pk]),
+}
+
+
+def wsgi_environ(path, cookie):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, cookie):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+
+def call_wsgi(handler, path, cookie):
+    """One request through the WSGI handler, as a threaded WSGI server makes it"""
+    status = []
+    start = time.perf_counter()
+    body = handler(wsgi_environ(path, cookie), lambda line, headers, exc_info=None: status.append(line))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+    return (time.perf_counter() - start) * 1000, int(status[0].split()[0])
+
+
+async def call_asgi(handler, path, cookie):
+    """One request through the ASGI handler, as an ASGI server makes it"""
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client never disconnects
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    start = time.perf_counter()
+    await handler(asgi_scope(path, cookie), receive, send)
+    return (time.perf_counter() - start) * 1000, status[0]
+
+
+def run_wsgi(handler, path, cookie, concurrency, requests):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: call_wsgi(handler, path, cookie), range(requests)))
+        return results, time.perf_counter() - start
+
+
+def run_asgi(handler, path, cookie, concurrency, requests):
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                return await call_asgi(handler, path, cookie)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limited() for _ in range(requests)))
+        return results, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the dashboard, task list and task detail under concurrent '
+            'load through the WSGI handler (sync views, a thread per request) and the ASGI handler '
+            '(async views, one event loop); runs in process on a throwaway database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10_000, help='Tasks to seed')
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8, 32],
+                            help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+        parser.add_argument('--routes', nargs='+', choices=sorted(ROUTES), default=sorted(ROUTES),
+                            help='Pages to load')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        results = []
+        # Production-like settings: no query log, and no budget errors mid-run
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': ['testserver'], 'HANGARIN_QUERY_BUDGET_MODE': 'log'}
+        with override_settings(**overrides):
+            with isolated_database():
+                self.stdout.write(f"Seeding {options['size']} tasks...")
+                grow_dataset(options['size'])
+                client = Client()
+                client.force_login(User.objects.create_user('benchmark'))
+                cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+                task = Task.objects.order_by('id')[options['size'] // 2]
+                handlers = {
+                    'wsgi': lambda path, c, n: run_wsgi(WSGIHandler(), path, cookie, c, n),
+                    'asgi': lambda path, c, n: run_asgi(ASGIHandler(), path, cookie, c, n),
+                }
+
+                for route in options['routes']:
+                    path = ROUTES[route](task)
+                    for concurrency in options['concurrency']:
+                        for server, run in handlers.items():
+                            # Untimed: fills the caches and the fragment cache
+                            run(path, 1, 2)
+                            samples, elapsed = run(path, concurrency, options['requests'])
+                            failed = [status for _, status in samples if status != 200]
+                            if failed:
+                                raise CommandError(f'{server} {route} returned {failed[0]}')
+                            latencies = [ms for ms, _ in samples]
+                            result = {
+                                'route': route,
+                                'server': server,
+                                'concurrency': concurrency,
+                                'requests_per_s': round(len(samples) / elapsed, 1),
+                                'p50_ms': round(percentile(latencies, 50), 3),
+                                'p95_ms': round(percentile(latencies, 95), 3),
+                            }
+                            results.append(result)
+                            self.report(result)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'commit': current_commit(),
+                    'created_at': timezone.now().isoformat(),
+                    'size': options['size'],
+                    'requests': options['requests'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['route']:<12} {result['server']}  x{result['concurrency']:<4} "
+            f"{result['requests_per_s']:>8.1f} req/s  "
+            f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms"
+        )
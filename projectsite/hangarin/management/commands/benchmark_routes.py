@@ -0,0 +1,336 @@
+import io
+import json
+import math
+import subprocess
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from hangarin.archive import archive_tasks
+from hangarin.benchmarks import isolated_database, grow_dataset, measure, summarize, peak_memory
+from hangarin.bulk import bulk_delete
+from hangarin.models import Task, Category, Priority, SubTask, Note, ArchivedTask
+from hangarin.testing import project_url_names
+from hangarin.trash import soft_delete
+
+
+@dataclass
+class Scenario:
+    """
+    One request to time. ``kwargs`` and ``data`` may be callables taking the
+    fixtures; ``kwargs`` is called before every run (outside the timing), so
+    it can create the row a delete scenario removes.
+    """
+    route: str
+    label: str
+    method: str = 'get'
+    kwargs: object = None
+    data: object = None
+
+    @property
+    def key(self):
+        return f'{self.route} {self.method.upper()} {self.label}'
+
+
+def _resolve(value, fixtures):
+    return value(fixtures) if callable(value) else (value or {})
+
+
+def _last_page(model):
+    return lambda f: {'page': max(1, math.ceil(model.objects.count() / 10))}
+
+
+def _task_form(f):
+    return {
+        'title': 'Benchmark task',
+        'description': 'Created by benchmark_routes',
+        'category': f.category.pk,
+        'priority': f.priority.pk,
+        'status': 'Pending',
+        'deadline': timezone.now().strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def _import_file(f, rows=200):
+    lines = ['title,description,status,deadline,category,priority']
+    deadline = timezone.now().strftime('%Y-%m-%dT%H:%M:%S')
+    lines += [
+        f'Imported {n},Benchmark import,Pending,{deadline},{f.category.name},{f.priority.name}'
+        for n in range(rows)
+    ]
+    upload = io.BytesIO('\n'.join(lines).encode())
+    upload.name = 'tasks.csv'
+    return {'file': upload}
+
+
+def _bulk_delete(model, factory, rows=50):
+    def data(f):
+        objects = model.objects.bulk_create([factory(f) for _ in range(rows)])
+        return {'action': 'delete', 'scope': 'ids', 'ids': [obj.pk for obj in objects]}
+    return data
+
+
+def _bulk_restore(model, factory, rows=50):
+    def data(f):
+        objects = model.objects.bulk_create([factory(f) for _ in range(rows)])
+        ids = [obj.pk for obj in objects]
+        bulk_delete(model.objects.filter(pk__in=ids))
+        return {'ids': ids}
+    return data
+
+
+def _new_task(f):
+    return Task.objects.create(
+        title='Disposable', description='', category=f.category, priority=f.priority,
+    )
+
+
+def _trashed(obj):
+    soft_delete(obj)
+    return obj
+
+
+def _archived_task():
+    """An archived task, archiving the oldest completed one if there is none yet"""
+    if not ArchivedTask.objects.exists():
+        task = Task.objects.filter(status='Completed').order_by('id').first()
+        archive_tasks(Task.objects.filter(pk=task.pk))
+    return ArchivedTask.objects.order_by('id').first()
+
+
+SCENARIOS = [
+    Scenario('home', 'dashboard'),
+
+    Scenario('task-list', 'first page'),
+    Scenario('task-list', 'search', data={'q': 'market'}),
+    Scenario('task-list', 'filter', data=lambda f: {'status': 'Pending', 'category': f.category.pk}),
+    Scenario('task-list', 'sort', data={'order_by': 'title'}),
+    Scenario('task-list', 'deep page', data=_last_page(Task)),
+    Scenario('task-list', 'cursor', data={'paginate': 'cursor'}),
+    Scenario('task-list', 'include archived', data={'archived': 'include'}),
+    Scenario('task-export', 'csv', data={'format': 'csv'}),
+    Scenario('task-export', 'ndjson nested', data={'format': 'ndjson', 'include': 'subtasks,notes'}),
+    Scenario('task-import', 'form'),
+    Scenario('task-import', '200 rows', method='post', data=_import_file),
+    Scenario('task-bulk', 'status of all', method='post',
+             data=lambda f: {'action': 'status', 'status': 'In Progress', 'scope': 'filter'}),
+    Scenario('task-bulk', 'delete 50 ids', method='post',
+             data=_bulk_delete(Task, lambda f: Task(title='Disposable', description='',
+                                                    category=f.category, priority=f.priority))),
+    Scenario('task-bulk-restore', 'undo delete of 50', method='post',
+             data=_bulk_restore(Task, lambda f: Task(title='Disposable', description='',
+                                                     category=f.category, priority=f.priority))),
+    Scenario('task-detail', 'detail', kwargs=lambda f: {'pk': f.task.pk}),
+    Scenario('archived-task-detail', 'detail', kwargs=lambda f: {'pk': f.archived.pk}),
+    Scenario('task-subtasks', 'next page', kwargs=lambda f: {'pk': f.task.pk}),
+    Scenario('task-notes', 'next page', kwargs=lambda f: {'pk': f.task.pk}),
+    Scenario('task-autocomplete', 'prefix', data={'q': 'mar'}),
+    Scenario('task-add', 'form'),
+    Scenario('task-add', 'create', method='post', data=_task_form),
+    Scenario('task-update', 'form', kwargs=lambda f: {'pk': f.task.pk}),
+    Scenario('task-update', 'update', method='post', kwargs=lambda f: {'pk': f.task.pk}, data=_task_form),
+    Scenario('task-delete', 'confirm', kwargs=lambda f: {'pk': f.task.pk}),
+    Scenario('task-delete', 'delete', method='post', kwargs=lambda f: {'pk': _new_task(f).pk}),
+    Scenario('task-restore', 'undo delete', method='post', kwargs=lambda f: {'pk': _trashed(_new_task(f)).pk}),
+
+    Scenario('subtask-list', 'first page'),
+    Scenario('subtask-list', 'search', data={'q': 'market'}),
+    Scenario('subtask-list', 'filter', data={'status': 'Completed'}),
+    Scenario('subtask-list', 'deep page', data=_last_page(SubTask)),
+    Scenario('subtask-add', 'form', kwargs=lambda f: {'task_pk': f.task.pk}),
+    Scenario('subtask-add', 'create', method='post', kwargs=lambda f: {'task_pk': f.task.pk},
+             data={'title': 'Benchmark subtask', 'status': 'Pending'}),
+    Scenario('subtask-add-with-parent', 'form'),
+    Scenario('subtask-add-with-parent', 'create', method='post',
+             data=lambda f: {'title': 'Benchmark subtask', 'status': 'Pending', 'parent_task': f.task.pk}),
+    Scenario('subtask-bulk', 'status of all', method='post',
+             data=lambda f: {'action': 'status', 'status': 'Completed', 'scope': 'filter'}),
+    Scenario('subtask-bulk', 'delete 50 ids', method='post',
+             data=_bulk_delete(SubTask, lambda f: SubTask(title='Disposable', parent_task=f.task))),
+    Scenario('subtask-bulk-restore', 'undo delete of 50', method='post',
+             data=_bulk_restore(SubTask, lambda f: SubTask(title='Disposable', parent_task=f.task))),
+    Scenario('subtask-update', 'form', kwargs=lambda f: {'pk': f.subtask.pk}),
+    Scenario('subtask-update', 'update', method='post', kwargs=lambda f: {'pk': f.subtask.pk},
+             data={'title': 'Benchmark subtask', 'status': 'In Progress'}),
+    Scenario('subtask-delete', 'confirm', kwargs=lambda f: {'pk': f.subtask.pk}),
+    Scenario('subtask-delete', 'delete', method='post',
+             kwargs=lambda f: {'pk': SubTask.objects.create(title='Disposable', parent_task=f.task).pk}),
+    Scenario('subtask-restore', 'undo delete', method='post',
+             kwargs=lambda f: {'pk': _trashed(SubTask.objects.create(title='Disposable', parent_task=f.task)).pk}),
+
+    Scenario('note-list', 'first page'),
+    Scenario('note-list', 'search', data={'q': 'market'}),
+    Scenario('note-list', 'deep page', data=_last_page(Note)),
+    Scenario('note-add', 'form', kwargs=lambda f: {'task_pk': f.task.pk}),
+    Scenario('note-add', 'create', method='post', kwargs=lambda f: {'task_pk': f.task.pk},
+             data={'content': 'Benchmark note'}),
+    Scenario('note-add-with-task', 'form'),
+    Scenario('note-add-with-task', 'create', method='post',
+             data=lambda f: {'task': f.task.pk, 'content': 'Benchmark note'}),
+    Scenario('note-content', 'full content', kwargs=lambda f: {'pk': f.note.pk}),
+    Scenario('note-update', 'form', kwargs=lambda f: {'pk': f.note.pk}),
+    Scenario('note-update', 'update', method='post', kwargs=lambda f: {'pk': f.note.pk},
+             data={'content': 'Benchmark note'}),
+    Scenario('note-delete', 'confirm', kwargs=lambda f: {'pk': f.note.pk}),
+    Scenario('note-delete', 'delete', method='post',
+             kwargs=lambda f: {'pk': Note.objects.create(task=f.task, content='Disposable').pk}),
+    Scenario('note-restore', 'undo delete', method='post',
+             kwargs=lambda f: {'pk': _trashed(Note.objects.create(task=f.task, content='Disposable')).pk}),
+
+    Scenario('category-list', 'first page'),
+    Scenario('category-list', 'search', data={'q': 'work'}),
+    Scenario('category-add', 'form'),
+    Scenario('category-add', 'create', method='post', data={'name': 'Benchmark'}),
+    Scenario('category-update', 'form', kwargs=lambda f: {'pk': f.category.pk}),
+    Scenario('category-update', 'update', method='post', kwargs=lambda f: {'pk': f.category.pk},
+             data=lambda f: {'name': f.category.name}),
+    Scenario('category-delete', 'confirm', kwargs=lambda f: {'pk': f.category.pk}),
+    Scenario('category-delete', 'delete', method='post',
+             kwargs=lambda f: {'pk': Category.objects.create(name='Disposable').pk}),
+
+    Scenario('priority-list', 'first page'),
+    Scenario('priority-list', 'search', data={'q': 'high'}),
+    Scenario('priority-add', 'form'),
+    Scenario('priority-add', 'create', method='post', data={'name': 'Benchmark'}),
+    Scenario('priority-update', 'form', kwargs=lambda f: {'pk': f.priority.pk}),
+    Scenario('priority-update', 'update', method='post', kwargs=lambda f: {'pk': f.priority.pk},
+             data=lambda f: {'name': f.priority.name}),
+    Scenario('priority-delete', 'confirm', kwargs=lambda f: {'pk': f.priority.pk}),
+    Scenario('priority-delete', 'delete', method='post',
+             kwargs=lambda f: {'pk': Priority.objects.create(name='Disposable').pk}),
+]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Time every named route through the test client on synthetic datasets '
+            '(uses a throwaway database) and optionally save the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1_000, 10_000, 100_000],
+                            help='Task counts to benchmark at, in increasing order')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per scenario')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed runs per scenario')
+        parser.add_argument('--routes', nargs='+', help='Only run scenarios of these URL names')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='JSON file of an earlier run to compare medians with')
+        parser.add_argument('--no-fragment-cache', action='store_true',
+                            help='Render every template fragment, for a baseline of the fragment cache')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        scenarios = [s for s in SCENARIOS if not options['routes'] or s.route in options['routes']]
+        missing = set(project_url_names()) - {s.route for s in SCENARIOS}
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Routes without a scenario: {', '.join(sorted(missing))}"))
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = {(r['size'], r['scenario']): r for r in json.load(f)['results']}
+
+        results = []
+        # Production-like settings: no query log, and no budget errors mid-run
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': ['testserver'], 'HANGARIN_QUERY_BUDGET_MODE': 'log'}
+        if options['no_fragment_cache']:
+            overrides['HANGARIN_FRAGMENT_CACHE_TIMEOUT'] = 0
+        with override_settings(**overrides):
+            with isolated_database():
+                client = Client()
+                client.force_login(User.objects.create_user('benchmark'))
+                for size in sorted(options['sizes']):
+                    self.stdout.write(f'Seeding {size} tasks...')
+                    grow_dataset(size)
+                    fixtures = SimpleNamespace(
+                        archived=_archived_task(),
+                        task=Task.objects.order_by('id')[size // 2],
+                        subtask=SubTask.objects.order_by('id').first(),
+                        note=Note.objects.order_by('id').first(),
+                        category=Category.objects.order_by('id').first(),
+                        priority=Priority.objects.order_by('id').first(),
+                    )
+                    for scenario in scenarios:
+                        result = self.run_scenario(client, scenario, fixtures, options)
+                        result['size'] = size
+                        results.append(result)
+                        self.report(result, baseline.get((size, scenario.key)))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'commit': current_commit(),
+                    'created_at': timezone.now().isoformat(),
+                    'repeat': options['repeat'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_scenario(self, client, scenario, fixtures, options):
+        queries, db_ms, template_ms = [], [], []
+
+        def prepare():
+            url = reverse(scenario.route, kwargs=_resolve(scenario.kwargs, fixtures))
+            data = _resolve(scenario.data, fixtures)
+            return lambda: getattr(client, scenario.method)(url, data)
+
+        def call(request):
+            response = request()
+            if response.status_code >= 400:
+                raise CommandError(f'{scenario.key} returned {response.status_code}')
+            if response.streaming:
+                # Time the whole download, not just the first byte
+                for _ in response.streaming_content:
+                    pass
+            metrics = response.wsgi_request.metrics
+            queries.append(metrics.queries)
+            db_ms.append(metrics.db_ms)
+            template_ms.append(metrics.template_ms)
+
+        for _ in range(options['warmup']):
+            call(prepare())
+        queries.clear()
+        db_ms.clear()
+        template_ms.clear()
+        samples = []
+        for _ in range(options['repeat']):
+            request = prepare()
+            samples.extend(measure(lambda: call(request), 1))
+        peak = peak_memory(lambda request=prepare(): call(request))
+
+        result = summarize(samples)
+        return {
+            'scenario': scenario.key,
+            'p50_ms': result['median_ms'],
+            'p95_ms': result['p95_ms'],
+            'p99_ms': result['p99_ms'],
+            'queries': max(queries),
+            'db_ms': round(sorted(db_ms)[len(db_ms) // 2], 3),
+            'template_ms': round(sorted(template_ms)[len(template_ms) // 2], 3),
+            'peak_kib': peak,
+        }
+
+    def report(self, result, previous=None):
+        line = (
+            f"{result['size']:>9} rows  {result['scenario']:<40} "
+            f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+            f"tpl {result.get('template_ms', 0):>7.2f} ms  "
+            f"{result['queries']:>3} queries  {result['peak_kib']:>9.1f} KiB"
+        )
+        if previous and previous['p50_ms']:
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+            line += f'  ({change:+.0f}% p50)'
+        self.stdout.write(line)
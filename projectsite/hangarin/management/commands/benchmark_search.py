@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from hangarin.benchmarks import isolated_database, grow_dataset, measure, summarize
+from hangarin.models import Task
+from hangarin.search import fts_available, search_tasks
+
+
+def like_search(query):
+    """The LIKE '%q%' search TaskListView used before full-text indexing"""
+    return Task.objects.select_related('category', 'priority').filter(
+        Q(title__icontains=query) |
+        Q(description__icontains=query) |
+        Q(category__name__icontains=query) |
+        Q(priority__name__icontains=query) |
+        Q(status__icontains=query) |
+        Q(deadline__icontains=query)
+    ).order_by('-created_at')
+
+
+def fts_search(query):
+    return search_tasks(Task.objects.select_related('category', 'priority'), query, ranked=True)
+
+
+class Command(BaseCommand):
+    help = 'Compare LIKE and full-text task search latency on synthetic datasets (uses a throwaway database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000],
+                            help='Task counts to benchmark at, in increasing order')
+        parser.add_argument('--queries', nargs='+', default=['market', 'pol', 'state policy'],
+                            help='Search strings to time')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            if not fts_available():
+                self.stdout.write(self.style.WARNING('FTS5 is not available; both paths use LIKE.'))
+
+            for size in sorted(options['sizes']):
+                self.stdout.write(f'Seeding {size} tasks...')
+                grow_dataset(size)
+                for query in options['queries']:
+                    for label, build in (('like', like_search), ('fts', fts_search)):
+                        # A list page: the first ten rows plus the paginator count
+                        def run():
+                            qs = build(query)
+                            list(qs[:10])
+                            qs.count()
+
+                        result = summarize(measure(run, options['repeat']))
+                        self.stdout.write(
+                            f'{size:>9} rows  {label:<4} {query!r:<16} '
+                            f"median {result['median_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms"
+                        )
@@ -0,0 +1,164 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from hangarin.benchmarks import add_sqlite_database, percentile, remove_database
+from hangarin.management.commands.benchmark_routes import current_commit
+from hangarin.models import Task, Category, Priority, Note
+
+
+def profiles():
+    """Connection settings to compare: SQLite's defaults and the project's tuning"""
+    tuned = settings.DATABASES['default']
+    return {
+        'baseline': {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'tuned': {
+            'OPTIONS': dict(tuned.get('OPTIONS', {})),
+            'CONN_MAX_AGE': tuned.get('CONN_MAX_AGE', 0),
+            'CONN_HEALTH_CHECKS': tuned.get('CONN_HEALTH_CHECKS', False),
+        },
+    }
+
+
+def write_unit(alias, serial):
+    """
+    What a form submission does: read a row, change it and add another, in
+    one transaction, between the request_started/request_finished hooks
+    that open and recycle connections.
+    """
+    connection = connections[alias]
+    connection.close_if_unusable_or_obsolete()
+    try:
+        with transaction.atomic(using=alias):
+            task = Task.objects.using(alias).order_by('-id').first()
+            Task.objects.using(alias).filter(pk=task.pk).update(status='In Progress', updated_at=timezone.now())
+            Note.objects.using(alias).create(task=task, content=f'Benchmark note {serial}')
+    finally:
+        connection.close_if_unusable_or_obsolete()
+
+
+class Command(BaseCommand):
+    help = ('Compare write throughput and "database is locked" errors of concurrent writers on '
+            "SQLite's default connection settings and on the project's tuned ones "
+            '(uses throwaway database files)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', nargs='+', type=int, default=[1, 4, 16],
+                            help='Concurrent writers')
+        parser.add_argument('--writes', type=int, default=200, help='Write transactions per writer')
+        parser.add_argument('--reader-threads', type=int, default=2,
+                            help='Threads reading the task list while the writers run')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['writes'] < 1 or min(options['threads']) < 1:
+            raise CommandError('--writes and --threads must be at least 1')
+
+        results = []
+        directory = Path(tempfile.mkdtemp(prefix='hangarin-sqlite-'))
+        try:
+            for name, profile in profiles().items():
+                for threads in options['threads']:
+                    alias = f'benchmark_{name}_{threads}'
+                    add_sqlite_database(alias, directory / f'{alias}.sqlite3', **profile)
+                    try:
+                        result = self.run_profile(alias, threads, options)
+                    finally:
+                        remove_database(alias)
+                    result.update(profile=name, threads=threads)
+                    results.append(result)
+                    self.report(result)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'commit': current_commit(),
+                    'created_at': timezone.now().isoformat(),
+                    'writes': options['writes'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_profile(self, alias, threads, options):
+        call_command('migrate', database=alias, verbosity=0)
+        category = Category.objects.using(alias).create(name='Benchmark')
+        priority = Priority.objects.using(alias).create(name='Benchmark')
+        Task.objects.using(alias).bulk_create([
+            Task(title=f'Task {n}', description='', category=category, priority=priority)
+            for n in range(1000)
+        ])
+        connections[alias].close()
+
+        latencies, errors = [], []
+        lock = threading.Lock()
+        done = threading.Event()
+        reads = [0]
+
+        def writer(number):
+            for serial in range(options['writes']):
+                start = time.perf_counter()
+                try:
+                    write_unit(alias, (number, serial))
+                except OperationalError as exc:
+                    with lock:
+                        errors.append(str(exc))
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+            connections[alias].close()
+
+        def reader():
+            while not done.is_set():
+                connection = connections[alias]
+                connection.close_if_unusable_or_obsolete()
+                try:
+                    list(Task.objects.using(alias).order_by('-created_at')[:10])
+                    with lock:
+                        reads[0] += 1
+                except OperationalError as exc:
+                    with lock:
+                        errors.append(str(exc))
+                connection.close_if_unusable_or_obsolete()
+            connections[alias].close()
+
+        readers = [threading.Thread(target=reader) for _ in range(options['reader_threads'])]
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        for thread in readers:
+            thread.start()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        return {
+            'writes_per_s': round(len(latencies) / elapsed, 1),
+            'reads_per_s': round(reads[0] / elapsed, 1),
+            'lock_errors': sum('locked' in error for error in errors),
+            'other_errors': sum('locked' not in error for error in errors),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+        }
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['profile']:<9} {result['threads']:>3} writers  "
+            f"{result['writes_per_s']:>8.1f} writes/s  {result['reads_per_s']:>8.1f} reads/s  "
+            f"{result['lock_errors']:>5} lock errors  "
+            f"p50 {result['p50_ms']:>7.2f} ms  p95 {result['p95_ms']:>7.2f} ms"
+        )
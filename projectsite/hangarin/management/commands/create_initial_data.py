@@ -1,44 +1,53 @@
-from django.core.management.base import BaseCommand
-from faker import Faker
 import random
-from django.utils import timezone
-from hangarin.models import Task, SubTask, Note, Category, Priority
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin.seeding import seed_tasks
 
 
 class Command(BaseCommand):
     help = 'Create initial data for Hangarin app'
 
-    def handle(self, *args, **kwargs):
-        self.create_tasks(20)
-
-    def create_tasks(self, count):
-        fake = Faker()
-        categories = list(Category.objects.all())
-        priorities = list(Priority.objects.all())
-
-        for _ in range(count):
-            task = Task.objects.create(
-                title=fake.sentence(nb_words=5),
-                description=fake.paragraph(nb_sentences=3),
-                status=fake.random_element(elements=["Pending", "In Progress", "Completed"]),
-                deadline=timezone.make_aware(fake.date_time_this_month()),
-                priority=random.choice(priorities),
-                category=random.choice(categories),
-            )
-
-            for _ in range(2):
-                SubTask.objects.create(
-                    title=fake.sentence(nb_words=4),
-                    status=fake.random_element(elements=["Pending", "In Progress", "Completed"]),
-                    parent_task=task,
-                )
-
-            for _ in range(2):
-                Note.objects.create(
-                    task=task,
-                    content=fake.paragraph(nb_sentences=2),
-                )
-
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=20, help='Number of tasks to create')
+        parser.add_argument('--subtasks-per-task', type=int, default=2)
+        parser.add_argument('--notes-per-task', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tasks generated and inserted per transaction')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed for reproducible data (random when omitted)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes generating Faker payloads in parallel')
+
+    def handle(self, *args, **options):
+        for name in ('tasks', 'batch_size', 'workers'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be at least 1")
+        for name in ('subtasks_per_task', 'notes_per_task'):
+            if options[name] < 0:
+                raise CommandError(f"--{name.replace('_', '-')} cannot be negative")
+
+        seed = options['seed']
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{result.tasks}/{options["tasks"]} tasks, {result.rows_per_second:,.0f} rows/sec')
+
+        result = self.create_tasks(options, seed, progress)
         self.stdout.write(self.style.SUCCESS(
-            f'{count} tasks with subtasks and notes created successfully!'
+            f'{result.tasks} tasks with {result.subtasks} subtasks and {result.notes} notes '
+            f'created successfully in {result.seconds:.1f}s ({result.rows_per_second:,.0f} rows/sec, seed {seed})!'
         ))
+
+    def create_tasks(self, options, seed, progress=None):
+        return seed_tasks(
+            options['tasks'],
+            subtasks_per_task=options['subtasks_per_task'],
+            notes_per_task=options['notes_per_task'],
+            batch_size=options['batch_size'],
+            seed=seed,
+            workers=options['workers'],
+            progress=progress,
+        )
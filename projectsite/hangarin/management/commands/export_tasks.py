@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from hangarin.export import FORMATS, INCLUDES, DEFAULT_CHUNK_SIZE, stream_export
+from hangarin.models import Task
+from hangarin.query import filter_tasks
+
+
+class Command(BaseCommand):
+    help = 'Stream tasks as CSV or NDJSON, optionally with their subtasks and notes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--include', nargs='*', choices=INCLUDES, default=[],
+                            help='Nested rows to add to each task')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Tasks fetched per query')
+        parser.add_argument('--q', help='Search query, as in the task list')
+        parser.add_argument('--status')
+        parser.add_argument('--priority', help='Priority id')
+        parser.add_argument('--category', help='Category id')
+
+    def handle(self, *args, **options):
+        tasks = filter_tasks(Task.objects.all(), options)
+        chunks = stream_export(tasks, options['format'], options['include'], options['chunk_size'])
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            f.writelines(chunks)
+        self.stdout.write(self.style.SUCCESS(f"Tasks exported to {options['output']}"))
@@ -0,0 +1,56 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin.importer import DEFAULT_BATCH_SIZE, detect_format, import_tasks
+
+
+class Command(BaseCommand):
+    help = 'Bulk import tasks (with nested subtasks and notes) from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Tasks inserted per transaction')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Create unknown categories and priorities instead of rejecting the row')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, insert nothing')
+        parser.add_argument('--report', help='Write the per-row errors to this CSV file')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        path = options['path']
+        import_format = options['format'] or detect_format(path)
+
+        kwargs = {
+            'import_format': import_format,
+            'batch_size': options['batch_size'],
+            'create_missing': options['create_missing'],
+            'dry_run': options['dry_run'],
+        }
+        if path == '-':
+            result = import_tasks(sys.stdin, **kwargs)
+        else:
+            try:
+                with open(path, encoding='utf-8-sig', newline='') as f:
+                    result = import_tasks(f, **kwargs)
+            except OSError as e:
+                raise CommandError(e)
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8', newline='') as f:
+                result.write_report(f)
+        for error in result.errors[:20]:
+            self.stderr.write(f'line {error.line}: {error.field}: {error.message}')
+        if len(result.errors) > 20:
+            self.stderr.write(f'... and {len(result.errors) - 20} more errors')
+
+        verb = 'validated' if options['dry_run'] else 'imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.tasks} tasks, {result.subtasks} subtasks and {result.notes} notes {verb} '
+            f'in {result.seconds:.1f}s ({result.rows_per_minute:,.0f} rows/min); '
+            f'{len(result.errors)} errors.'
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin.models import Task, SubTask, Note
+from hangarin.trash import expired, purge
+
+
+class Command(BaseCommand):
+    help = ('Remove the tasks, subtasks and notes deleted more than the retention window ago '
+            'for good (deletes only mark rows until then)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Keep rows deleted within this many days (default: HANGARIN_TRASH_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per transaction (default: HANGARIN_DELETE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be removed')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['dry_run']:
+            counts = ', '.join(
+                f"{expired(model, options['days']).count()} {model._meta.verbose_name_plural}"
+                for model in (Task, SubTask, Note)
+            )
+            self.stdout.write(f'Would remove {counts}.')
+            return
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{result.tasks} tasks removed, {result.seconds:.1f}s')
+
+        result = purge(options['days'], options['batch_size'], progress)
+        counts = ', '.join(f'{count} {label}' for label, count in result.counts().items()) or 'nothing'
+        self.stdout.write(self.style.SUCCESS(f'Removed {counts} in {result.seconds:.1f}s.'))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hangarin.stats import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount all tasks and rebuild the cached dashboard statistics'
+
+    def handle(self, *args, **kwargs):
+        counters = rebuild_counters()
+        total = sum(counters['status'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Dashboard statistics rebuilt from {total} tasks.'
+        ))
+
+        if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+            self.stdout.write(self.style.WARNING(
+                'The default cache is process-local; running servers keep their own copy '
+                'until their next drift check. Use a shared cache backend to rebuild them from here.'
+            ))
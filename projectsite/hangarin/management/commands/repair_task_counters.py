@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin import progress
+from hangarin.models import Task
+from hangarin.routers import primary
+
+
+class Command(BaseCommand):
+    help = ('Compare the subtask and note counters stored on every task with its rows '
+            'and recount the tasks that drifted')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Report drift and exit with an error instead of repairing it')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tasks compared per query')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        tasks = primary(Task)
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            # A range of primary keys per batch keeps the statements small
+            batch = list(tasks.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            in_range = tasks.filter(pk__gte=batch[0], pk__lte=batch[-1])
+            stale = list(progress.drifted(in_range).values_list('pk', flat=True))
+            if stale and not options['check']:
+                progress.recount(tasks.filter(pk__in=stale))
+            if stale and options['verbosity'] > 1:
+                self.stdout.write(f"Drifted: {', '.join(str(pk) for pk in stale)}")
+            checked += len(batch)
+            drifted += len(stale)
+            last_pk = batch[-1]
+
+        if options['check']:
+            if drifted:
+                raise CommandError(f'{drifted} of {checked} tasks have drifted counters.')
+            self.stdout.write(self.style.SUCCESS(f'Counters of all {checked} tasks match.'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} tasks, repaired {drifted}.'))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hangarin.deletion import run_job
+from hangarin.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = ('Carry out the pending background deletes of categories, priorities and tasks '
+            '(scheduled by the delete views for large cascades)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per transaction (default: HANGARIN_DELETE_BATCH_SIZE)')
+        parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                            help='Keep running, checking for new jobs at this interval')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        while True:
+            for job in DeletionJob.objects.filter(status='Pending').order_by('created_at'):
+                self.stdout.write(f'{job}: {job.total_tasks} tasks...')
+
+                def progress(result, job=job):
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{job}: {result.tasks}/{job.total_tasks} tasks, {result.seconds:.1f}s')
+
+                try:
+                    if not run_job(job, options['batch_size'], progress):
+                        continue
+                except Exception as exc:
+                    self.stderr.write(self.style.ERROR(f'{job} failed: {exc!r}'))
+                    continue
+                job.refresh_from_db()
+                self.stdout.write(self.style.SUCCESS(
+                    f'{job}: {job.deleted_tasks} tasks deleted in '
+                    f'{(job.finished_at - job.created_at).total_seconds():.1f}s since it was scheduled.'
+                ))
+            if options['watch'] is None:
+                break
+            time.sleep(options['watch'])
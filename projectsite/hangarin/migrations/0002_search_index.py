@@ -0,0 +1,117 @@
+import django.db.models.deletion
+from django.db import migrations, models, OperationalError
+
+
+# The FTS tables and triggers as of this migration, frozen: hangarin.search
+# may define them differently later (and installs its own after migrate).
+# FTS table -> (create statements, populate statements, drop trigger statements)
+SEARCH_INDEXES = {
+    'hangarin_task_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_task_fts USING fts5(title, description, status, category, priority, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_ai AFTER INSERT ON hangarin_task BEGIN INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT new.id, new.title, new.description, new.status, (SELECT name FROM hangarin_category WHERE id = new.category_id), (SELECT name FROM hangarin_priority WHERE id = new.priority_id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_ad AFTER DELETE ON hangarin_task BEGIN DELETE FROM hangarin_task_fts WHERE rowid = old.id; END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_au AFTER UPDATE OF category_id, description, priority_id, status, title ON hangarin_task BEGIN DELETE FROM hangarin_task_fts WHERE rowid = old.id; INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT new.id, new.title, new.description, new.status, (SELECT name FROM hangarin_category WHERE id = new.category_id), (SELECT name FROM hangarin_priority WHERE id = new.priority_id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_hangarin_category_au AFTER UPDATE OF name ON hangarin_category BEGIN UPDATE hangarin_task_fts SET category = new.name WHERE rowid IN (SELECT id FROM hangarin_task WHERE category_id = new.id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_hangarin_priority_au AFTER UPDATE OF name ON hangarin_priority BEGIN UPDATE hangarin_task_fts SET priority = new.name WHERE rowid IN (SELECT id FROM hangarin_task WHERE priority_id = new.id); END',
+        ],
+        [
+            "INSERT INTO hangarin_task_fts(hangarin_task_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 2.0, 2.0, 2.0)')",
+            'INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT id, hangarin_task.title, hangarin_task.description, hangarin_task.status, (SELECT name FROM hangarin_category WHERE id = hangarin_task.category_id), (SELECT name FROM hangarin_priority WHERE id = hangarin_task.priority_id) FROM hangarin_task',
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_au',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_hangarin_category_au',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_hangarin_priority_au',
+        ],
+    ),
+    'hangarin_subtask_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_subtask_fts USING fts5(title, status, content='hangarin_subtask', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_ai AFTER INSERT ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(rowid, title, status) SELECT new.id, new.title, new.status; END',
+            "CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_ad AFTER DELETE ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rowid, title, status) VALUES ('delete', old.id, old.title, old.status); END",
+            "CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_au AFTER UPDATE OF status, title ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rowid, title, status) VALUES ('delete', old.id, old.title, old.status); INSERT INTO hangarin_subtask_fts(rowid, title, status) SELECT new.id, new.title, new.status; END",
+        ],
+        [
+            "INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+            "INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts) VALUES ('rebuild')",
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_au',
+        ],
+    ),
+    'hangarin_note_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_note_fts USING fts5(content, content='hangarin_note', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_ai AFTER INSERT ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(rowid, content) SELECT new.id, new.content; END',
+            "CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_ad AFTER DELETE ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(hangarin_note_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+            "CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_au AFTER UPDATE OF content ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(hangarin_note_fts, rowid, content) VALUES ('delete', old.id, old.content); INSERT INTO hangarin_note_fts(rowid, content) SELECT new.id, new.content; END",
+        ],
+        [
+            "INSERT INTO hangarin_note_fts(hangarin_note_fts, rank) VALUES ('rank', 'bm25(1.0)')",
+            "INSERT INTO hangarin_note_fts(hangarin_note_fts) VALUES ('rebuild')",
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_au',
+        ],
+    ),
+}
+
+
+def install(apps, schema_editor):
+    """Create the FTS tables and triggers missing on SQLite; fill new tables from the existing rows"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, (create, populate, _) in SEARCH_INDEXES.items():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+            exists = cursor.fetchone() is not None
+            try:
+                for statement in create:
+                    cursor.execute(statement)
+            except OperationalError:
+                # SQLite compiled without FTS5: search falls back to icontains
+                return
+            if not exists:
+                for statement in populate:
+                    cursor.execute(statement)
+
+
+def uninstall(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, (_, _, drop_triggers) in SEARCH_INDEXES.items():
+            for statement in drop_triggers + [f'DROP TABLE IF EXISTS {table}']:
+                cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hangarin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+        migrations.CreateModel(
+            name='TaskSearchEntry',
+            fields=[
+                ('task', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='hangarin.task')),
+                ('document', models.TextField(db_column='hangarin_task_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'hangarin_task_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+from django.db import migrations, models, OperationalError
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# The FTS tables and triggers as of this migration (unchanged since 0002),
+# frozen: hangarin.search may define them differently later.
+# FTS table -> (create statements, populate statements, drop trigger statements)
+SEARCH_INDEXES = {
+    'hangarin_task_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_task_fts USING fts5(title, description, status, category, priority, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_ai AFTER INSERT ON hangarin_task BEGIN INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT new.id, new.title, new.description, new.status, (SELECT name FROM hangarin_category WHERE id = new.category_id), (SELECT name FROM hangarin_priority WHERE id = new.priority_id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_ad AFTER DELETE ON hangarin_task BEGIN DELETE FROM hangarin_task_fts WHERE rowid = old.id; END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_au AFTER UPDATE OF category_id, description, priority_id, status, title ON hangarin_task BEGIN DELETE FROM hangarin_task_fts WHERE rowid = old.id; INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT new.id, new.title, new.description, new.status, (SELECT name FROM hangarin_category WHERE id = new.category_id), (SELECT name FROM hangarin_priority WHERE id = new.priority_id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_hangarin_category_au AFTER UPDATE OF name ON hangarin_category BEGIN UPDATE hangarin_task_fts SET category = new.name WHERE rowid IN (SELECT id FROM hangarin_task WHERE category_id = new.id); END',
+            'CREATE TRIGGER IF NOT EXISTS hangarin_task_fts_hangarin_priority_au AFTER UPDATE OF name ON hangarin_priority BEGIN UPDATE hangarin_task_fts SET priority = new.name WHERE rowid IN (SELECT id FROM hangarin_task WHERE priority_id = new.id); END',
+        ],
+        [
+            "INSERT INTO hangarin_task_fts(hangarin_task_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 2.0, 2.0, 2.0)')",
+            'INSERT INTO hangarin_task_fts(rowid, title, description, status, category, priority) SELECT id, hangarin_task.title, hangarin_task.description, hangarin_task.status, (SELECT name FROM hangarin_category WHERE id = hangarin_task.category_id), (SELECT name FROM hangarin_priority WHERE id = hangarin_task.priority_id) FROM hangarin_task',
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_au',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_hangarin_category_au',
+            'DROP TRIGGER IF EXISTS hangarin_task_fts_hangarin_priority_au',
+        ],
+    ),
+    'hangarin_subtask_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_subtask_fts USING fts5(title, status, content='hangarin_subtask', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_ai AFTER INSERT ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(rowid, title, status) SELECT new.id, new.title, new.status; END',
+            "CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_ad AFTER DELETE ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rowid, title, status) VALUES ('delete', old.id, old.title, old.status); END",
+            "CREATE TRIGGER IF NOT EXISTS hangarin_subtask_fts_au AFTER UPDATE OF status, title ON hangarin_subtask BEGIN INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rowid, title, status) VALUES ('delete', old.id, old.title, old.status); INSERT INTO hangarin_subtask_fts(rowid, title, status) SELECT new.id, new.title, new.status; END",
+        ],
+        [
+            "INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')",
+            "INSERT INTO hangarin_subtask_fts(hangarin_subtask_fts) VALUES ('rebuild')",
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_subtask_fts_au',
+        ],
+    ),
+    'hangarin_note_fts': (
+        [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hangarin_note_fts USING fts5(content, content='hangarin_note', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            'CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_ai AFTER INSERT ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(rowid, content) SELECT new.id, new.content; END',
+            "CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_ad AFTER DELETE ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(hangarin_note_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+            "CREATE TRIGGER IF NOT EXISTS hangarin_note_fts_au AFTER UPDATE OF content ON hangarin_note BEGIN INSERT INTO hangarin_note_fts(hangarin_note_fts, rowid, content) VALUES ('delete', old.id, old.content); INSERT INTO hangarin_note_fts(rowid, content) SELECT new.id, new.content; END",
+        ],
+        [
+            "INSERT INTO hangarin_note_fts(hangarin_note_fts, rank) VALUES ('rank', 'bm25(1.0)')",
+            "INSERT INTO hangarin_note_fts(hangarin_note_fts) VALUES ('rebuild')",
+        ],
+        [
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_ai',
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_ad',
+            'DROP TRIGGER IF EXISTS hangarin_note_fts_au',
+        ],
+    ),
+}
+
+
+def drop_triggers(apps, schema_editor):
+    """
+    Drop the sync triggers but keep the indexed text: SQLite refuses to
+    rename a table that triggers on other tables refer to
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for _, _, drop_triggers in SEARCH_INDEXES.values():
+            for statement in drop_triggers:
+                cursor.execute(statement)
+
+
+def install(apps, schema_editor):
+    """Create the FTS tables and triggers missing on SQLite; fill new tables from the existing rows"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, (create, populate, _) in SEARCH_INDEXES.items():
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+            exists = cursor.fetchone() is not None
+            try:
+                for statement in create:
+                    cursor.execute(statement)
+            except OperationalError:
+                # SQLite compiled without FTS5: search falls back to icontains
+                return
+            if not exists:
+                for statement in populate:
+                    cursor.execute(statement)
+
+
+def count_rows(apps, schema_editor):
+    Task = apps.get_model('hangarin', 'Task')
+    SubTask = apps.get_model('hangarin', 'SubTask')
+    Note = apps.get_model('hangarin', 'Note')
+
+    def count(model, field, **filters):
+        rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+        return Coalesce(Subquery(rows.annotate(count=Count('*')).values('count')), 0)
+
+    Task.objects.using(schema_editor.connection.alias).update(
+        subtask_count=count(SubTask, 'parent_task'),
+        subtasks_completed=count(SubTask, 'parent_task', status='Completed'),
+        subtasks_in_progress=count(SubTask, 'parent_task', status='In Progress'),
+        note_count=count(Note, 'task'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hangarin', '0004_conditional_get_indexes'),
+    ]
+
+    operations = [
+        # Adding the columns rebuilds hangarin_task on SQLite
+        migrations.RunPython(drop_triggers, install),
+        migrations.AddField(
+            model_name='task',
+            name='note_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtask_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtasks_completed',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtasks_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_rows, migrations.RunPython.noop),
+        migrations.RunPython(install, drop_triggers),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hangarin', '0006_deletion_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed')], default='Completed', max_length=50)),
+                ('deadline', models.DateTimeField()),
+                ('subtask_count', models.PositiveIntegerField(default=0)),
+                ('subtasks_completed', models.PositiveIntegerField(default=0)),
+                ('subtasks_in_progress', models.PositiveIntegerField(default=0)),
+                ('note_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('subtasks', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('notes', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hangarin.category')),
+                ('priority', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hangarin.priority')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='archivedtask_created_idx'), models.Index(fields=['updated_at'], name='archivedtask_updated_idx'), models.Index(fields=['category', 'status'], name='archivedtask_category_idx'), models.Index(fields=['priority', 'status'], name='archivedtask_priority_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hangarin.category')),
+                ('priority', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='hangarin.priority')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('category', 'priority', 'status'), name='archivetotal_unique')],
+            },
+        ),
+    ]
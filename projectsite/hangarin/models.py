@@ -1,3 +1,5 @@
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -10,12 +12,43 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class LiveManager(models.Manager):
+    """Rows not marked deleted; the default manager of SoftDeleteModel"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(BaseModel):
+    """
+    BaseModel whose rows are marked deleted instead of removed, see
+    hangarin.trash. ``objects`` (and related managers) hide them,
+    ``all_objects`` sees every row.
+    """
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        abstract = True
+
+
+# Condition of the partial indexes of SoftDeleteModel tables: the rows
+# LiveManager reads, which is all the list queries ever look at
+LIVE = models.Q(deleted_at__isnull=True)
+DELETED = models.Q(deleted_at__isnull=False)
+
+
 class Category(BaseModel):
     name = models.CharField(max_length=100)
 
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categories"
+        indexes = [
+            models.Index(fields=["name"], name="category_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -27,12 +60,15 @@ class Priority(BaseModel):
     class Meta:
         verbose_name = "Priority"
         verbose_name_plural = "Priorities"
+        indexes = [
+            models.Index(fields=["name"], name="priority_name_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Task(BaseModel):
+class Task(SoftDeleteModel):
     STATUS_CHOICES = [
         ("Pending", "Pending"),
         ("In Progress", "In Progress"),
@@ -45,12 +81,40 @@ class Task(BaseModel):
     deadline = models.DateTimeField(default=timezone.now)
     priority = models.ForeignKey(Priority, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    # Maintained from the SubTask and Note signals, see hangarin.progress
+    subtask_count = models.PositiveIntegerField(default=0, editable=False)
+    subtasks_completed = models.PositiveIntegerField(default=0, editable=False)
+    subtasks_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    note_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Back the list view filter + sort combinations (see hangarin.sorting).
+        # The updated_at columns let the filtered MAX(updated_at) probe of the
+        # conditional GET read an index alone (see hangarin.conditional).
+        # Partial: deleted rows stay out of them until the purge
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="task_status_created_idx", condition=LIVE),
+            models.Index(fields=["status", "updated_at"], name="task_status_updated_idx", condition=LIVE),
+            models.Index(fields=["category", "status", "updated_at"], name="task_category_status_idx", condition=LIVE),
+            models.Index(fields=["priority", "status", "updated_at"], name="task_priority_status_idx", condition=LIVE),
+            models.Index(fields=["updated_at"], name="task_updated_idx", condition=LIVE),
+            models.Index(fields=["deadline"], name="task_deadline_idx", condition=LIVE),
+            models.Index(fields=["title"], name="task_title_idx", condition=LIVE),
+            models.Index(fields=["deleted_at"], name="task_deleted_idx", condition=DELETED),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def progress(self):
+        """Percentage of the subtasks completed; None without subtasks"""
+        if not self.subtask_count:
+            return None
+        return round(100 * self.subtasks_completed / self.subtask_count)
 
-class SubTask(BaseModel):
+
+class SubTask(SoftDeleteModel):
     STATUS_CHOICES = [
         ("Pending", "Pending"),
         ("In Progress", "In Progress"),
@@ -61,13 +125,129 @@ class SubTask(BaseModel):
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default="Pending")
     parent_task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="subtasks")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="subtask_status_created_idx", condition=LIVE),
+            models.Index(fields=["title"], name="subtask_title_idx", condition=LIVE),
+            models.Index(fields=["deleted_at"], name="subtask_deleted_idx", condition=DELETED),
+        ]
+
     def __str__(self):
         return self.title
 
 
-class Note(BaseModel):
+class Note(SoftDeleteModel):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="notes")
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["deleted_at"], name="note_deleted_idx", condition=DELETED),
+        ]
+
     def __str__(self):
         return f"Note for {self.task.title}"
+
+
+class DeletionJob(BaseModel):
+    """A category, priority or task being deleted in the background, see hangarin.deletion"""
+    STATUS_CHOICES = [
+        ("Pending", "Pending"),
+        ("Running", "Running"),
+        ("Completed", "Completed"),
+        ("Failed", "Failed"),
+    ]
+
+    model_label = models.CharField(max_length=100)
+    object_id = models.PositiveBigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default="Pending")
+    total_tasks = models.PositiveIntegerField(default=0)
+    deleted_tasks = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="deletionjob_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Delete {self.object_repr}"
+
+    @property
+    def percent_done(self):
+        if not self.total_tasks:
+            return 100 if self.status == "Completed" else 0
+        return min(100, round(100 * self.deleted_tasks / self.total_tasks))
+
+    def target(self):
+        """The row to delete, or None if it is already gone"""
+        return apps.get_model(self.model_label)._default_manager.filter(pk=self.object_id).first()
+
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the live tables, with its subtasks and
+    notes as JSON; see hangarin.archive. Keeps the task's id, and Task's
+    columns in Task's order: the task list reads both tables in one UNION.
+    """
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    status = models.CharField(max_length=50, choices=Task.STATUS_CHOICES, default="Completed")
+    deadline = models.DateTimeField()
+    priority = models.ForeignKey(Priority, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    subtask_count = models.PositiveIntegerField(default=0)
+    subtasks_completed = models.PositiveIntegerField(default=0)
+    subtasks_in_progress = models.PositiveIntegerField(default=0)
+    note_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(default=timezone.now)
+    subtasks = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    notes = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="archivedtask_created_idx"),
+            models.Index(fields=["updated_at"], name="archivedtask_updated_idx"),
+            models.Index(fields=["category", "status"], name="archivedtask_category_idx"),
+            models.Index(fields=["priority", "status"], name="archivedtask_priority_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    progress = Task.progress
+
+
+class ArchiveTotal(models.Model):
+    """Archived tasks per category, priority and status, for the dashboard; see hangarin.archive"""
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    priority = models.ForeignKey(Priority, on_delete=models.CASCADE)
+    status = models.CharField(max_length=50, choices=Task.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["category", "priority", "status"], name="archivetotal_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.count} archived {self.status} tasks"
+
+
+class TaskSearchEntry(models.Model):
+    """Row of the FTS5 index over tasks; maintained by triggers, see hangarin.search"""
+    task = models.OneToOneField(
+        Task, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry',
+    )
+    # FTS5 exposes a hidden column named after the table: "<table> = 'query'" is a MATCH
+    document = models.TextField(db_column='hangarin_task_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'hangarin_task_fts'
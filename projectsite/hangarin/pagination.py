@@ -0,0 +1,348 @@
+"""
+Hangarin Task Management System - Keyset (cursor) pagination
+
+Django's Paginator slices with OFFSET and always runs COUNT(*), so the cost of
+a page grows with its depth. The cursor paginator instead remembers the sort
+key of the last row it returned and asks for rows strictly after it::
+
+    WHERE (created_at < :c) OR (created_at = :c AND id < :id)
+    ORDER BY created_at DESC, id DESC LIMIT :per_page + 1
+
+which an index on the sort columns answers in constant time at any depth.
+Cursors are opaque url-safe tokens; the exact total count is optional.
+
+EstimatedCountPaginator keeps OFFSET pages (for the admin) but takes the
+total of an unfiltered list from the database's table statistics once the
+table is past ``HANGARIN_ESTIMATED_COUNT_THRESHOLD`` rows.
+"""
+import base64
+import datetime
+import json
+from functools import cached_property
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _resolve_field(model, path):
+    """Return the model field behind an ``a__b`` ordering path"""
+    field = None
+    for name in path.split('__'):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        if field.is_relation:
+            model = field.related_model
+    if field is None or field.is_relation:
+        raise FieldDoesNotExist(path)
+    return field
+
+
+def _nullable(model, path):
+    """Whether an ordering path can be NULL (the column or a join on the way)"""
+    for name in path.split('__'):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        if field.null:
+            return True
+        if field.is_relation:
+            model = field.related_model
+    return False
+
+
+def _resolve_value(obj, path):
+    for name in path.split('__'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _serialize_value(value):
+    # Full isoformat: DjangoJSONEncoder drops microseconds, which would make
+    # the cursor skip or repeat rows created within the same millisecond.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def parse_ordering(model, ordering):
+    """
+    Normalize an ``order_by()`` list into ``(path, descending, field)`` keys.
+
+    A primary key tiebreaker is appended when missing so every row has a
+    unique position. Raises ValueError for orderings a cursor cannot follow
+    (expressions, random ordering, relations without a column, nullable
+    columns, which ``__lt``/``__gt`` cannot compare against NULL).
+    """
+    keys = []
+    for item in ordering:
+        if not isinstance(item, str) or item == '?':
+            raise ValueError(f'Cannot paginate by cursor on {item!r}')
+        descending = item.startswith('-')
+        path = item.lstrip('-')
+        try:
+            field = _resolve_field(model, path)
+        except FieldDoesNotExist:
+            raise ValueError(f'Cannot paginate by cursor on {item!r}')
+        if _nullable(model, path):
+            raise ValueError(f'Cannot paginate by cursor on nullable {item!r}')
+        keys.append((path, descending, field))
+
+    pk_name = model._meta.pk.name
+    if not any(path in ('pk', pk_name) for path, _, _ in keys):
+        descending = keys[-1][1] if keys else False
+        keys.append((pk_name, descending, model._meta.pk))
+    return keys
+
+
+class CursorPage:
+    """A page of results with opaque tokens for its neighbours"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Paginate an ordered queryset by keyset instead of OFFSET"""
+
+    def __init__(self, queryset, per_page, count_total=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.count_total = count_total
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ['pk']
+        self.keys = parse_ordering(queryset.model, ordering)
+
+    @cached_property
+    def count(self):
+        """Exact number of rows, or None when counting is disabled"""
+        if not self.count_total:
+            return None
+        return self.queryset.count()
+
+    def encode_cursor(self, obj, backwards=False):
+        values = [_serialize_value(_resolve_value(obj, path)) for path, _, _ in self.keys]
+        payload = json.dumps({'v': values, 'b': backwards}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            raw_values = payload['v']
+            backwards = bool(payload['b'])
+            if len(raw_values) != len(self.keys):
+                raise InvalidCursor('Cursor does not match the current ordering')
+            values = [field.to_python(value) for (_, _, field), value in zip(self.keys, raw_values)]
+            if None in values:
+                raise InvalidCursor('Cursor values cannot be null')
+        except (ValueError, TypeError, KeyError, ValidationError) as exc:
+            raise InvalidCursor('Invalid cursor') from exc
+        return values, backwards
+
+    def _after(self, values, backwards):
+        """Q object selecting rows past ``values`` in the walking direction"""
+        condition = Q()
+        equal = Q()
+        for (path, descending, _), value in zip(self.keys, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= equal & Q(**{f'{path}__{lookup}': value})
+            equal &= Q(**{path: value})
+        return condition
+
+    def _ordering(self, backwards):
+        return [
+            f'-{path}' if descending != backwards else path
+            for path, descending, _ in self.keys
+        ]
+
+    def _page_queryset(self, cursor):
+        """The rows to fetch for the page after ``cursor`` (one extra to detect more)"""
+        backwards = False
+        queryset = self.queryset
+        if cursor:
+            values, backwards = self.decode_cursor(cursor)
+            queryset = queryset.filter(self._after(values, backwards))
+        return queryset.order_by(*self._ordering(backwards))[:self.per_page + 1], backwards
+
+    def _make_page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        # Walking forwards, rows behind us exist whenever we started from a
+        # cursor; walking backwards, the rows we came from are still ahead.
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def page(self, cursor=None):
+        """Return the page following (or preceding) ``cursor``"""
+        queryset, backwards = self._page_queryset(cursor)
+        return self._make_page(list(queryset), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        """page() through the async ORM"""
+        queryset, backwards = self._page_queryset(cursor)
+        return self._make_page([row async for row in queryset], cursor, backwards)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in keyset pagination for ListView subclasses.
+
+    Cursor mode is used when ``HANGARIN_PAGINATION_MODE = 'cursor'`` or when
+    the request carries ``?paginate=cursor`` / a ``cursor`` token; otherwise
+    the regular OFFSET paginator is used. ``HANGARIN_PAGINATION_EXACT_COUNT``
+    controls whether cursor pages also report the total number of rows.
+    """
+    cursor_param = 'cursor'
+    # Total already counted by the view (e.g. a conditional GET probe)
+    known_count = None
+
+    def get_pagination_mode(self):
+        params = self.request.GET
+        if self.cursor_param in params or params.get('paginate') == 'cursor':
+            return 'cursor'
+        return getattr(settings, 'HANGARIN_PAGINATION_MODE', 'offset')
+
+    def get_cursor_paginator(self, queryset, page_size):
+        """The CursorPaginator for this request, or None for OFFSET pages"""
+        self.pagination_mode = self.get_pagination_mode()
+        if self.pagination_mode != 'cursor':
+            return None
+        try:
+            paginator = CursorPaginator(
+                queryset, page_size,
+                count_total=getattr(settings, 'HANGARIN_PAGINATION_EXACT_COUNT', True),
+            )
+        except ValueError:
+            # Ordering a cursor cannot follow: fall back to OFFSET pages
+            self.pagination_mode = 'offset'
+            return None
+        if self.known_count is not None and paginator.count_total:
+            paginator.count = self.known_count
+        return paginator
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        if paginator is None:
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_param))
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """paginate_queryset() with the count and the rows fetched through the async ORM"""
+        paginator = self.get_cursor_paginator(queryset, page_size)
+        if paginator is None:
+            if self.known_count is None:
+                self.known_count = await queryset.acount()
+            # With the count known the OFFSET page is a lazy slice until iterated
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            page.object_list = [obj async for obj in object_list]
+            return (paginator, page, page.object_list, is_paginated)
+
+        if paginator.count_total and self.known_count is None:
+            paginator.count = await queryset.acount()
+        try:
+            page = await paginator.apage(self.request.GET.get(self.cursor_param))
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pagination_mode'] = getattr(self, 'pagination_mode', 'offset')
+        return context
+
+
+def estimated_row_count(model, using):
+    """
+    Rows in ``model``'s table according to the database's statistics, or
+    None when it has none: PostgreSQL's ``pg_class.reltuples`` (kept by
+    autovacuum), SQLite's ``sqlite_stat1`` (written by ``ANALYZE`` or
+    ``PRAGMA optimize``).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            # -1 until the table is first vacuumed or analyzed
+            return int(row[0]) if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except OperationalError:
+                # Never analyzed: the statistics table does not exist
+                return None
+            row = cursor.fetchone()
+            # "<rows> <rows per key>...": the first number counts the table
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    OFFSET paginator that does not COUNT(*) a large unfiltered table.
+
+    Filtered lists are still counted exactly: statistics cannot tell how
+    many rows match. The estimate only sizes the page links, so the last
+    pages may come out short or empty.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        threshold = getattr(settings, 'HANGARIN_ESTIMATED_COUNT_THRESHOLD', 100_000)
+        # Unfiltered: nothing past the default manager's own filter (the
+        # soft-deleted rows it hides are few enough for an estimate)
+        unfiltered = queryset.query.where == queryset.model._default_manager.all().query.where
+        if threshold is not None and unfiltered:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,169 @@
+"""
+Hangarin Task Management System - Subtask and note counters
+
+Every task stores how many subtasks it has, how many of them are completed
+or in progress, and how many notes it has, so the task list and the task
+detail show progress without counting rows of ``hangarin_subtask`` and
+``hangarin_note``.
+
+The counters are maintained from the SubTask and Note signals (see
+hangarin.signals) with ``F()`` expressions: a single
+``UPDATE ... SET subtask_count = subtask_count + 1`` per affected task,
+which stays correct when two requests change the same task at once. The
+update sets ``updated_at`` and records a change to Task (see
+hangarin.versions), since the progress shown for the task changed.
+
+Bulk changes wrap themselves in deferred_updates() to replace the per-row
+updates with one recount of the tasks involved. Rows inserted with
+``bulk_create`` carry their counts from the start (see initial_counts()).
+``manage.py repair_task_counters`` finds and fixes any drift left behind.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from hangarin import versions
+from hangarin.models import Task, SubTask, Note
+
+
+COUNTER_FIELDS = ('subtask_count', 'subtasks_completed', 'subtasks_in_progress', 'note_count')
+
+# Subtask status value -> counter field, besides subtask_count
+STATUS_FIELDS = {
+    'Completed': 'subtasks_completed',
+    'In Progress': 'subtasks_in_progress',
+}
+
+# Counted model -> the field pointing at its task
+TASK_FIELDS = {
+    SubTask: 'parent_task',
+    Note: 'task',
+}
+
+# True inside deferred_updates()
+_deferred = ContextVar('hangarin_progress_deferred', default=False)
+
+
+def task_id(instance):
+    """The task a subtask or note belongs to"""
+    return instance.parent_task_id if isinstance(instance, SubTask) else instance.task_id
+
+
+def counted_state(instance):
+    """
+    ``(task_id, status)`` of a subtask or note: what it counts towards.
+    None once it is soft-deleted (see hangarin.trash).
+    """
+    if instance.deleted_at is not None:
+        return None
+    if isinstance(instance, SubTask):
+        return instance.parent_task_id, instance.status
+    return instance.task_id, None
+
+
+def _fields(model, status):
+    if model is Note:
+        return ['note_count']
+    return ['subtask_count'] + ([STATUS_FIELDS[status]] if status in STATUS_FIELDS else [])
+
+
+def initial_counts(subtask_statuses=(), notes=0):
+    """Counter values of a new task with subtasks in ``subtask_statuses`` and ``notes`` notes"""
+    counts = Counter({field: 0 for field in COUNTER_FIELDS})
+    for status in subtask_statuses:
+        counts.update(_fields(SubTask, status))
+    counts['note_count'] = notes
+    return dict(counts)
+
+
+def apply_delta(model, old=None, new=None, using=None):
+    """
+    Move one subtask or note in the counters of its tasks.
+
+    ``old`` and ``new`` are counted_state() tuples before and after the
+    change; ``None`` means the row did not exist on that side. Counters
+    never go below zero: a decrement of a count that has already drifted
+    leaves it for repair_task_counters.
+    """
+    deltas = {}
+    if old is not None:
+        for field in _fields(model, old[1]):
+            deltas.setdefault(old[0], Counter())[field] -= 1
+    if new is not None:
+        for field in _fields(model, new[1]):
+            deltas.setdefault(new[0], Counter())[field] += 1
+
+    changed = False
+    for task_id, counts in deltas.items():
+        updates = {
+            field: F(field) + amount if amount > 0 else Greatest(F(field) + amount, 0)
+            for field, amount in counts.items() if amount
+        }
+        if task_id is not None and updates:
+            Task.objects.db_manager(using).filter(pk=task_id).update(updated_at=timezone.now(), **updates)
+            changed = True
+    if changed:
+        versions.changed(Task, using=using)
+
+
+def _count(model, **filters):
+    """Correlated COUNT(*) of ``model`` rows pointing at the outer task"""
+    field = TASK_FIELDS[model]
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Coalesce(Subquery(rows.annotate(count=Count('*')).values('count')), 0)
+
+
+def expected_counts():
+    """Counter field -> expression counting the rows it should hold"""
+    return {
+        'subtask_count': _count(SubTask),
+        'subtasks_completed': _count(SubTask, status='Completed'),
+        'subtasks_in_progress': _count(SubTask, status='In Progress'),
+        'note_count': _count(Note),
+    }
+
+
+def recount(tasks):
+    """Store the actual counts on every task of ``tasks`` in one UPDATE; return the number of tasks"""
+    updated = tasks.update(updated_at=timezone.now(), **expected_counts())
+    if updated:
+        versions.changed(Task, using=tasks.db)
+    return updated
+
+
+def drifted(tasks):
+    """The tasks of ``tasks`` whose stored counters differ from their rows"""
+    expected = {f'expected_{field}': expression for field, expression in expected_counts().items()}
+    mismatch = Q()
+    for field in COUNTER_FIELDS:
+        mismatch |= ~Q(**{field: F(f'expected_{field}')})
+    return tasks.annotate(**expected).filter(mismatch)
+
+
+@contextmanager
+def deferred_updates(queryset):
+    """
+    Skip the per-row counter updates of the SubTask and Note signals inside
+    the block and recount the tasks of ``queryset``'s rows once instead.
+    For bulk updates and deletes of many subtasks or notes.
+    """
+    field = TASK_FIELDS[queryset.model]
+    # Read first: the rows may no longer match, or exist, afterwards
+    task_ids = list(queryset.order_by().values_list(f'{field}_id', flat=True).distinct())
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    tasks = Task.objects.db_manager(queryset.db)
+    # Bounded IN lists: SQLite limits the parameters of a statement
+    for start in range(0, len(task_ids), 500):
+        recount(tasks.filter(pk__in=task_ids[start:start + 500]))
+
+
+def updates_deferred():
+    return _deferred.get()
@@ -0,0 +1,283 @@
+"""
+Hangarin Task Management System - Search query language
+
+The ``q`` parameter of the task and note lists understands a few structured
+tokens besides free text::
+
+    status:pending   status:"in progress"
+    priority:high    category:work
+    due:today  due:tomorrow  due:week  due:overdue
+    due:<7d  due:>2w                 relative to now (d = days, w = weeks)
+    due:2025-10-14  due:2025-10  due:2025-10-01..2025-10-31
+    due:<2025-11-01  due:>=2025-10-01
+    created:2025-10                  same forms, on the creation date
+    2025-10-14  2025-10              bare dates, see QueryLanguage.dates
+
+Dates compile to half-open ``__gte``/``__lt`` ranges on the datetime
+columns, which an index can answer, instead of casting every row to text.
+Whatever is left over is returned as free text for full-text search.
+"""
+import datetime
+import re
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils import timezone
+
+from hangarin.models import Task, Category, Priority
+from hangarin.search import search_tasks, search_subtasks
+
+
+TOKEN_RE = re.compile(r'(\w+):("[^"]*"|\S+)|"[^"]*"|\S+')
+DATE_RE = re.compile(r'^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$')
+RELATIVE_RE = re.compile(r'^(\d+)([dw])$')
+COMPARISON_RE = re.compile(r'^(<=|>=|<|>)(.+)$')
+
+
+@dataclass
+class ParsedQuery:
+    filters: Q
+    text: str
+
+
+def _normalize(value):
+    return re.sub(r'[\s_-]+', '', value).lower()
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def parse_date_range(value):
+    """
+    Return the ``(start, end)`` datetimes covered by ``YYYY-MM-DD`` or
+    ``YYYY-MM``, or None if ``value`` is not such a date.
+    """
+    match = DATE_RE.match(value)
+    if not match:
+        return None
+    year, month, day = (int(part) if part else None for part in match.groups())
+    try:
+        if day is not None:
+            start = datetime.date(year, month, day)
+            end = start + datetime.timedelta(days=1)
+        else:
+            start = datetime.date(year, month, 1)
+            end = datetime.date(year + month // 12, month % 12 + 1, 1)
+    except ValueError:
+        return None
+    return _start_of_day(start), _start_of_day(end)
+
+
+def _named_range(value, now):
+    """Ranges for the ``today``/``tomorrow``/``week``/``overdue`` keywords"""
+    today = timezone.localdate(now)
+    if value == 'today':
+        return _start_of_day(today), _start_of_day(today + datetime.timedelta(days=1))
+    if value == 'tomorrow':
+        tomorrow = today + datetime.timedelta(days=1)
+        return _start_of_day(tomorrow), _start_of_day(tomorrow + datetime.timedelta(days=1))
+    if value == 'week':
+        monday = today - datetime.timedelta(days=today.weekday())
+        return _start_of_day(monday), _start_of_day(monday + datetime.timedelta(days=7))
+    if value == 'overdue':
+        return None, now
+    return None
+
+
+def _relative_delta(value):
+    match = RELATIVE_RE.match(value)
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2)
+    return datetime.timedelta(days=amount * (7 if unit == 'w' else 1))
+
+
+def date_filter(field, value, now=None):
+    """
+    Compile a date expression for ``field`` into a sargable Q, or return
+    None if ``value`` is not a date expression.
+    """
+    now = now or timezone.now()
+    value = value.lower()
+
+    named = _named_range(value, now)
+    if named:
+        start, end = named
+        return _range(field, start, end)
+
+    if '..' in value:
+        first, _, last = value.partition('..')
+        first_range, last_range = parse_date_range(first), parse_date_range(last)
+        if first_range and last_range:
+            return _range(field, first_range[0], last_range[1])
+        return None
+
+    comparison = COMPARISON_RE.match(value)
+    if comparison:
+        operator, operand = comparison.groups()
+        delta = _relative_delta(operand)
+        if delta is not None:
+            # due:<7d is "between now and a week from now"; due:>7d is later
+            if operator.startswith('<'):
+                return _range(field, now, now + delta)
+            return _range(field, now + delta, None)
+        bounds = parse_date_range(operand)
+        if bounds is None:
+            return None
+        start, end = bounds
+        return {
+            '<': _range(field, None, start),
+            '<=': _range(field, None, end),
+            '>': _range(field, end, None),
+            '>=': _range(field, start, None),
+        }[operator]
+
+    bounds = parse_date_range(value)
+    if bounds:
+        return _range(field, *bounds)
+    return None
+
+
+def _range(field, start, end):
+    q = Q()
+    if start is not None:
+        q &= Q(**{f'{field}__gte': start})
+    if end is not None:
+        q &= Q(**{f'{field}__lt': end})
+    return q
+
+
+class QueryLanguage:
+    """
+    Maps the query tokens onto one list view's model.
+
+    ``due``/``created``/``status``/``priority``/``category`` are the lookup
+    paths the matching tokens filter on; ``dates`` are the fields a bare date
+    matches (any of them).
+    """
+
+    def __init__(self, due, created, status, priority, category, dates):
+        self.fields = {
+            'due': due,
+            'created': created,
+            'status': status,
+            'priority': priority,
+            'category': category,
+        }
+        self.dates = dates
+
+    def _status(self, value):
+        wanted = _normalize(value)
+        statuses = [choice for choice, label in Task.STATUS_CHOICES if _normalize(label) == wanted]
+        return Q(**{f"{self.fields['status']}__in": statuses})
+
+    def _named(self, key, model, value):
+        # Reference tables are small; resolving the name keeps the filter on
+        # the indexed foreign key column of the listed table.
+        ids = model.objects.filter(name__iexact=value).values('id')
+        return Q(**{f'{self.fields[key]}__in': ids})
+
+    def _keyword(self, key, value, now):
+        if key == 'status':
+            return self._status(value)
+        if key == 'priority':
+            return self._named(key, Priority, value)
+        if key == 'category':
+            return self._named(key, Category, value)
+        if key in ('due', 'created'):
+            return date_filter(self.fields[key], value, now)
+        return None
+
+    def parse(self, query, now=None):
+        """Split ``query`` into structured filters and leftover free text"""
+        now = now or timezone.now()
+        filters = Q()
+        text = []
+        for match in TOKEN_RE.finditer(query):
+            token = match.group(0)
+            key, value = match.group(1), match.group(2)
+            if key is not None:
+                q = self._keyword(key.lower(), value.strip('"'), now)
+                if q is not None:
+                    filters &= q
+                    continue
+            elif '..' in token or DATE_RE.match(token):
+                q = Q()
+                for field in self.dates:
+                    date_q = date_filter(field, token, now)
+                    if date_q is None:
+                        break
+                    q |= date_q
+                else:
+                    filters &= q
+                    continue
+            text.append(token)
+        return ParsedQuery(filters, ' '.join(text))
+
+
+TASK_QUERY = QueryLanguage(
+    due='deadline',
+    created='created_at',
+    status='status',
+    priority='priority',
+    category='category',
+    dates=['deadline'],
+)
+
+NOTE_QUERY = QueryLanguage(
+    due='task__deadline',
+    created='created_at',
+    status='task__status',
+    priority='task__priority',
+    category='task__category',
+    dates=['created_at', 'task__deadline'],
+)
+
+
+def filter_tasks(queryset, params, ranked=False):
+    """
+    Apply TaskListView's ``q``/``status``/``priority``/``category`` request
+    parameters to a task queryset; shared with the export so both always
+    select the same tasks. ``ranked`` orders free-text matches by relevance.
+    """
+    # Structured tokens (status:, due:, dates...) become indexed filters,
+    # the remaining text goes to full-text search
+    query = params.get('q')
+    if query:
+        parsed = TASK_QUERY.parse(query)
+        queryset = queryset.filter(parsed.filters)
+        if parsed.text:
+            queryset = search_tasks(queryset, parsed.text, ranked=ranked)
+
+    # Apply status filter
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # Apply priority filter
+    priority_filter = params.get('priority')
+    if priority_filter:
+        queryset = queryset.filter(priority__id=priority_filter)
+
+    # Apply category filter
+    category_filter = params.get('category')
+    if category_filter:
+        queryset = queryset.filter(category__id=category_filter)
+
+    return queryset
+
+
+def filter_subtasks(queryset, params):
+    """Apply SubTaskListView's ``q``/``status`` request parameters to a subtask queryset"""
+    # Apply search filter
+    query = params.get('q')
+    if query:
+        queryset = search_subtasks(queryset, query)
+
+    # Apply status filter
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    return queryset
@@ -0,0 +1,114 @@
+"""
+Hangarin Task Management System - Reference data cache
+
+Categories and priorities are read on nearly every page (dashboard, task
+list filters, task forms, admin filters) but almost never change. Each
+process keeps the rows in memory, tagged with the model's version token
+(see hangarin.versions). Saving or deleting a category or priority replaces
+the token, and every process sharing the 'default' cache reloads the table
+on its next read. A read is then a cache lookup instead of a query.
+
+A process that does not see the new token (a per-process cache with several
+workers, or a write that bypassed the signals) still reloads once its copy
+is ``HANGARIN_REFDATA_MAX_AGE`` seconds old.
+"""
+import copy
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.forms.models import ModelChoiceIterator
+
+from hangarin import versions
+from hangarin.routers import primary
+from hangarin.models import Category, Priority
+
+
+REFERENCE_MODELS = (Category, Priority)
+
+# model label -> (version, time loaded, tuple of instances)
+_store = {}
+_lock = threading.Lock()
+
+
+def _expired(loaded_at):
+    max_age = getattr(settings, 'HANGARIN_REFDATA_MAX_AGE', 300)
+    return max_age is not None and time.monotonic() - loaded_at > max_age
+
+
+def get_objects(model):
+    """All rows of a reference model, in id order, from the process cache"""
+    label = model._meta.label_lower
+    version = versions.get_version(model)
+    entry = _store.get(label)
+    if entry is None or entry[0] != version or _expired(entry[1]):
+        with _lock:
+            # From the primary: a lagging replica could return rows older
+            # than the version they would be cached under
+            entry = (version, time.monotonic(), tuple(primary(model).order_by('id')))
+            _store[label] = entry
+    return entry[2]
+
+
+def get_object(model, pk):
+    """The cached row of a reference model with the given pk, or None"""
+    for obj in get_objects(model):
+        if str(obj.pk) == str(pk):
+            return obj
+    return None
+
+
+def categories():
+    return get_objects(Category)
+
+
+def priorities():
+    return get_objects(Priority)
+
+
+def version():
+    """Current version tokens of all reference models, for cache keys and ETags"""
+    return versions.get_versions(*REFERENCE_MODELS)
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """Choices of a ReferenceChoiceField, read from the process cache"""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in get_objects(self.queryset.model):
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(get_objects(self.queryset.model)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(get_objects(self.queryset.model))
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField for Category or Priority that renders and validates
+    against the cached rows instead of querying the table.
+    """
+    iterator = CachedModelChoiceIterator
+
+    def __init__(self, model, **kwargs):
+        super().__init__(model._default_manager.all(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        obj = get_object(self.queryset.model, value)
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        # A private copy: the cached instance is shared by every request
+        return copy.copy(obj)
@@ -0,0 +1,147 @@
+"""
+Hangarin Task Management System - Primary/replica database routing
+
+With ``HANGARIN_REPLICA_DATABASE`` set, GET requests to the read-only pages
+listed in ``HANGARIN_REPLICA_VIEWS`` (the dashboard, the lists and the task
+detail) read from the replica. Everything else reads from the primary, and
+every write goes to the primary.
+
+Read-your-writes: a replica lags behind its primary, so after a write
+request (any unsafe method) ReplicaRoutingMiddleware pins the session to the
+primary for ``HANGARIN_REPLICA_PIN_SECONDS``. A user who has just saved a
+task sees it on the list they are redirected to.
+
+Sessions always use the primary: they are written on login and read by
+every request. Caches keyed by version tokens (hangarin.versions) do not
+store rows read from the replica. A row that has not replicated yet would
+otherwise be cached under the version of the change that produced it.
+Reference data and dashboard counters are therefore loaded from the
+primary. Pages read from the replica use cached template fragments but do
+not store new ones.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, router
+
+
+# Apps whose tables are never read from the replica
+PRIMARY_APPS = {'sessions'}
+# Session key holding the time until which the session reads from the primary
+PIN_SESSION_KEY = '_hangarin_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# [flag] per request: True once the request is routed to the replica
+_use_replica = ContextVar('hangarin_use_replica', default=None)
+
+
+def primary_database():
+    return getattr(settings, 'HANGARIN_PRIMARY_DATABASE', DEFAULT_DB_ALIAS)
+
+
+def replica_database():
+    return getattr(settings, 'HANGARIN_REPLICA_DATABASE', None)
+
+
+def reading_from_replica():
+    """True if the current request reads from the replica"""
+    state = _use_replica.get()
+    return bool(state and state[0] and replica_database())
+
+
+def primary(model):
+    """``model``'s default manager on the database its writes go to"""
+    return model._default_manager.db_manager(router.db_for_write(model))
+
+
+def _hinted_database(hints):
+    # As Django routes by default: an instance stays on the database it came from
+    instance = hints.get('instance')
+    return instance._state.db if instance is not None else None
+
+
+class PrimaryReplicaRouter:
+    """Reads from the replica inside replica-routed requests, everything else on the primary"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in PRIMARY_APPS and reading_from_replica():
+            return replica_database()
+        return _hinted_database(hints) or primary_database()
+
+    def db_for_write(self, model, **hints):
+        database = _hinted_database(hints)
+        if database is None or database == replica_database():
+            return primary_database()
+        return database
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        databases = {primary_database(), replica_database()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A replica receives its schema from the primary
+        if db == replica_database():
+            return False
+        return None
+
+
+def is_pinned(request):
+    pinned_until = request.session.get(PIN_SESSION_KEY)
+    return pinned_until is not None and pinned_until > time.time()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Choose the database a request reads from. Goes after SessionMiddleware
+    and AuthenticationMiddleware: it reads the pin from the session, and the
+    session saves it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # A list, so process_view() can flip it from another context copy
+        token = _use_replica.set([False])
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = _use_replica.set([False])
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        # The session may not be loaded yet
+        return await sync_to_async(self.pin)(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not replica_database() or request.method not in ('GET', 'HEAD'):
+            return None
+        if request.resolver_match.url_name in getattr(settings, 'HANGARIN_REPLICA_VIEWS', ()):
+            if not is_pinned(request):
+                _use_replica.get()[0] = True
+        return None
+
+    def pin(self, request, response):
+        if replica_database() and request.method not in SAFE_METHODS:
+            user = getattr(request, 'user', None)
+            # Anonymous writes (a failed login, a logout) have nothing to read back
+            if user is not None and user.is_authenticated:
+                request.session[PIN_SESSION_KEY] = time.time() + getattr(settings, 'HANGARIN_REPLICA_PIN_SECONDS', 10)
+        return response
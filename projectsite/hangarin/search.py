@@ -0,0 +1,301 @@
+"""
+Hangarin Task Management System - Full-text search
+
+On SQLite the searchable text of tasks, subtasks and notes is mirrored into
+FTS5 virtual tables kept in sync by triggers, so searches become indexed
+MATCH lookups with prefix matching instead of ``LIKE '%q%'`` scans:
+
+* ``hangarin_task_fts`` stores title, description, status and the category
+  and priority names, so one MATCH covers everything the task search looks
+  at. It is exposed to the ORM as ``TaskSearchEntry`` (joined through
+  ``Task.search_entry``) for bm25 ranking.
+* ``hangarin_subtask_fts`` (title, status) and ``hangarin_note_fts``
+  (content) are external content tables over their source rows.
+
+Other database backends, or SQLite builds without FTS5, fall back to the
+``icontains`` lookups the list views used before. Dates and other
+structured tokens never reach this module; hangarin.query handles them.
+"""
+import re
+
+from django.db import connections, DEFAULT_DB_ALIAS, OperationalError
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from hangarin.models import Task, Category, Priority, SubTask, Note, ArchivedTask
+
+
+class SearchIndex:
+    """
+    An FTS5 table mirroring text derived from one model's rows.
+
+    ``columns`` maps each index column to an SQL expression over the row,
+    written with a ``{row}`` placeholder (``new``/``old`` in triggers).
+    Indexes whose columns are all plain columns of the source table are
+    created as external content tables and do not store the text twice.
+    """
+
+    def __init__(self, model, columns, weights, dependencies=()):
+        self.model = model
+        self.columns = columns
+        self.weights = weights
+        # (model, column, source foreign key) whose changes must be copied in
+        self.dependencies = dependencies
+
+    @property
+    def source(self):
+        return self.model._meta.db_table
+
+    @property
+    def table(self):
+        return f'{self.source}_fts'
+
+    @property
+    def external(self):
+        return all(expression == f'{{row}}.{name}' for name, expression in self.columns.items())
+
+    def _values(self, row):
+        return ', '.join(expression.format(row=row) for expression in self.columns.values())
+
+    def create_sql(self):
+        """Idempotent DDL for the virtual table and its sync triggers"""
+        table, source = self.table, self.source
+        names = ', '.join(self.columns)
+        options = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+        if self.external:
+            options = f"content='{source}', content_rowid='id', {options}"
+            delete = f"INSERT INTO {table}({table}, rowid, {names}) VALUES ('delete', old.id, {self._values('old')});"
+        else:
+            delete = f'DELETE FROM {table} WHERE rowid = old.id;'
+        insert = f"INSERT INTO {table}(rowid, {names}) SELECT new.id, {self._values('new')};"
+        watched = ', '.join(sorted({
+            re.search(r'\{row\}\.(\w+)', expression).group(1) for expression in self.columns.values()
+        }))
+
+        statements = [
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({names}, {options})',
+            f'CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON {source} BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON {source} BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {watched} ON {source} '
+            f'BEGIN {delete} {insert} END',
+        ]
+        for model, column, foreign_key in self.dependencies:
+            related = model._meta.db_table
+            statements.append(
+                f'CREATE TRIGGER IF NOT EXISTS {table}_{related}_au AFTER UPDATE OF name ON {related} '
+                f'BEGIN UPDATE {table} SET {column} = new.name '
+                f'WHERE rowid IN (SELECT id FROM {source} WHERE {foreign_key} = new.id); END'
+            )
+        return statements
+
+    def drop_triggers_sql(self):
+        triggers = ['ai', 'ad', 'au'] + [f'{model._meta.db_table}_au' for model, _, _ in self.dependencies]
+        return [f'DROP TRIGGER IF EXISTS {self.table}_{suffix}' for suffix in triggers]
+
+    def drop_sql(self):
+        return self.drop_triggers_sql() + [f'DROP TABLE IF EXISTS {self.table}']
+
+    def populate_sql(self):
+        """Statements filling a new index from existing rows and setting its ranking"""
+        weights = ', '.join(str(weight) for weight in self.weights)
+        statements = [f"INSERT INTO {self.table}({self.table}, rank) VALUES ('rank', 'bm25({weights})')"]
+        if self.external:
+            statements.append(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+        else:
+            statements.append(
+                f"INSERT INTO {self.table}(rowid, {', '.join(self.columns)}) "
+                f"SELECT id, {self._values(self.source)} FROM {self.source}"
+            )
+        return statements
+
+    def match(self, expression):
+        """Subquery of primary keys whose text matches ``expression``"""
+        return RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [expression])
+
+
+TASK_INDEX = SearchIndex(
+    Task,
+    {
+        'title': '{row}.title',
+        'description': '{row}.description',
+        'status': '{row}.status',
+        'category': '(SELECT name FROM hangarin_category WHERE id = {row}.category_id)',
+        'priority': '(SELECT name FROM hangarin_priority WHERE id = {row}.priority_id)',
+    },
+    weights=[10.0, 1.0, 2.0, 2.0, 2.0],
+    dependencies=[(Category, 'category', 'category_id'), (Priority, 'priority', 'priority_id')],
+)
+SUBTASK_INDEX = SearchIndex(SubTask, {'title': '{row}.title', 'status': '{row}.status'}, weights=[2.0, 1.0])
+NOTE_INDEX = SearchIndex(Note, {'content': '{row}.content'}, weights=[1.0])
+SEARCH_INDEXES = [TASK_INDEX, SUBTASK_INDEX, NOTE_INDEX]
+
+# Database alias -> whether the FTS tables are usable there
+_available = {}
+
+
+def install_search_indexes(connection):
+    """
+    Create any missing FTS tables and triggers on a SQLite connection.
+
+    Safe to run repeatedly: SQLite drops a table's triggers when a migration
+    rebuilds the table, so this also runs after every ``migrate``. Newly
+    created indexes are filled from the existing rows.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [index.table])
+            exists = cursor.fetchone() is not None
+            try:
+                for statement in index.create_sql():
+                    cursor.execute(statement)
+            except OperationalError:
+                # SQLite compiled without FTS5: keep using the fallback
+                return
+            if not exists:
+                for statement in index.populate_sql():
+                    cursor.execute(statement)
+    _available.pop(connection.alias, None)
+
+
+def uninstall_search_indexes(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES:
+            for statement in index.drop_sql():
+                cursor.execute(statement)
+    _available.pop(connection.alias, None)
+
+
+def drop_search_triggers(connection):
+    """
+    Drop the sync triggers but keep the indexed text. For migrations that
+    rebuild a source table: SQLite refuses to rename a table that triggers
+    on other tables refer to. install_search_indexes() restores them.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for index in SEARCH_INDEXES:
+            for statement in index.drop_triggers_sql():
+                cursor.execute(statement)
+
+
+def fts_available(using=DEFAULT_DB_ALIAS):
+    """Whether the full-text tables exist on the given database"""
+    if using not in _available:
+        connection = connections[using]
+        available = False
+        if connection.vendor == 'sqlite':
+            tables = [index.table for index in SEARCH_INDEXES]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (%s, %s, %s)",
+                    tables,
+                )
+                available = cursor.fetchone()[0] == len(tables)
+        _available[using] = available
+    return _available[using]
+
+
+def match_expression(query, column=None):
+    """
+    Build an FTS5 query matching every word of ``query`` as a prefix.
+
+    User input never reaches FTS5 syntax directly: words are extracted and
+    quoted, so operators and stray quotes cannot produce a syntax error.
+    Returns None when the query contains no searchable words.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    expression = ' '.join(f'"{word}"*' for word in words)
+    if column:
+        expression = f'{column} : ({expression})'
+    return expression
+
+
+def search_tasks(queryset, query, ranked=False):
+    """
+    Filter tasks by title, description, status, category or priority.
+
+    With ``ranked=True`` the queryset is ordered by bm25 relevance (title
+    matches weigh most), best first.
+    """
+    query = query.strip()
+    # Archived tasks (see hangarin.archive) have no full-text index
+    if queryset.model is ArchivedTask or not fts_available(queryset.db):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query) |
+            Q(priority__name__icontains=query) |
+            Q(status__icontains=query)
+        )
+
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+
+    queryset = queryset.filter(search_entry__document=expression)
+    if ranked:
+        queryset = queryset.annotate(search_rank=F('search_entry__rank')).order_by(
+            'search_rank', '-created_at', '-id',
+        )
+    return queryset
+
+
+def search_subtasks(queryset, query):
+    """Filter subtasks by their title, their parent task's title or status"""
+    query = query.strip()
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(parent_task__title__icontains=query) |
+            Q(status__icontains=query)
+        )
+
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(
+        Q(pk__in=SUBTASK_INDEX.match(expression)) |
+        Q(parent_task__in=TASK_INDEX.match(match_expression(query, column='title')))
+    )
+
+
+def search_notes(queryset, query):
+    """Filter notes by their content or their task's title"""
+    query = query.strip()
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(content__icontains=query) |
+            Q(task__title__icontains=query)
+        )
+
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(
+        Q(pk__in=NOTE_INDEX.match(expression)) |
+        Q(task__in=TASK_INDEX.match(match_expression(query, column='title')))
+    )
+
+
+def autocomplete_tasks(queryset, query):
+    """
+    Tasks for a title autocomplete: every word of ``query`` must start a
+    word of the title. Without a query the newest tasks are suggested.
+    """
+    query = query.strip()
+    if not query:
+        return queryset.order_by('-created_at', '-id')
+    if not fts_available(queryset.db):
+        return queryset.filter(title__istartswith=query).order_by('title', 'id')
+
+    expression = match_expression(query, column='title')
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(search_entry__document=expression).order_by('search_entry__rank', '-id')
@@ -0,0 +1,161 @@
+"""
+Hangarin Task Management System - Fake data generation
+
+Builds large synthetic datasets for development and load testing. Faker
+output is generated in batches of plain tuples (optionally in a pool of
+worker processes, since Faker itself is the slow part) and written with
+``bulk_create``, one transaction per batch.
+
+Each batch is generated from its own seed, so a given ``--seed`` produces the
+same rows whatever the number of workers.
+"""
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from hangarin import stats, versions
+from hangarin.models import Task, SubTask, Note, Category, Priority
+from hangarin.progress import initial_counts
+
+
+DEFAULT_CATEGORIES = ['Work', 'School', 'Personal', 'Finance', 'Projects']
+DEFAULT_PRIORITIES = ['High', 'Medium', 'Low', 'Critical', 'Optional']
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+
+
+@dataclass
+class SeedResult:
+    tasks: int = 0
+    subtasks: int = 0
+    notes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows(self):
+        return self.tasks + self.subtasks + self.notes
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def ensure_reference_data():
+    """Return all categories and priorities, creating the defaults if a table is empty"""
+    categories = list(Category.objects.all())
+    if not categories:
+        categories = Category.objects.bulk_create([Category(name=name) for name in DEFAULT_CATEGORIES])
+        versions.changed(Category)
+    priorities = list(Priority.objects.all())
+    if not priorities:
+        priorities = Priority.objects.bulk_create([Priority(name=name) for name in DEFAULT_PRIORITIES])
+        versions.changed(Priority)
+    return categories, priorities
+
+
+def generate_batch(size, subtasks_per_task, notes_per_task, seed):
+    """
+    Generate ``size`` task payloads with Faker.
+
+    Runs in worker processes, so it returns only picklable tuples and never
+    touches the database: ``(title, description, status, deadline,
+    category_slot, priority_slot, subtasks, notes)`` where the slots are
+    random numbers the caller maps onto its categories and priorities.
+    """
+    from faker import Faker
+
+    fake = Faker()
+    fake.seed_instance(seed)
+    batch = []
+    for _ in range(size):
+        batch.append((
+            fake.sentence(nb_words=5),
+            fake.paragraph(nb_sentences=3),
+            fake.random_element(STATUSES),
+            fake.date_time_between('-30d', '+60d', tzinfo=datetime.timezone.utc),
+            fake.random_int(0, 9999),
+            fake.random_int(0, 9999),
+            [(fake.sentence(nb_words=4), fake.random_element(STATUSES)) for _ in range(subtasks_per_task)],
+            [fake.paragraph(nb_sentences=2) for _ in range(notes_per_task)],
+        ))
+    return batch
+
+
+def _batches(tasks, batch_size, subtasks_per_task, notes_per_task, seed):
+    for number, start in enumerate(range(0, tasks, batch_size)):
+        yield min(batch_size, tasks - start), subtasks_per_task, notes_per_task, seed * 1_000_003 + number
+
+
+def _generate(batches, workers):
+    """Yield generated batches in order, keeping at most two per worker in flight"""
+    if workers <= 1:
+        for args in batches:
+            yield generate_batch(*args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for args in batches:
+            pending.append(executor.submit(generate_batch, *args))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def write_batch(batch, categories, priorities):
+    """Insert one generated batch in a single transaction"""
+    with transaction.atomic():
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=title,
+                description=description,
+                status=status,
+                deadline=deadline,
+                category=categories[category_slot % len(categories)],
+                priority=priorities[priority_slot % len(priorities)],
+                **initial_counts([subtask_status for _, subtask_status in subtasks], len(notes)),
+            )
+            for title, description, status, deadline, category_slot, priority_slot, subtasks, notes in batch
+        ])
+        subtasks = SubTask.objects.bulk_create([
+            SubTask(title=title, status=status, parent_task=task)
+            for task, payload in zip(tasks, batch)
+            for title, status in payload[6]
+        ])
+        notes = Note.objects.bulk_create([
+            Note(task=task, content=content)
+            for task, payload in zip(tasks, batch)
+            for content in payload[7]
+        ])
+    return len(tasks), len(subtasks), len(notes)
+
+
+def seed_tasks(tasks, subtasks_per_task=2, notes_per_task=2, batch_size=1000, seed=0, workers=1,
+               progress=None):
+    """
+    Create ``tasks`` fake tasks with their subtasks and notes.
+
+    ``progress`` is called with the running SeedResult after every batch.
+    bulk_create bypasses the model signals, so the dashboard counters are
+    rebuilt and the model versions bumped once at the end.
+    """
+    categories, priorities = ensure_reference_data()
+    result = SeedResult()
+    start = time.perf_counter()
+    batches = _batches(tasks, batch_size, subtasks_per_task, notes_per_task, seed)
+    for batch in _generate(batches, workers):
+        created = write_batch(batch, categories, priorities)
+        result.tasks += created[0]
+        result.subtasks += created[1]
+        result.notes += created[2]
+        result.seconds = time.perf_counter() - start
+        if progress:
+            progress(result)
+
+    stats.rebuild_counters()
+    versions.changed(Task, SubTask, Note)
+    result.seconds = time.perf_counter() - start
+    return result
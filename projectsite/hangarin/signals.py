@@ -0,0 +1,120 @@
+"""
+Hangarin Task Management System - Signal handlers
+"""
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from hangarin import progress, stats, versions
+from hangarin.models import Task, SubTask, Note, Category, Priority
+from hangarin.search import install_search_indexes
+
+
+def _stats_key(task):
+    """What ``task`` counts towards; None once it is soft-deleted (see hangarin.trash)"""
+    if task.deleted_at is not None:
+        return None
+    return (task.status, task.category_id, task.priority_id)
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_state(sender, instance, raw=False, **kwargs):
+    """Record the stored status/category/priority before an update"""
+    instance._stats_previous = None
+    if raw or stats.updates_deferred() or instance._state.adding or instance.pk is None:
+        return
+    instance._stats_previous = (
+        Task.all_objects.filter(pk=instance.pk)
+        .values_list('status', 'category_id', 'priority_id', 'deleted_at')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Task)
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """Apply the dashboard counter delta once the save is committed"""
+    if raw or stats.updates_deferred():
+        return
+    previous = None if created else getattr(instance, '_stats_previous', None)
+    new = _stats_key(instance)
+    if not created and previous is None:
+        # Unknown previous state: cheaper to recount than to guess
+        transaction.on_commit(stats.invalidate_counters)
+        return
+    # A soft-deleted task counts for nothing (see hangarin.trash)
+    old = None if previous is None or previous[3] is not None else previous[:3]
+    transaction.on_commit(lambda: stats.apply_delta(old, new))
+
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_delete(sender, instance, **kwargs):
+    """Remove a deleted task from the dashboard counters"""
+    if stats.updates_deferred():
+        return
+    old = _stats_key(instance)
+    transaction.on_commit(lambda: stats.apply_delta(old, None))
+
+
+@receiver(pre_save, sender=SubTask)
+@receiver(pre_save, sender=Note)
+def remember_counted_state(sender, instance, raw=False, **kwargs):
+    """Record the stored task (and status) of a subtask or note before an update"""
+    instance._progress_previous = None
+    if raw or progress.updates_deferred() or instance._state.adding or instance.pk is None:
+        return
+    fields = ('parent_task_id', 'status') if sender is SubTask else ('task_id',)
+    row = sender.all_objects.filter(pk=instance.pk).values_list(*fields, 'deleted_at').first()
+    if row is not None:
+        # (task_id, status, deleted_at)
+        instance._progress_previous = row if sender is SubTask else (row[0], None, row[1])
+
+
+@receiver(post_save, sender=SubTask)
+@receiver(post_save, sender=Note)
+def update_progress_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    """Move a saved subtask or note in the counters of its task(s)"""
+    if raw or progress.updates_deferred():
+        return
+    new = progress.counted_state(instance)
+    if not created and getattr(instance, '_progress_previous', None) is None:
+        # Unknown previous state: cheaper to recount than to guess
+        progress.recount(Task.objects.db_manager(using).filter(pk=progress.task_id(instance)))
+        return
+    previous = None if created else instance._progress_previous
+    # A soft-deleted row counts for nothing (see hangarin.trash)
+    old = None if previous is None or previous[2] is not None else previous[:2]
+    progress.apply_delta(sender, old, new, using=using)
+
+
+@receiver(post_delete, sender=SubTask)
+@receiver(post_delete, sender=Note)
+def update_progress_on_delete(sender, instance, origin=None, using=None, **kwargs):
+    """Remove a deleted subtask or note from the counters of its task"""
+    if progress.updates_deferred():
+        return
+    # Deleted along with its task (or the task's category or priority): no
+    # counter left to update
+    if origin is not None and getattr(origin, 'model', type(origin)) is not sender:
+        return
+    progress.apply_delta(sender, progress.counted_state(instance), None, using=using)
+
+
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=SubTask)
+@receiver([post_save, post_delete], sender=Note)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Priority)
+def bump_model_version(sender, raw=False, **kwargs):
+    """Replace the version token of the changed model (see hangarin.versions)"""
+    # Bulk operations record their change once, at the end
+    if raw or stats.updates_deferred():
+        return
+    versions.changed(sender, using=kwargs.get('using'))
+
+
+def reinstall_search_indexes(sender, using, **kwargs):
+    """Restore FTS triggers dropped when a migration rebuilt a table"""
+    connection = connections[using]
+    if ('hangarin', '0002_search_index') in MigrationRecorder(connection).applied_migrations():
+        install_search_indexes(connection)
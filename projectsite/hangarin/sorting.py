@@ -0,0 +1,45 @@
+"""
+Hangarin Task Management System - Whitelisted list ordering
+
+List views declare the sort keys they accept and the ordering each one maps
+to. Every ordering ends in a unique tiebreaker and is backed by an index
+(see the Meta.indexes of the models), so no request can make the database
+sort a whole table by an arbitrary column. Unknown keys are rejected with
+400 Bad Request.
+"""
+from django.core.exceptions import BadRequest
+
+
+class SortMixin:
+    """
+    ListView mixin resolving the ``order_by`` parameter through a registry.
+
+    ``sort_options`` maps public sort keys to ``(label, ordering)``; an
+    ordering of None leaves the queryset order to the view (e.g. relevance).
+    """
+    sort_options = {}
+    default_sort = None
+    sort_param = 'order_by'
+
+    def get_sort_options(self):
+        return self.sort_options
+
+    def get_default_sort(self):
+        return self.default_sort
+
+    def get_sort_key(self):
+        if not hasattr(self, '_sort_key'):
+            key = self.request.GET.get(self.sort_param) or self.get_default_sort()
+            if key not in self.get_sort_options():
+                raise BadRequest(f'Unknown sort key: {key}')
+            self._sort_key = key
+        return self._sort_key
+
+    def get_ordering(self):
+        return self.get_sort_options()[self.get_sort_key()][1]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['order_by'] = self.get_sort_key()
+        context['sort_choices'] = [(key, label) for key, (label, _) in self.get_sort_options().items()]
+        return context
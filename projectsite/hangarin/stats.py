@@ -0,0 +1,273 @@
+"""
+Hangarin Task Management System - Dashboard statistics
+
+All dashboard counters come from a single grouped pass over the task table:
+one row per (category, priority) pair carrying a per-status count. Totals,
+per-status, per-category and per-priority figures are folded from those rows
+in Python, so the number of queries does not grow with the number of
+categories or priorities.
+
+The raw counters are kept in Django's 'default' cache, shared by the worker
+processes (see the CACHES setting), and maintained incrementally from Task
+signals (see hangarin.signals), so a warm dashboard does not touch the task
+table at all. The cache is rebuilt on a miss, when a counter goes negative,
+on expiry, or when the periodic drift check finds that the cached counters
+no longer match a recount of the table by status, category and priority.
+Bulk operations wrap themselves in deferred_updates() to replace the
+per-task updates with a single invalidation.
+
+Archived tasks (see hangarin.archive) are counted from their precomputed
+ArchiveTotal rows and added to the live counts when the counters are built.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from hangarin import refdata
+from hangarin.models import Task, ArchiveTotal
+from hangarin.routers import primary
+
+
+# Task status value -> key used in the stats dictionaries and templates
+STATUS_KEYS = {
+    'Pending': 'pending',
+    'In Progress': 'in_progress',
+    'Completed': 'completed',
+}
+
+
+def empty_counts():
+    """Return a zeroed per-status counter"""
+    return {status: 0 for status in STATUS_KEYS}
+
+
+def count_tasks(queryset=None):
+    """
+    Count tasks grouped by category, priority and status in one query.
+
+    Returns a dict of raw counters keyed by status value and by
+    category/priority id::
+
+        {
+            'status': {'Pending': 3, 'In Progress': 1, 'Completed': 2},
+            'category': {1: {'Pending': 2, ...}, ...},
+            'priority': {1: {'Pending': 1, ...}, ...},
+        }
+    """
+    if queryset is None:
+        # From the primary: the counters are cached until the next change
+        queryset = primary(Task).all()
+
+    annotations = {
+        key: Count('id', filter=Q(status=status))
+        for status, key in STATUS_KEYS.items()
+    }
+    rows = (
+        queryset.order_by()
+        .values('category_id', 'priority_id')
+        .annotate(**annotations)
+    )
+
+    counters = {'status': empty_counts(), 'category': {}, 'priority': {}}
+    for row in rows:
+        category = counters['category'].setdefault(row['category_id'], empty_counts())
+        priority = counters['priority'].setdefault(row['priority_id'], empty_counts())
+        for status, key in STATUS_KEYS.items():
+            counters['status'][status] += row[key]
+            category[status] += row[key]
+            priority[status] += row[key]
+    return counters
+
+
+def count_archived(counters):
+    """
+    Add the archived tasks to ``counters`` from count_tasks(), from the
+    ArchiveTotal rows kept by the archive; their sum goes in
+    ``counters['archived']``.
+    """
+    archived = 0
+    rows = primary(ArchiveTotal).values_list('status', 'category_id', 'priority_id', 'count')
+    for status, category_id, priority_id, count in rows:
+        if _shift(counters, (status, category_id, priority_id), count):
+            archived += count
+    counters['archived'] = archived
+    return counters
+
+
+def _breakdown(name, counts):
+    """Shape a per-status counter the way home.html expects it"""
+    stats = {'name': name, 'total': sum(counts.values())}
+    for status, key in STATUS_KEYS.items():
+        stats[key] = counts.get(status, 0)
+    return stats
+
+
+def build_dashboard_stats(counters, categories, priorities):
+    """
+    Turn raw counters into the dashboard context.
+
+    ``categories`` and ``priorities`` are iterables of model instances; every
+    one of them gets an entry, including those without any tasks.
+    """
+    status = counters['status']
+    stats = {
+        'total_tasks': sum(status.values()),
+        'archived_tasks': counters.get('archived', 0),
+        'category_stats': [
+            _breakdown(category.name, counters['category'].get(category.pk, {}))
+            for category in categories
+        ],
+        'priority_stats': [
+            _breakdown(priority.name, counters['priority'].get(priority.pk, {}))
+            for priority in priorities
+        ],
+    }
+    for value, key in STATUS_KEYS.items():
+        stats[f'{key}_tasks'] = status.get(value, 0)
+    return stats
+
+
+STATS_CACHE_KEY = 'hangarin:dashboard-stats'
+
+# Serializes read-modify-write updates of the cached counters in this process
+_lock = threading.Lock()
+
+# True inside deferred_updates()
+_deferred = ContextVar('hangarin_stats_deferred', default=False)
+
+
+def _cache_timeout():
+    return getattr(settings, 'HANGARIN_STATS_CACHE_TIMEOUT', 3600)
+
+
+def _verify_interval():
+    return getattr(settings, 'HANGARIN_STATS_VERIFY_INTERVAL', 300)
+
+
+def rebuild_counters():
+    """Recount every live task, add the archived ones and replace the cached counters"""
+    counters = count_archived(count_tasks())
+    with _lock:
+        cache.set(STATS_CACHE_KEY, {'counters': counters, 'verified_at': time.time()}, _cache_timeout())
+    return counters
+
+
+def invalidate_counters():
+    """Drop the cached counters; the next read rebuilds them"""
+    cache.delete(STATS_CACHE_KEY)
+
+
+@contextmanager
+def deferred_updates(using=None):
+    """
+    Skip the per-task counter updates of the Task signals inside the block
+    and invalidate the counters once instead, when the surrounding
+    transaction commits. For bulk updates and deletes of many tasks.
+    """
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        transaction.on_commit(invalidate_counters, using=using)
+
+
+def updates_deferred():
+    return _deferred.get()
+
+
+def _comparable(counters):
+    """``counters`` without the buckets left empty by moves, for comparisons"""
+    return {
+        'status': counters['status'],
+        'category': {pk: counts for pk, counts in counters['category'].items() if any(counts.values())},
+        'priority': {pk: counts for pk, counts in counters['priority'].items() if any(counts.values())},
+        'archived': counters.get('archived', 0),
+    }
+
+
+def _has_drifted(counters, fresh=None):
+    """
+    Whether cached ``counters`` differ from ``fresh`` ones, by default a
+    recount (one grouped query): status, category and priority moves made
+    without the signals leave the total unchanged, so it is not enough.
+    """
+    if fresh is None:
+        fresh = count_archived(count_tasks())
+    return _comparable(counters) != _comparable(fresh)
+
+
+def get_counters():
+    """Return the cached counters, rebuilding them when missing or stale"""
+    entry = cache.get(STATS_CACHE_KEY)
+    if entry is None:
+        return rebuild_counters()
+
+    if time.time() - entry['verified_at'] > _verify_interval():
+        fresh = count_archived(count_tasks())
+        if _has_drifted(entry['counters'], fresh):
+            entry['counters'] = fresh
+        entry['verified_at'] = time.time()
+        with _lock:
+            cache.set(STATS_CACHE_KEY, entry, _cache_timeout())
+    return entry['counters']
+
+
+def _shift(counters, key, amount):
+    """Move one task in or out of the counters; return False on underflow"""
+    status, category_id, priority_id = key
+    if status not in STATUS_KEYS:
+        return True
+    buckets = [
+        counters['status'],
+        counters['category'].setdefault(category_id, empty_counts()),
+        counters['priority'].setdefault(priority_id, empty_counts()),
+    ]
+    for bucket in buckets:
+        bucket[status] += amount
+        if bucket[status] < 0:
+            return False
+    return True
+
+
+def apply_delta(old=None, new=None):
+    """
+    Update the cached counters for a single task change.
+
+    ``old`` and ``new`` are ``(status, category_id, priority_id)`` tuples
+    describing the task before and after the change; ``None`` means the task
+    did not exist on that side. If nothing is cached there is nothing to do,
+    and an impossible result (a negative count) drops the cache so the next
+    read rebuilds it.
+    """
+    if old == new:
+        return
+    with _lock:
+        entry = cache.get(STATS_CACHE_KEY)
+        if entry is None:
+            return
+        counters = entry['counters']
+        consistent = True
+        if old is not None:
+            consistent = _shift(counters, old, -1) and consistent
+        if new is not None:
+            consistent = _shift(counters, new, 1) and consistent
+        if consistent:
+            cache.set(STATS_CACHE_KEY, entry, _cache_timeout())
+        else:
+            cache.delete(STATS_CACHE_KEY)
+
+
+def get_dashboard_stats(categories=None, priorities=None):
+    """Return the full set of dashboard statistics from the cached counters"""
+    if categories is None:
+        categories = refdata.categories()
+    if priorities is None:
+        priorities = refdata.priorities()
+    return build_dashboard_stats(get_counters(), categories, priorities)
@@ -0,0 +1,17 @@
+"""
+Hangarin Task Management System - Pagination template filters
+"""
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page, size=2):
+    """
+    Page numbers within ``size`` of the current page, for the numbered links.
+    Looping over ``paginator.page_range`` instead costs one iteration per
+    page of the whole list.
+    """
+    number, last = page.number, page.paginator.num_pages
+    return range(max(1, number - size), min(last, number + size) + 1)
@@ -0,0 +1,48 @@
+"""
+Hangarin Task Management System - Test helpers
+
+QueryBudgetTestMixin turns the per-view query budgets into regression
+tests: every named route of the project URLconf must have an entry in
+``settings.HANGARIN_QUERY_BUDGETS``, a GET of it with cold caches (counters,
+reference data and fragments rebuilt) must stay within its
+``HANGARIN_COLD_QUERY_BUDGETS`` limit, and the next GET, with warm caches,
+within the tighter warm budget.
+"""
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import get_resolver, URLPattern
+
+from hangarin.instrumentation import get_query_budget
+
+
+def project_url_names(urlconf=None):
+    """Names of the routes defined directly in the project URLconf (not included apps)"""
+    return [
+        pattern.name for pattern in get_resolver(urlconf).url_patterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    ]
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin checking views against their query budgets"""
+
+    def assertWithinQueryBudget(self, url, view_name, data=None):
+        """GET ``url`` with cold caches, then again with warm ones; return the warm metrics"""
+        self.assertIsNotNone(get_query_budget(view_name), f'{view_name} has no entry in HANGARIN_QUERY_BUDGETS')
+        # The version tokens go too, so the reference data reloads as well
+        for alias in caches:
+            caches[alias].clear()
+        for state in ('cold', 'warm'):
+            budget = get_query_budget(view_name, cold=state == 'cold')
+            with override_settings(HANGARIN_QUERY_BUDGET_MODE='log'):
+                response = self.client.get(url, data)
+            # 405: a POST-only route, measured up to the method check
+            self.assertTrue(response.status_code < 400 or response.status_code == 405,
+                            f'GET {url} returned {response.status_code}')
+            metrics = response.wsgi_request.metrics
+            self.assertLessEqual(
+                metrics.queries, budget,
+                f'{view_name} ran {metrics.queries} queries with {state} caches (budget {budget}):\n'
+                + '\n'.join(metrics.sql),
+            )
+        return metrics
@@ -1,3 +1,1630 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import json
+import shutil
+import sqlite3
+import tempfile
+import time
+import warnings
+from contextlib import closing
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django import forms
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import Paginator
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, NoReverseMatch
+from django.utils import timezone
+from django.views import View
+
+from hangarin import progress, refdata, stats, versions
+from hangarin.archive import ARCHIVE_CHOICES, archive_tasks
+from hangarin.benchmarks import add_sqlite_database, remove_database
+from hangarin.bulk import bulk_delete, bulk_update
+from hangarin.checks import check_shared_cache
+from hangarin.conditional import ConditionalGetMixin
+from hangarin.deletion import DeleteResult, delete_object, run_job, schedule
+from hangarin.forms import TaskForm
+from hangarin.export import stream_export
+from hangarin.importer import import_tasks
+from hangarin.instrumentation import QueryBudgetExceeded
+from hangarin.management.commands.benchmark_routes import SCENARIOS
+from hangarin.models import Task, Category, Priority, SubTask, Note, DeletionJob, ArchivedTask, ArchiveTotal
+from hangarin.pagination import CursorPaginator, estimated_row_count
+from hangarin.query import TASK_QUERY, NOTE_QUERY
+from hangarin.routers import PIN_SESSION_KEY
+from hangarin.search import search_tasks, search_subtasks, search_notes
+from hangarin.seeding import seed_tasks, DEFAULT_CATEGORIES, DEFAULT_PRIORITIES
+from hangarin.stats import get_dashboard_stats
+from hangarin.templatetags.pagination_tags import page_window
+from hangarin.testing import QueryBudgetTestMixin, project_url_names
+from hangarin.trash import restore, soft_delete
+
+
+def make_task(category, priority, status='Pending', **kwargs):
+    kwargs.setdefault('title', 'Task')
+    kwargs.setdefault('description', 'Description')
+    return Task.objects.create(category=category, priority=priority, status=status, **kwargs)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.high = Priority.objects.create(name='High')
+        self.low = Priority.objects.create(name='Low')
+
+    def test_counts_match_per_status_breakdown(self):
+        make_task(self.work, self.high, 'Pending')
+        make_task(self.work, self.low, 'Completed')
+        make_task(self.home, self.high, 'In Progress')
+        make_task(self.home, self.high, 'Completed')
+
+        stats = get_dashboard_stats()
+
+        self.assertEqual(stats['total_tasks'], 4)
+        self.assertEqual(stats['pending_tasks'], 1)
+        self.assertEqual(stats['in_progress_tasks'], 1)
+        self.assertEqual(stats['completed_tasks'], 2)
+        self.assertIn(
+            {'name': 'Work', 'total': 2, 'pending': 1, 'in_progress': 0, 'completed': 1},
+            stats['category_stats'],
+        )
+        self.assertIn(
+            {'name': 'High', 'total': 3, 'pending': 1, 'in_progress': 1, 'completed': 1},
+            stats['priority_stats'],
+        )
+
+    def test_empty_categories_are_listed(self):
+        Category.objects.create(name='Unused')
+        stats = get_dashboard_stats()
+        self.assertIn(
+            {'name': 'Unused', 'total': 0, 'pending': 0, 'in_progress': 0, 'completed': 0},
+            stats['category_stats'],
+        )
+
+    def test_query_count_is_independent_of_category_count(self):
+        make_task(self.work, self.high)
+        # Reference data, live counts and archive totals
+        with self.assertNumQueries(4):
+            get_dashboard_stats()
+
+        for i in range(25):
+            category = Category.objects.create(name=f'Category {i}')
+            priority = Priority.objects.create(name=f'Priority {i}')
+            make_task(category, priority, 'Completed')
+        cache.clear()
+        with self.assertNumQueries(4):
+            get_dashboard_stats()
+
+    def test_home_view_renders_stats(self):
+        make_task(self.work, self.high)
+        user = User.objects.create_user('tester', password='secret')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('home'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_tasks'], 1)
+        self.assertEqual(len(response.context['category_stats']), 2)
+
+
+class DashboardStatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.low = Priority.objects.create(name='Low')
+
+    def test_warm_cache_skips_task_table(self):
+        make_task(self.work, self.high)
+        stats.get_counters()
+        with self.assertNumQueries(0):
+            counters = stats.get_counters()
+        self.assertEqual(counters['status']['Pending'], 1)
+
+    def test_signals_apply_incremental_deltas(self):
+        task = make_task(self.work, self.high)
+        stats.get_counters()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_task(self.work, self.low, 'Completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = 'In Progress'
+            task.priority = self.low
+            task.save()
+
+        counters = stats.get_counters()
+        self.assertEqual(counters['status'], {'Pending': 0, 'In Progress': 1, 'Completed': 1})
+        self.assertEqual(counters['priority'][self.high.pk]['Pending'], 0)
+        self.assertEqual(counters['priority'][self.low.pk]['In Progress'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertEqual(stats.get_counters()['status']['In Progress'], 0)
+
+    @override_settings(HANGARIN_STATS_VERIFY_INTERVAL=-1)
+    def test_drift_triggers_rebuild(self):
+        stats.get_counters()
+        # Created without running the on-commit delta, so the cache drifts
+        make_task(self.work, self.high)
+        self.assertEqual(stats.get_counters()['status']['Pending'], 1)
+
+    @override_settings(HANGARIN_STATS_VERIFY_INTERVAL=-1)
+    def test_drift_check_catches_moves_that_keep_the_total(self):
+        task = make_task(self.work, self.high)
+        stats.get_counters()
+        # Moved without signals, as by another process with a stale cache
+        Task.objects.filter(pk=task.pk).update(status='Completed', priority=self.low)
+        counters = stats.get_counters()
+        self.assertEqual(counters['status'], {'Pending': 0, 'In Progress': 0, 'Completed': 1})
+        self.assertEqual(counters['priority'][self.low.pk]['Completed'], 1)
+        self.assertFalse(stats._has_drifted(counters))
+
+    def test_underflow_drops_cache(self):
+        stats.get_counters()
+        stats.apply_delta(('Pending', self.work.pk, self.high.pk), None)
+        self.assertIsNone(cache.get(stats.STATS_CACHE_KEY))
+
+    def test_rebuild_command(self):
+        make_task(self.work, self.high)
+        call_command('rebuild_dashboard_stats', stdout=StringIO())
+        self.assertEqual(cache.get(stats.STATS_CACHE_KEY)['counters']['status']['Pending'], 1)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Work')
+        priority = Priority.objects.create(name='High')
+        self.tasks = [make_task(category, priority, title=f'Task {i:02}') for i in range(25)]
+        # Force ties on created_at so the id tiebreaker matters
+        Task.objects.filter(pk__in=[t.pk for t in self.tasks[5:15]]).update(created_at=self.tasks[5].created_at)
+        self.user = User.objects.create_user('tester', password='secret')
+
+    def walk(self, paginator):
+        seen = []
+        page = paginator.page()
+        seen.extend(page.object_list)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen.extend(page.object_list)
+        return seen, page
+
+    def test_forward_walk_matches_offset_order(self):
+        queryset = Task.objects.order_by('-created_at')
+        seen, _ = self.walk(CursorPaginator(queryset, 10))
+        self.assertEqual(seen, list(queryset.order_by('-created_at', '-id')))
+
+    def test_backward_walk_returns_previous_pages(self):
+        paginator = CursorPaginator(Task.objects.order_by('title'), 10)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(back.object_list, first.object_list)
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_page_cost_does_not_depend_on_depth(self):
+        paginator = CursorPaginator(Task.objects.order_by('deadline'), 5, count_total=False)
+        page = paginator.page()
+        while page.has_next():
+            with self.assertNumQueries(1):
+                page = paginator.page(page.next_cursor)
+        self.assertIsNone(paginator.count)
+
+    def test_list_view_cursor_mode(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('task-list'), {'paginate': 'cursor', 'order_by': 'title'})
+        self.assertEqual(response.context['pagination_mode'], 'cursor')
+        self.assertEqual([t.title for t in response.context['tasks']], [f'Task {i:02}' for i in range(10)])
+
+        response = self.client.get(reverse('task-list'), {
+            'order_by': 'title', 'cursor': response.context['page_obj'].next_cursor,
+        })
+        self.assertEqual(response.context['tasks'][0].title, 'Task 10')
+        self.assertContains(response, 'cursor=')
+
+    def test_invalid_cursor_is_404(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('note-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_null_cursor_values_are_404(self):
+        self.client.force_login(self.user)
+        cursor = base64.urlsafe_b64encode(b'{"v":[null,null],"b":false}').decode().rstrip('=')
+        response = self.client.get(reverse('task-list'), {'order_by': 'title', 'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def test_nullable_ordering_is_not_cursor_paginated(self):
+        with self.assertRaises(ValueError):
+            CursorPaginator(Task.all_objects.order_by('deleted_at'), 10)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.report = make_task(self.work, self.high, title='Quarterly report', description='Numbers')
+        self.other = make_task(self.work, self.high, title='Groceries', description='Buy paper for the report')
+
+    def search(self, query, **kwargs):
+        return list(search_tasks(Task.objects.all(), query, **kwargs))
+
+    def test_prefix_match_ranks_title_first(self):
+        self.assertEqual(self.search('rep', ranked=True), [self.report, self.other])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.report.title = 'Annual summary'
+        self.report.description = 'Totals'
+        self.report.save()
+        self.assertEqual(self.search('quarterly'), [])
+        self.assertEqual(self.search('annual'), [self.report])
+
+        self.other.delete()
+        self.assertEqual(self.search('paper'), [])
+
+    def test_category_rename_is_searchable(self):
+        self.work.name = 'Office'
+        self.work.save()
+        self.assertEqual(len(self.search('office')), 2)
+
+    def test_operator_characters_are_ignored(self):
+        self.assertEqual(set(self.search('(report* "^')), {self.report, self.other})
+        self.assertEqual(self.search('***'), [])
+
+    def test_subtask_and_note_search(self):
+        subtask = SubTask.objects.create(title='Draft charts', parent_task=self.other)
+        note = Note.objects.create(task=self.other, content='Remember the milk')
+        self.assertEqual(list(search_subtasks(SubTask.objects.all(), 'chart')), [subtask])
+        self.assertEqual(list(search_subtasks(SubTask.objects.all(), 'grocer')), [subtask])
+        self.assertEqual(list(search_notes(Note.objects.all(), 'milk')), [note])
+        self.assertEqual(list(search_notes(Note.objects.all(), 'groceries')), [note])
+
+    def test_fallback_without_fts(self):
+        with mock.patch('hangarin.search.fts_available', return_value=False):
+            self.assertEqual(set(self.search('port')), {self.report, self.other})
+
+
+class QueryLanguageTests(TestCase):
+    def setUp(self):
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.high = Priority.objects.create(name='High')
+        self.now = timezone.make_aware(datetime.datetime(2025, 10, 14, 12, 0))
+        self.soon = make_task(self.work, self.high, 'In Progress', title='Soon',
+                              deadline=self.now + datetime.timedelta(days=2))
+        self.later = make_task(self.home, self.high, 'Pending', title='Later report',
+                               deadline=self.now + datetime.timedelta(days=30))
+
+    def filter(self, query):
+        parsed = TASK_QUERY.parse(query, now=self.now)
+        return parsed, list(Task.objects.filter(parsed.filters).order_by('deadline'))
+
+    def test_structured_tokens(self):
+        self.assertEqual(self.filter('status:"in progress"')[1], [self.soon])
+        self.assertEqual(self.filter('status:pending category:HOME')[1], [self.later])
+        self.assertEqual(self.filter('priority:high')[1], [self.soon, self.later])
+        self.assertEqual(self.filter('status:unknown')[1], [])
+
+    def test_due_tokens(self):
+        self.assertEqual(self.filter('due:<7d')[1], [self.soon])
+        self.assertEqual(self.filter('due:>1w')[1], [self.later])
+        self.assertEqual(self.filter('due:week')[1], [self.soon])
+        self.assertEqual(self.filter('due:2025-11')[1], [self.later])
+        self.assertEqual(self.filter('due:2025-10-01..2025-10-20')[1], [self.soon])
+        self.assertEqual(self.filter('due:>=2025-10-17')[1], [self.later])
+
+    def test_bare_dates_and_leftover_text(self):
+        parsed, tasks = self.filter('2025-10-16 report')
+        self.assertEqual(tasks, [self.soon])
+        self.assertEqual(parsed.text, 'report')
+        self.assertEqual(self.filter('due:someday')[0].text, 'due:someday')
+
+    def test_dates_compile_to_ranges(self):
+        parsed = TASK_QUERY.parse('2025-10', now=self.now)
+        sql = str(Task.objects.filter(parsed.filters).query)
+        self.assertIn('"hangarin_task"."deadline" >=', sql)
+        self.assertNotIn('LIKE', sql)
+
+    def test_note_dates_cover_creation_and_task_deadline(self):
+        note = Note.objects.create(task=self.later, content='Call the bank')
+        parsed = NOTE_QUERY.parse('2025-11-13', now=self.now)
+        self.assertEqual(list(Note.objects.filter(parsed.filters)), [note])
+
+
+class SortRegistryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('tester', password='secret')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Work')
+        priority = Priority.objects.create(name='High')
+        make_task(category, priority, title='B')
+        make_task(category, priority, title='A')
+
+    def test_unknown_sort_key_is_rejected(self):
+        for url in ('task-list', 'subtask-list', 'note-list', 'category-list', 'priority-list'):
+            response = self.client.get(reverse(url), {'order_by': 'description'})
+            self.assertEqual(response.status_code, 400, url)
+
+    def test_registered_sort_key(self):
+        response = self.client.get(reverse('task-list'), {'order_by': 'title'})
+        self.assertEqual([t.title for t in response.context['tasks']], ['A', 'B'])
+        self.assertNotIn('rank', dict(response.context['sort_choices']))
+
+    def test_relevance_falls_back_without_search_text(self):
+        response = self.client.get(reverse('task-list'), {'order_by': 'rank', 'q': 'status:pending'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['order_by'], '-created_at')
+
+    def test_sorts_are_index_backed(self):
+        querysets = [
+            Task.objects.filter(status='Pending').order_by('-created_at', '-id'),
+            Task.objects.order_by('title', 'id'),
+            Task.objects.order_by('-deadline', '-id'),
+            SubTask.objects.filter(status='Pending').order_by('created_at', 'id'),
+        ]
+        for queryset in querysets:
+            sql, params = queryset[:10].query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertNotIn('TEMP B-TREE', plan, sql)
+
+
+class SeedingTests(TestCase):
+    def test_creates_requested_rows_and_reference_data(self):
+        result = seed_tasks(7, subtasks_per_task=3, notes_per_task=1, batch_size=3, seed=1)
+
+        self.assertEqual((result.tasks, result.subtasks, result.notes), (7, 21, 7))
+        self.assertEqual(Task.objects.count(), 7)
+        self.assertEqual(SubTask.objects.count(), 21)
+        self.assertEqual(Note.objects.count(), 7)
+        self.assertEqual(Category.objects.count(), len(DEFAULT_CATEGORIES))
+        self.assertEqual(Priority.objects.count(), len(DEFAULT_PRIORITIES))
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 7)
+
+    def test_reuses_existing_reference_data(self):
+        category = Category.objects.create(name='Only')
+        seed_tasks(4, batch_size=2, seed=1)
+        self.assertEqual(set(Task.objects.values_list('category', flat=True)), {category.pk})
+
+    def test_same_seed_same_rows_whatever_the_workers(self):
+        seed_tasks(5, batch_size=2, seed=42)
+        sequential = list(Task.objects.order_by('id').values_list('title', 'status'))
+        Task.objects.all().delete()
+
+        seed_tasks(5, batch_size=2, seed=42, workers=2)
+        parallel = list(Task.objects.order_by('id').values_list('title', 'status'))
+        self.assertEqual(sequential, parallel)
+
+    def test_command_reports_throughput(self):
+        out = StringIO()
+        call_command('create_initial_data', tasks=3, seed=5, stdout=out)
+        self.assertEqual(Task.objects.count(), 3)
+        self.assertIn('rows/sec', out.getvalue())
+
+
+@override_settings(HANGARIN_SERVER_TIMING=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('budget', password='pw')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Work')
+        priority = Priority.objects.create(name='High')
+        for number in range(3):
+            self.task = make_task(category, priority, title=f'Task {number}')
+            SubTask.objects.create(title=f'Step {number}', parent_task=self.task)
+            Note.objects.create(task=self.task, content=f'Note {number}')
+        self.pks = {
+            'task': self.task.pk,
+            'subtask': SubTask.objects.first().pk,
+            'category': category.pk,
+            'priority': priority.pk,
+            'note': Note.objects.first().pk,
+            'archived': ArchivedTask.objects.create(
+                title='Archived', description='', deadline=timezone.now(), category=category, priority=priority,
+                created_at=timezone.now(), updated_at=timezone.now(),
+            ).pk,
+        }
+
+    def url_for(self, name):
+        for kwargs in ({}, {'task_pk': self.task.pk}, {'pk': self.pks.get(name.split('-')[0])}):
+            try:
+                return reverse(name, kwargs=kwargs)
+            except NoReverseMatch:
+                pass
+        raise NoReverseMatch(name)
+
+    def test_every_route_within_budget(self):
+        for name in project_url_names():
+            with self.subTest(name):
+                self.assertWithinQueryBudget(self.url_for(name), name)
+
+    def test_task_list_with_archived_tasks_within_budget(self):
+        for mode in ARCHIVE_CHOICES:
+            with self.subTest(mode):
+                self.assertWithinQueryBudget(reverse('task-list'), 'task-list', {'archived': mode})
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('home'))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+')
+        self.assertGreater(response.wsgi_request.metrics.template_ms, 0)
+
+    def test_every_route_has_a_benchmark_scenario(self):
+        covered = {scenario.route for scenario in SCENARIOS}
+        self.assertEqual(set(project_url_names()) - covered, set())
+
+    def test_exceeded_budget_logs_or_raises(self):
+        with override_settings(HANGARIN_QUERY_BUDGETS={'home': 1}, HANGARIN_COLD_QUERY_BUDGETS={'home': 5}):
+            with self.assertLogs('hangarin.performance', 'WARNING') as logs:
+                self.client.get(reverse('home'))
+            # Cold caches: the counters and reference data are loaded too
+            self.assertIn('home ran 6 queries (budget 5)', logs.output[0])
+
+            # Warm caches: still checked against the cold limit
+            with self.assertNoLogs('hangarin.performance', 'WARNING'):
+                self.client.get(reverse('home'))
+
+            with override_settings(HANGARIN_QUERY_BUDGET_MODE='raise', HANGARIN_COLD_QUERY_BUDGETS={'home': 1}):
+                with self.assertRaises(QueryBudgetExceeded):
+                    self.client.get(reverse('home'))
+
+    def test_warm_budgets_are_tighter_than_cold_ones(self):
+        self.assertEqual(self.assertWithinQueryBudget(reverse('home'), 'home').queries, 2)
+        with override_settings(HANGARIN_QUERY_BUDGETS={'home': 1}):
+            with self.assertRaisesMessage(AssertionError, 'home ran 2 queries with warm caches (budget 1)'):
+                self.assertWithinQueryBudget(reverse('home'), 'home')
+
+    def test_form_submissions_are_not_budgeted(self):
+        with override_settings(HANGARIN_QUERY_BUDGETS={'category-add': 0}, HANGARIN_QUERY_BUDGET_MODE='raise'):
+            response = self.client.post(reverse('category-add'), {'name': 'Home'})
+        self.assertEqual(response.status_code, 302)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('exporter', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.high = Priority.objects.create(name='High')
+        self.report = make_task(self.work, self.high, title='Quarterly report')
+        make_task(self.home, self.high, title='Groceries', status='Completed')
+        SubTask.objects.create(title='Draft', parent_task=self.report)
+        Note.objects.create(task=self.report, content='Ask finance')
+
+    def get_export(self, **params):
+        response = self.client.get(reverse('task-export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_with_denormalized_names(self):
+        response, body = self.get_export()
+        rows = list(csv.DictReader(StringIO(body)))
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual([row['title'] for row in rows], ['Quarterly report', 'Groceries'])
+        self.assertEqual(rows[0]['category'], 'Work')
+        self.assertEqual(rows[0]['priority'], 'High')
+
+    def test_ndjson_with_nested_rows_and_list_filters(self):
+        _, body = self.get_export(format='ndjson', include='subtasks,notes', q='category:work')
+        records = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['subtasks'][0]['title'], 'Draft')
+        self.assertEqual(records[0]['notes'][0]['content'], 'Ask finance')
+
+    def test_rejects_unknown_format_and_include(self):
+        self.assertEqual(self.client.get(reverse('task-export'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('task-export'), {'include': 'owner'}).status_code, 400)
+
+    def test_header_is_sent_before_querying(self):
+        chunks = stream_export(Task.objects.all(), 'csv', ['notes'], chunk_size=1)
+        with self.assertNumQueries(0):
+            self.assertTrue(next(chunks).startswith('id,title'))
+        # One streamed task query, one note prefetch per chunk of one task
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(chunks)), 2)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_tasks', format='ndjson', status='Completed', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['title'], 'Groceries')
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('importer', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+
+    def test_round_trips_an_export(self):
+        task = make_task(self.work, self.high, title='Quarterly report')
+        SubTask.objects.create(title='Draft', parent_task=task)
+        Note.objects.create(task=task, content='Ask finance')
+        exported = ''.join(stream_export(Task.objects.all(), 'csv', ['subtasks', 'notes']))
+
+        result = import_tasks(StringIO(exported))
+
+        self.assertEqual((result.tasks, result.subtasks, result.notes, result.errors), (1, 1, 1, []))
+        copy = Task.objects.exclude(pk=task.pk).get()
+        self.assertEqual((copy.title, copy.category, copy.deadline), (task.title, self.work, task.deadline))
+        self.assertEqual(copy.subtasks.get().title, 'Draft')
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 2)
+
+    @override_settings(TIME_ZONE='Asia/Manila')
+    def test_deadline_without_offset_is_in_the_current_time_zone(self):
+        data = json.dumps({'title': 'Naive', 'description': 'x', 'status': 'Pending',
+                           'deadline': '2025-10-14T09:00:00.5', 'category': 'Work', 'priority': 'High'})
+        # Take the importer's own parsing, past the form field's formats
+        invalid = ValidationError('Enter a valid date/time.')
+        with warnings.catch_warnings(), mock.patch.object(forms.DateTimeField, 'to_python', side_effect=invalid):
+            warnings.simplefilter('error', RuntimeWarning)
+            result = import_tasks(StringIO(data), 'ndjson')
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Task.objects.get().deadline,
+                         datetime.datetime(2025, 10, 14, 1, 0, 0, 500000, tzinfo=datetime.timezone.utc))
+
+    def test_reports_invalid_rows_and_imports_the_rest(self):
+        data = '\n'.join([
+            json.dumps({'title': 'Ok', 'description': 'x', 'status': 'Pending',
+                        'deadline': '2025-10-14T09:00', 'category': 'work', 'priority': 'HIGH'}),
+            json.dumps({'title': 'Bad', 'description': 'x', 'status': 'Someday',
+                        'deadline': '2025-10-14T09:00', 'category': 'Hobby', 'priority': 'High'}),
+            'not json',
+        ])
+
+        result = import_tasks(StringIO(data), 'ndjson', batch_size=1)
+
+        self.assertEqual(result.tasks, 1)
+        self.assertEqual(
+            [(error.line, error.field) for error in result.errors],
+            [(2, 'status'), (2, 'category'), (3, 'row')],
+        )
+        self.assertEqual(Task.objects.get().category, self.work)
+
+    def test_create_missing_reference_data(self):
+        data = 'title,description,status,deadline,category,priority\nA,x,Pending,2025-10-14T09:00,Hobby,Low\n'
+        result = import_tasks(StringIO(data), create_missing=True)
+        self.assertEqual(result.errors, [])
+        self.assertTrue(Category.objects.filter(name='Hobby').exists())
+
+    def test_upload(self):
+        upload = SimpleUploadedFile(
+            'tasks.csv', b'title,description,status,deadline,category,priority\nA,x,Pending,2025-10-14T09:00,Work,High\n',
+        )
+        response = self.client.post(reverse('task-import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].tasks, 1)
+
+    def test_upload_that_is_not_utf8(self):
+        upload = SimpleUploadedFile(
+            'tasks.csv', 'title,description,status,deadline,category,priority\n'
+                         '\xe9t\xe9,x,Pending,2025-10-14T09:00,Work,High\n'.encode('latin-1'),
+        )
+        response = self.client.post(reverse('task-import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        error = response.context['result'].errors[-1]
+        self.assertEqual(error.field, 'file')
+        self.assertIn('not valid UTF-8', error.message)
+        self.assertIn('no rows were imported', error.message)
+        self.assertFalse(Task.objects.exists())
+
+    def test_malformed_csv_keeps_the_written_batches(self):
+        data = ('title,description,status,deadline,category,priority\n'
+                'A,x,Pending,2025-10-14T09:00,Work,High\n'
+                f'B,{"x" * (csv.field_size_limit() + 1)},Pending,2025-10-14T09:00,Work,High\n')
+
+        result = import_tasks(StringIO(data), batch_size=1)
+
+        self.assertEqual(result.tasks, 1)
+        self.assertEqual([(error.line, error.field) for error in result.errors], [(3, 'file')])
+        self.assertIn('Invalid CSV', result.errors[0].message)
+        self.assertIn('rows up to line 2 were imported', result.errors[0].message)
+        self.assertEqual(Task.objects.get().title, 'A')
+
+    def test_command_ndjson_that_is_not_utf8(self):
+        directory = Path(tempfile.mkdtemp(prefix='hangarin-import-'))
+        self.addCleanup(shutil.rmtree, directory)
+        path = directory / 'tasks.ndjson'
+        rows = [{'title': title, 'description': 'x', 'status': 'Pending', 'deadline': '2025-10-14T09:00',
+                 'category': 'Work', 'priority': 'High'} for title in ('A', '\xe9t\xe9')]
+        with open(path, 'wb') as f:
+            f.write(json.dumps(rows[0]).encode() + b'\n')
+            # Past the first read chunk, so the first row is already written
+            f.write(b' ' * 10000 + b'\n')
+            f.write(json.dumps(rows[1], ensure_ascii=False).encode('latin-1') + b'\n')
+        out, err = StringIO(), StringIO()
+
+        call_command('import_tasks', str(path), batch_size=1, stdout=out, stderr=err)
+
+        self.assertIn('not valid UTF-8', err.getvalue())
+        self.assertIn('rows up to line 1 were imported', err.getvalue())
+        self.assertIn('1 tasks, 0 subtasks and 0 notes imported', out.getvalue())
+        self.assertEqual(Task.objects.get().title, 'A')
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        with mock.patch('sys.stdin', StringIO('title,description,status,deadline,category,priority\n'
+                                              'A,x,Pending,2025-10-14T09:00,Work,High\n')):
+            call_command('import_tasks', '-', dry_run=True, stdout=out, stderr=StringIO())
+        self.assertIn('1 tasks, 0 subtasks and 0 notes validated', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+
+class BulkActionTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('bulk', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.high = Priority.objects.create(name='High')
+        self.tasks = [make_task(self.work, self.high, title=f'Report {n}') for n in range(3)]
+        self.other = make_task(self.home, self.high, title='Groceries')
+        stats.rebuild_counters()
+
+    def post(self, url_name, data, query=''):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(url_name) + query, data, HTTP_ACCEPT='application/json')
+
+    def test_status_change_by_ids_in_one_update(self):
+        before = Task.objects.get(pk=self.tasks[0].pk).updated_at
+        ids = [task.pk for task in self.tasks[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('task-bulk', {'action': 'status', 'status': 'Completed', 'ids': ids})
+
+        writes = [query['sql'] for query in queries if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+        self.assertEqual(len(writes), 1)
+
+        self.assertEqual(response.json(), {'action': 'status', 'updated': 2})
+        self.assertEqual(Task.objects.filter(status='Completed').count(), 2)
+        self.assertGreater(Task.objects.get(pk=self.tasks[0].pk).updated_at, before)
+        self.assertEqual(get_dashboard_stats()['completed_tasks'], 2)
+
+    def test_reassign_everything_matching_the_filter(self):
+        response = self.post('task-bulk', {'action': 'category', 'category': self.home.pk, 'scope': 'filter'},
+                             query=f'?category={self.work.pk}&q=report')
+        self.assertEqual(response.json()['updated'], 3)
+        self.assertEqual(Task.objects.filter(category=self.home).count(), 4)
+
+    def test_delete_cascades_and_refreshes_counters_once(self):
+        SubTask.objects.create(title='Step', parent_task=self.tasks[0])
+        with mock.patch('hangarin.stats.apply_delta') as apply_delta:
+            response = self.post('task-bulk', {'action': 'delete', 'ids': [self.tasks[0].pk, self.other.pk]})
+
+        apply_delta.assert_not_called()
+        self.assertEqual(response.json()['deleted'], {'hangarin.Task': 2, 'hangarin.SubTask': 1})
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 2)
+
+    def test_delete_only_marks_and_can_be_undone(self):
+        step = SubTask.objects.create(title='Step', status='Completed', parent_task=self.tasks[0])
+        ids = [task.pk for task in self.tasks[:2]]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('task-bulk'), {'action': 'delete', 'ids': ids}, follow=True)
+        self.assertContains(response, '2 tasks deleted successfully!')
+        self.assertContains(response, f'name="ids" value="{ids[0]}"')
+        self.assertEqual(Task.all_objects.filter(pk__in=ids, deleted_at__isnull=False).count(), 2)
+        self.assertFalse(SubTask.objects.exists())
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('task-bulk-restore'), {'ids': ids}, follow=True)
+        self.assertRedirects(response, reverse('task-list'))
+        self.assertContains(response, '2 tasks restored.')
+        self.assertEqual(list(SubTask.objects.all()), [step])
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 4)
+
+    def test_subtask_delete_and_undo_recount_the_progress(self):
+        steps = [SubTask.objects.create(title=f'Step {n}', parent_task=self.other) for n in range(2)]
+        self.post('subtask-bulk', {'action': 'delete', 'ids': [steps[0].pk]})
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.subtask_count, 1)
+
+        self.client.post(reverse('subtask-bulk-restore'), {'ids': [steps[0].pk]})
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.subtask_count, 2)
+
+    def test_validation_errors(self):
+        self.assertEqual(self.post('task-bulk', {'action': 'status', 'ids': [self.other.pk]}).status_code, 400)
+        self.assertEqual(self.post('task-bulk', {'action': 'delete'}).status_code, 400)
+        self.assertEqual(self.post('subtask-bulk', {'action': 'category', 'category': self.work.pk,
+                                                    'ids': [1]}).status_code, 400)
+
+    def test_html_form_redirects_back_to_the_list(self):
+        subtask = SubTask.objects.create(title='Step', parent_task=self.other)
+        response = self.client.post(reverse('subtask-bulk') + '?status=Pending',
+                                    {'action': 'status', 'status': 'Completed', 'scope': 'filter'})
+        self.assertRedirects(response, reverse('subtask-list') + '?status=Pending')
+        subtask.refresh_from_db()
+        self.assertEqual(subtask.status, 'Completed')
+
+
+class TaskDetailTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('detail', password='pw'))
+        self.task = make_task(Category.objects.create(name='Work'), Priority.objects.create(name='High'))
+        SubTask.objects.bulk_create([SubTask(title=f'Step {n}', parent_task=self.task) for n in range(25)])
+        progress.recount(Task.objects.filter(pk=self.task.pk))
+        self.long_note = Note.objects.create(task=self.task, content='word ' * 500)
+        Note.objects.create(task=self.task, content='Short note')
+
+    def test_first_page_with_counts(self):
+        # session, user, task (its counts are columns), subtask page, note page
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('task-detail', args=[self.task.pk]))
+
+        self.assertEqual(response.context['task'].subtask_count, 25)
+        self.assertEqual(response.context['task'].note_count, 2)
+        self.assertEqual(len(response.context['subtask_page'].object_list), 10)
+        self.assertContains(response, reverse('task-subtasks', args=[self.task.pk]) + '?cursor=')
+        # The long note is cut to a preview that links to its full content
+        self.assertNotContains(response, 'word ' * 100)
+        self.assertContains(response, reverse('note-content', args=[self.long_note.pk]))
+
+    def test_load_more_walks_all_subtasks(self):
+        titles, url = [], reverse('task-subtasks', args=[self.task.pk])
+        while url:
+            response = self.client.get(url)
+            page = response.context['page']
+            titles += [subtask.title for subtask in page]
+            url = page.next_cursor and reverse('task-subtasks', args=[self.task.pk]) + f'?cursor={page.next_cursor}'
+        self.assertEqual(titles, [f'Step {n}' for n in range(25)])
+
+    def test_full_note_content(self):
+        response = self.client.get(reverse('note-content', args=[self.long_note.pk]))
+        self.assertContains(response, 'word ' * 500)
+
+    def test_invalid_cursor_and_unknown_task(self):
+        url = reverse('task-notes', args=[self.task.pk])
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('task-notes', args=[self.task.pk + 1])).status_code, 404)
+
+
+class TaskProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('progress', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.task = make_task(self.work, self.high, title='Release')
+        self.other = make_task(self.work, self.high, title='Hotfix')
+
+    def counts(self, task):
+        task.refresh_from_db()
+        return tuple(getattr(task, field) for field in progress.COUNTER_FIELDS)
+
+    def test_saves_and_status_transitions(self):
+        subtask = SubTask.objects.create(title='Build', parent_task=self.task)
+        SubTask.objects.create(title='Ship', status='Completed', parent_task=self.task)
+        Note.objects.create(task=self.task, content='Checklist')
+        self.assertEqual(self.counts(self.task), (2, 1, 0, 1))
+
+        subtask.status = 'In Progress'
+        subtask.save()
+        self.assertEqual(self.counts(self.task), (2, 1, 1, 1))
+        subtask.status = 'Completed'
+        subtask.save()
+        self.assertEqual(self.counts(self.task), (2, 2, 0, 1))
+        self.assertEqual(self.task.progress, 100)
+
+    def test_moves_and_deletes(self):
+        subtask = SubTask.objects.create(title='Build', status='Completed', parent_task=self.task)
+        note = Note.objects.create(task=self.task, content='Checklist')
+        subtask.parent_task = self.other
+        subtask.save()
+        note.task = self.other
+        note.save()
+        self.assertEqual(self.counts(self.task), (0, 0, 0, 0))
+        self.assertEqual(self.counts(self.other), (1, 1, 0, 1))
+
+        subtask.delete()
+        note.delete()
+        self.assertEqual(self.counts(self.other), (0, 0, 0, 0))
+
+    def test_counter_update_refreshes_the_task(self):
+        before = self.task.updated_at
+        version = versions.get_version(Task)
+        SubTask.objects.create(title='Build', parent_task=self.task)
+        self.task.refresh_from_db()
+        self.assertGreater(self.task.updated_at, before)
+        self.assertNotEqual(versions.get_version(Task), version)
+
+    def test_deleting_the_task_skips_its_counters(self):
+        SubTask.objects.bulk_create([SubTask(title=f'Step {n}', parent_task=self.task) for n in range(5)])
+        with CaptureQueriesContext(connection) as queries:
+            self.task.delete()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "hangarin_task"')])
+
+    def test_bulk_actions_recount_once(self):
+        SubTask.objects.bulk_create([SubTask(title=f'Step {n}', parent_task=self.task) for n in range(5)])
+        SubTask.objects.create(title='Other', parent_task=self.other)
+        with CaptureQueriesContext(connection) as queries:
+            bulk_update(SubTask.objects.all(), status='Completed')
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "hangarin_task"')]), 1)
+        self.assertEqual(self.counts(self.task), (5, 5, 0, 0))
+        self.assertEqual(self.counts(self.other), (1, 1, 0, 0))
+
+        bulk_delete(SubTask.objects.filter(parent_task=self.task, title__in=['Step 0', 'Step 1']))
+        self.assertEqual(self.counts(self.task), (3, 3, 0, 0))
+
+    def test_bulk_created_rows_carry_their_counts(self):
+        seed_tasks(3, subtasks_per_task=2, notes_per_task=1, seed=11)
+        stream = StringIO(json.dumps({
+            'title': 'Imported', 'description': 'x', 'status': 'Pending', 'deadline': '2026-01-01T00:00',
+            'category': 'Work', 'priority': 'High',
+            'subtasks': [{'title': 'a', 'status': 'Completed'}, {'title': 'b', 'status': 'Pending'}],
+            'notes': [{'content': 'n'}],
+        }) + '\n')
+        self.assertFalse(import_tasks(stream, import_format='ndjson').errors)
+        self.assertEqual(self.counts(Task.objects.get(title='Imported')), (2, 1, 0, 1))
+        self.assertFalse(progress.drifted(Task.objects.all()).exists())
+
+    def test_repair_command(self):
+        SubTask.objects.bulk_create([SubTask(title='Lost', status='In Progress', parent_task=self.task)])
+        with self.assertRaises(CommandError):
+            call_command('repair_task_counters', check=True, stdout=StringIO())
+
+        out = StringIO()
+        call_command('repair_task_counters', batch_size=1, stdout=out)
+        self.assertIn('repaired 1', out.getvalue())
+        self.assertEqual(self.counts(self.task), (1, 0, 1, 0))
+        call_command('repair_task_counters', check=True, stdout=StringIO())
+
+    def test_list_and_detail_show_progress(self):
+        SubTask.objects.create(title='Build', status='Completed', parent_task=self.task)
+        SubTask.objects.create(title='Ship', parent_task=self.task)
+        response = self.client.get(reverse('task-list'))
+        self.assertContains(response, '1/2 subtasks')
+        response = self.client.get(reverse('task-detail', args=[self.task.pk]))
+        self.assertContains(response, '1/2 done')
+        self.assertContains(response, '50%')
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.task = make_task(self.work, self.high, title='Quarterly report')
+
+    def add_rows(self, count):
+        for n in range(count):
+            task = make_task(self.work, self.high, title=f'Task {n}')
+            SubTask.objects.create(title=f'Step {n}', parent_task=task)
+            Note.objects.create(task=task, content=f'Note {n}')
+
+    def test_changelists_do_not_query_per_row(self):
+        urls = [reverse(f'admin:hangarin_{model}_changelist') for model in ('task', 'subtask', 'note')]
+        self.add_rows(2)
+        counts = []
+        for url in urls:
+            # Warm the reference data behind the filters
+            self.assertEqual(self.client.get(url).status_code, 200)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts.append(len(queries))
+        self.add_rows(10)
+        for url, count in zip(urls, counts):
+            with self.assertNumQueries(count):
+                self.client.get(url)
+
+    def test_sort_subtasks_by_parent_task(self):
+        self.add_rows(2)
+        response = self.client.get(reverse('admin:hangarin_subtask_changelist') + '?o=-3')
+        titles = [subtask.parent_task.title for subtask in response.context['cl'].result_list]
+        self.assertEqual(titles, ['Task 1', 'Task 0'])
+
+    def test_search_uses_full_text_index(self):
+        make_task(self.work, self.high, title='Unrelated', description='quarterly figures')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:hangarin_task_changelist') + '?q=quart')
+        self.assertEqual(response.context['cl'].result_count, 2)
+        if connection.vendor == 'sqlite':
+            self.assertTrue(any('hangarin_task_fts' in query['sql'] for query in queries))
+
+    def test_estimated_count_for_large_unfiltered_lists(self):
+        url = reverse('admin:hangarin_task_changelist')
+        with mock.patch('hangarin.pagination.estimated_row_count', return_value=250_000):
+            self.assertEqual(self.client.get(url).context['cl'].result_count, 250_000)
+            self.assertEqual(self.client.get(url + '?status__exact=Pending').context['cl'].result_count, 1)
+            with override_settings(HANGARIN_ESTIMATED_COUNT_THRESHOLD=None):
+                self.assertEqual(self.client.get(url).context['cl'].result_count, 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads sqlite_stat1')
+    def test_estimated_row_count_reads_table_statistics(self):
+        self.add_rows(3)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_row_count(Task, 'default'), 4)
+
+    def test_inlines_are_paginated(self):
+        SubTask.objects.bulk_create([SubTask(title=f'Step {n}', parent_task=self.task) for n in range(25)])
+        progress.recount(Task.objects.filter(pk=self.task.pk))
+        url = reverse('admin:hangarin_task_change', args=[self.task.pk])
+
+        response = self.client.get(url)
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.initial_form_count(), 20)
+        self.assertContains(response, 'Page 1 of 2 (25 sub tasks)')
+
+        response = self.client.get(url + '?subtasks_page=2')
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual([form.instance.title for form in formset.initial_forms], [f'Step {n}' for n in range(20, 25)])
+
+
+class CascadeDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('deleter', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.home = Category.objects.create(name='Home')
+        self.high = Priority.objects.create(name='High')
+        for n in range(5):
+            task = make_task(self.work, self.high, title=f'Report {n}')
+            SubTask.objects.create(title=f'Step {n}', parent_task=task)
+            Note.objects.create(task=task, content=f'Note {n}')
+        self.kept = make_task(self.home, self.high, title='Groceries')
+        stats.rebuild_counters()
+
+    def deletes(self, queries, table):
+        return [q for q in queries if q['sql'].startswith(f'DELETE FROM "{table}"')]
+
+    def test_category_delete_runs_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            result = delete_object(self.work, batch_size=2)
+
+        self.assertEqual(result.counts(), {'hangarin.Task': 5, 'hangarin.SubTask': 5, 'hangarin.Note': 5,
+                                           'hangarin.Category': 1})
+        self.assertEqual(list(Task.objects.all()), [self.kept])
+        self.assertFalse(SubTask.objects.exists() or Note.objects.exists())
+        # 5 tasks, 2 per batch; no collector pass loading the rows first
+        self.assertEqual(len(self.deletes(queries, 'hangarin_task')), 3)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT "hangarin_subtask"."id", "hangarin_subtask"."created_at"')])
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 1)
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'report')), [])
+
+    def test_category_delete_view(self):
+        response = self.client.post(reverse('category-delete', args=[self.work.pk]), follow=True)
+        self.assertRedirects(response, reverse('category-list'))
+        self.assertContains(response, 'Category deleted successfully!')
+        self.assertFalse(Category.objects.filter(pk=self.work.pk).exists())
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_confirmation_counts_the_tasks(self):
+        response = self.client.get(reverse('priority-delete', args=[self.high.pk]))
+        self.assertContains(response, 'This priority has 6 tasks!')
+
+    def test_task_delete_takes_its_subtasks_and_notes(self):
+        task = Task.objects.get(title='Report 0')
+        response = self.client.post(reverse('task-delete', args=[task.pk]))
+        self.assertRedirects(response, reverse('task-list'))
+        self.assertEqual(SubTask.objects.count(), 4)
+        self.assertEqual(Note.objects.count(), 4)
+
+    @override_settings(HANGARIN_DELETE_INLINE_LIMIT=3)
+    def test_large_cascades_run_as_a_background_job(self):
+        self.client.post(reverse('category-delete', args=[self.work.pk]))
+        self.client.post(reverse('category-delete', args=[self.work.pk]))
+        self.assertTrue(Category.objects.filter(pk=self.work.pk).exists())
+        job = DeletionJob.objects.get()
+        self.assertEqual((job.status, job.total_tasks), ('Pending', 5))
+
+        out = StringIO()
+        call_command('run_deletion_jobs', batch_size=2, verbosity=2, stdout=out)
+        self.assertIn('Delete Work: 4/5 tasks', out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.deleted_tasks, job.percent_done), ('Completed', 5, 100))
+        self.assertFalse(Category.objects.filter(pk=self.work.pk).exists())
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failed_job_keeps_the_progress_of_its_batches(self):
+        job = schedule(self.work)
+
+        def fail_after_a_batch(obj, batch_size, progress):
+            result = DeleteResult()
+            result.deleted['hangarin.Task'] = 2
+            progress(result)
+            raise RuntimeError('disk full')
+
+        with mock.patch('hangarin.deletion.delete_object', side_effect=fail_after_a_batch):
+            with self.assertRaises(RuntimeError):
+                run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.deleted_tasks), ('Failed', 2))
+        self.assertIn('disk full', job.error)
+
+    def test_bulk_delete_of_tasks_reports_the_cascade(self):
+        self.assertEqual(bulk_delete(Task.objects.filter(category=self.work)),
+                         {'hangarin.Task': 5, 'hangarin.SubTask': 5, 'hangarin.Note': 5})
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('trasher', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.task = make_task(self.work, self.high, title='Quarterly report')
+        self.step = SubTask.objects.create(title='Collect figures', status='Completed', parent_task=self.task)
+        SubTask.objects.create(title='Write summary', parent_task=self.task)
+        self.note = Note.objects.create(task=self.task, content='Due Friday')
+        self.other = make_task(self.work, self.high, 'Completed', title='Weekly report')
+        stats.rebuild_counters()
+
+    def test_task_delete_marks_the_task_with_its_subtasks_and_notes(self):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('task-delete', args=[self.task.pk]), follow=True)
+        self.assertContains(response, 'Undo')
+        self.assertFalse([q for q in queries if q['sql'].startswith('DELETE')])
+
+        self.assertEqual(list(Task.objects.all()), [self.other])
+        self.assertFalse(SubTask.objects.exists() or Note.objects.exists())
+        self.assertEqual(SubTask.all_objects.filter(deleted_at__isnull=False).count(), 2)
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 1)
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'report')), [self.other])
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.task.pk])).status_code, 404)
+
+    def test_undo_restores_what_was_deleted_along_with_the_task(self):
+        soft_delete(self.note)
+        soft_delete(Task.objects.get(pk=self.task.pk))
+        response = self.client.post(reverse('task-restore', args=[self.task.pk]))
+        self.assertRedirects(response, reverse('task-detail', args=[self.task.pk]))
+
+        self.assertEqual(SubTask.objects.filter(parent_task=self.task).count(), 2)
+        # Deleted on its own before the task: stays deleted
+        self.assertFalse(Note.objects.exists())
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 2)
+        self.assertEqual(self.client.post(reverse('task-restore', args=[self.task.pk])).status_code, 404)
+
+    def test_subtask_delete_and_undo_update_the_progress(self):
+        self.client.post(reverse('subtask-delete', args=[self.step.pk]))
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.subtask_count, self.task.subtasks_completed), (1, 0))
+
+        self.client.post(reverse('subtask-restore', args=[self.step.pk]))
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.subtask_count, self.task.subtasks_completed, self.task.progress), (2, 1, 50))
+
+    def test_child_of_a_deleted_task_cannot_be_restored_alone(self):
+        soft_delete(self.task)
+        step = SubTask.all_objects.get(pk=self.step.pk)
+        with self.assertRaises(ValueError):
+            restore(step)
+        response = self.client.post(reverse('subtask-restore', args=[self.step.pk]), follow=True)
+        self.assertContains(response, 'cannot be restored')
+        self.assertFalse(SubTask.objects.exists())
+
+    def test_purge_removes_rows_past_the_retention_window(self):
+        soft_delete(self.task)
+        soft_delete(self.other)
+        long_ago = timezone.now() - datetime.timedelta(days=40)
+        Task.all_objects.filter(pk=self.task.pk).update(deleted_at=long_ago)
+        SubTask.all_objects.update(deleted_at=long_ago)
+        Note.all_objects.update(deleted_at=long_ago)
+
+        out = StringIO()
+        call_command('purge_deleted', days=30, dry_run=True, stdout=out)
+        self.assertIn('Would remove 1 tasks, 2 sub tasks, 1 notes.', out.getvalue())
+        call_command('purge_deleted', days=30, batch_size=1, stdout=out)
+        self.assertIn('Removed 2 hangarin.SubTask, 1 hangarin.Note, 1 hangarin.Task', out.getvalue())
+
+        self.assertEqual(list(Task.all_objects.all()), [self.other])
+        self.assertFalse(SubTask.all_objects.exists() or Note.all_objects.exists())
+
+    def test_live_queries_read_the_partial_indexes(self):
+        sql, params = Task.objects.filter(status='Pending').order_by('-created_at', '-id')[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('task_status_created_idx', plan)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.client.force_login(User.objects.create_user('archivist', password='pw'))
+        self.work = Category.objects.create(name='Work')
+        self.high = Priority.objects.create(name='High')
+        self.old = make_task(self.work, self.high, 'Completed', title='Quarterly report')
+        SubTask.objects.create(title='Collect figures', status='Completed', parent_task=self.old)
+        Note.objects.create(task=self.old, content='Sent to the board')
+        self.recent = make_task(self.work, self.high, 'Completed', title='Weekly report')
+        self.pending = make_task(self.work, self.high, title='Annual report')
+        long_ago = timezone.now() - datetime.timedelta(days=200)
+        Task.objects.filter(pk__in=[self.old.pk, self.pending.pk]).update(updated_at=long_ago)
+        self.old.refresh_from_db()
+        stats.rebuild_counters()
+
+    def archive(self, **options):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_tasks', days=90, stdout=out, **options)
+        return out.getvalue()
+
+    def test_moves_old_completed_tasks_with_their_subtasks_and_notes(self):
+        self.assertIn('1 tasks would be archived', self.archive(dry_run=True))
+        self.assertIn('Archived 1 tasks with 1 subtasks and 1 notes', self.archive(batch_size=1))
+
+        self.assertEqual(set(Task.objects.all()), {self.recent, self.pending})
+        self.assertFalse(SubTask.objects.exists() or Note.objects.exists())
+        archived = ArchivedTask.objects.get()
+        self.assertEqual((archived.pk, archived.created_at, archived.updated_at),
+                         (self.old.pk, self.old.created_at, self.old.updated_at))
+        self.assertEqual([row['title'] for row in archived.subtasks], ['Collect figures'])
+        self.assertEqual([row['content'] for row in archived.notes], ['Sent to the board'])
+        self.assertEqual((archived.subtask_count, archived.progress), (1, 100))
+        self.assertEqual(list(search_tasks(Task.objects.all(), 'quarterly')), [])
+
+    def test_dashboard_combines_archive_totals_with_live_counts(self):
+        self.archive()
+        self.assertEqual(ArchiveTotal.objects.get().count, 1)
+        with self.assertNumQueries(4):
+            dashboard = get_dashboard_stats()
+        self.assertEqual((dashboard['total_tasks'], dashboard['completed_tasks'], dashboard['archived_tasks']), (3, 2, 1))
+        self.assertEqual(dashboard['category_stats'][0]['completed'], 2)
+        self.assertFalse(stats._has_drifted(stats.get_counters()))
+        self.assertContains(self.client.get(reverse('home')), '1 archived')
+
+    def test_task_list_includes_archived_tasks_on_request(self):
+        self.archive()
+        response = self.client.get(reverse('task-list'))
+        self.assertNotContains(response, 'Quarterly report')
+
+        response = self.client.get(reverse('task-list'), {'archived': 'include', 'q': 'report'})
+        self.assertEqual([task.title for task in response.context['tasks']],
+                         ['Annual report', 'Weekly report', 'Quarterly report'])
+        self.assertContains(response, reverse('archived-task-detail', args=[self.old.pk]))
+        self.assertEqual(response.context['paginator'].count, 3)
+
+        response = self.client.get(reverse('task-list'), {'archived': 'only', 'category': self.work.pk})
+        self.assertEqual([task.title for task in response.context['tasks']], ['Quarterly report'])
+        self.assertEqual(response.context['tasks'][0].category, self.work)
+
+    def test_archiving_changes_the_list_etag(self):
+        url = reverse('task-list') + '?archived=include'
+        etag = self.client.get(url)['ETag']
+        self.archive()
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_detail_of_an_archived_task(self):
+        self.archive()
+        response = self.client.get(reverse('task-detail', args=[self.old.pk]))
+        self.assertRedirects(response, reverse('archived-task-detail', args=[self.old.pk]))
+        response = self.client.get(response['Location'])
+        self.assertContains(response, 'Collect figures')
+        self.assertContains(response, 'Sent to the board')
+        self.assertEqual(self.client.get(reverse('task-detail', args=[9999])).status_code, 404)
+
+    def test_category_delete_takes_its_archived_tasks(self):
+        self.archive()
+        with self.captureOnCommitCallbacks(execute=True):
+            result = delete_object(self.work)
+        self.assertEqual(result.deleted['hangarin.ArchivedTask'], 1)
+        self.assertFalse(ArchiveTotal.objects.exists())
+        self.assertEqual(get_dashboard_stats()['total_tasks'], 0)
+
+
+class TaskAutocompleteTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('picker', password='pw'))
+        category, priority = Category.objects.create(name='Work'), Priority.objects.create(name='High')
+        self.tasks = [make_task(category, priority, title=f'Market study {n}') for n in range(12)]
+        self.other = make_task(category, priority, title='Quarterly report')
+
+    def test_form_renders_only_selected_task(self):
+        response = self.client.get(reverse('subtask-add-with-parent'))
+        self.assertNotContains(response, 'Market study')
+        self.assertContains(response, reverse('task-autocomplete'))
+        self.assertContains(response, 'js/autocomplete.js')
+
+    def test_matches_are_paginated(self):
+        data = self.client.get(reverse('task-autocomplete'), {'q': 'mar'}).json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertTrue(data['more'])
+        self.assertTrue(all(result['text'].startswith('Market') for result in data['results']))
+
+        data = self.client.get(reverse('task-autocomplete'), {'q': 'quart rep'}).json()
+        self.assertEqual(data, {'results': [{'id': self.other.pk, 'text': 'Quarterly report'}], 'more': False})
+
+    def test_submitted_id_is_validated(self):
+        url = reverse('note-add-with-task')
+        response = self.client.post(url, {'task': self.other.pk, 'content': 'Picked'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Note.objects.filter(task=self.other, content='Picked').exists())
+
+        response = self.client.post(url, {'task': 999999, 'content': 'Lost'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('task', response.context['form'].errors)
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('refdata', password='pw'))
+        self.category = Category.objects.create(name='Work')
+        self.priority = Priority.objects.create(name='High')
+
+    def test_cached_until_changed(self):
+        refdata.categories()
+        with self.assertNumQueries(0):
+            self.assertEqual([c.name for c in refdata.categories()], ['Work'])
+
+        Category.objects.create(name='Home')
+        self.assertEqual([c.name for c in refdata.categories()], ['Work', 'Home'])
+        self.priority.delete()
+        self.assertEqual(refdata.priorities(), ())
+
+    def test_reloaded_after_max_age_without_a_new_version(self):
+        refdata.categories()
+        # Bypasses the signals, like a write seen through another process's cache
+        Category.objects.filter(pk=self.category.pk).update(name='Office')
+        self.assertEqual([c.name for c in refdata.categories()], ['Work'])
+        with mock.patch('hangarin.refdata.time.monotonic', return_value=time.monotonic() + 301):
+            self.assertEqual([c.name for c in refdata.categories()], ['Office'])
+
+    def test_task_form_uses_cache(self):
+        refdata.categories(), refdata.priorities()
+        form = TaskForm({
+            'title': 'Cached', 'description': 'Form', 'status': 'Pending', 'deadline': '2030-01-01T09:00',
+            'category': self.category.pk, 'priority': self.priority.pk,
+        })
+        with self.assertNumQueries(0):
+            self.assertIn('>Work</option>', str(TaskForm()['category']))
+        # Model validation still checks that the chosen rows exist
+        with self.assertNumQueries(2):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['category'], self.category)
+
+        form = TaskForm({'category': 999999})
+        self.assertIn('category', form.errors)
+
+    def test_admin_filter_choices(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        Category.objects.create(name='Home')
+        response = self.client.get(reverse('admin:hangarin_task_changelist'))
+        self.assertContains(response, f'category__id__exact={self.category.pk}')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('etag', password='pw'))
+        self.work, self.home = Category.objects.create(name='Work'), Category.objects.create(name='Home')
+        self.priority = Priority.objects.create(name='High')
+        self.task = make_task(self.work, self.priority, title='Report')
+        self.other = make_task(self.home, self.priority, title='Groceries')
+
+    def test_views_without_state_render_without_validators(self):
+        class PlainView(View):
+            def get(self, request):
+                return HttpResponse('plain')
+
+        class ConditionalPlainView(ConditionalGetMixin, PlainView):
+            pass
+
+        response = ConditionalPlainView.as_view()(RequestFactory().get('/plain/'))
+        self.assertEqual(response.content, b'plain')
+        self.assertNotIn('ETag', response)
+
+    def test_unchanged_pages_are_not_rendered(self):
+        pages = [
+            # session and user; the dashboard probe is the cached counters
+            (reverse('home'), 2),
+            # session, user, COUNT and MAX(updated_at)
+            (reverse('task-list'), 4),
+            # session, user and the task with its related counts and timestamps
+            (reverse('task-detail', args=[self.task.pk]), 3),
+        ]
+        for url, queries in pages:
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, headers={'if-none-match': response['ETag']})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_login_invalidates_pages_with_csrf_forms(self):
+        self.client.logout()
+        User.objects.create_user('relogin', password='pw')
+
+        def login():
+            self.client.post(reverse('account_login'), {'login': 'relogin', 'password': 'pw'})
+            # Show the sign-in message: a page with messages skips validation
+            self.client.get(reverse('home'))
+
+        login()
+        response = self.client.get(reverse('task-list'))
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.client.get(reverse('account_logout'))
+        login()
+
+        # A 304 would keep the page with the token of the old CSRF secret
+        response = self.client.get(reverse('task-list'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_is_scoped_to_filters(self):
+        filters = {'category': self.work.pk}
+        etag = self.client.get(reverse('task-list'), filters)['ETag']
+        self.other.title = 'Shopping'
+        self.other.save()
+        response = self.client.get(reverse('task-list'), filters, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # A deletion leaves MAX(updated_at) alone but changes the count
+        etag = self.client.get(reverse('task-list'))['ETag']
+        Task.objects.filter(pk=self.other.pk).delete()
+        response = self.client.get(reverse('task-list'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_etag_follows_subtasks_and_notes(self):
+        url = reverse('task-detail', args=[self.task.pk])
+        etag = self.client.get(url)['ETag']
+        subtask = SubTask.objects.create(title='Draft', parent_task=self.task)
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        subtask.delete()
+        self.assertEqual(self.client.get(url, headers={'if-none-match': etag}).status_code, 200)
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.other.pk + 1])).status_code, 404)
+
+    def test_pages_with_messages_are_rendered(self):
+        url = reverse('task-list')
+        etag = self.client.get(url)['ETag']
+        self.client.post(reverse('category-add'), {'name': 'Errands'})
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Category created successfully!')
+        self.assertNotIn('ETag', response)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['fragments'].clear()
+        self.client.force_login(User.objects.create_user('fragments', password='pw'))
+        self.category, self.priority = Category.objects.create(name='Work'), Priority.objects.create(name='High')
+        self.task = make_task(self.category, self.priority, title='Original title')
+
+    def test_versions_follow_saves_and_bulk_changes(self):
+        before = versions.get_version(Task)
+        self.task.save()
+        self.assertNotEqual(versions.get_version(Task), before)
+
+        before = versions.get_versions(Task, SubTask)
+        bulk_update(Task.objects.all(), status='Completed')
+        self.assertNotEqual(versions.get_version(Task), before[0])
+        self.assertEqual(versions.get_version(SubTask), before[1])
+
+    def test_task_rows_reused_until_a_task_changes(self):
+        self.assertContains(self.client.get(reverse('task-list')), 'Original title')
+        # Behind the signals' back: the cached rows are served
+        Task.objects.filter(pk=self.task.pk).update(title='Silent title')
+        self.assertContains(self.client.get(reverse('task-list')), 'Original title')
+
+        self.task.title = 'Saved title'
+        self.task.save()
+        self.assertContains(self.client.get(reverse('task-list')), 'Saved title')
+
+    def test_filter_options_follow_categories(self):
+        self.client.get(reverse('task-list'))
+        Category.objects.create(name='Errands')
+        self.assertContains(self.client.get(reverse('task-list')), '>Errands</option>')
+
+    def test_page_window(self):
+        pages = Paginator(range(95), 10)
+        self.assertEqual(list(page_window(pages.page(1))), [1, 2, 3])
+        self.assertEqual(list(page_window(pages.page(5))), [3, 4, 5, 6, 7])
+        self.assertEqual(list(page_window(pages.page(10))), [8, 9, 10])
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+        self.user = User.objects.create_user('async', password='pw')
+        self.client.force_login(self.user)
+        self.category, self.priority = Category.objects.create(name='Work'), Priority.objects.create(name='High')
+        self.task = make_task(self.category, self.priority, title='Quarterly report')
+        SubTask.objects.create(title='Collect figures', parent_task=self.task)
+        Note.objects.create(task=self.task, content='Ask finance')
+        for n in range(12):
+            make_task(self.category, self.priority, title=f'Filler {n}')
+
+    async def test_asgi_requests_use_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        pages = [
+            (reverse('home'), 'Total Tasks'),
+            (reverse('task-list') + '?page=2', 'Quarterly report'),
+            (reverse('task-detail', args=[self.task.pk]), 'Ask finance'),
+        ]
+        for url, text in pages:
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, text)
+                self.assertTrue(iscoroutinefunction(response.asgi_request.resolver_match.func))
+                # WSGI requests keep the sync views
+                response = await sync_to_async(self.client.get)(url)
+                self.assertFalse(iscoroutinefunction(response.wsgi_request.resolver_match.func))
+
+    async def test_cursor_pages(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('task-list'), {'paginate': 'cursor'})
+        self.assertEqual(len(response.context['tasks']), 10)
+        response = await self.async_client.get(
+            reverse('task-list'), {'cursor': response.context['page_obj'].next_cursor},
+        )
+        self.assertEqual([task.title for task in response.context['tasks']][-1], 'Quarterly report')
+
+    async def test_etags_match_the_sync_views(self):
+        # Same session and CSRF cookie: both go into the ETag
+        await sync_to_async(self.client.get)(reverse('home'))
+        self.async_client.cookies = self.client.cookies
+        for url in [reverse('home'), reverse('task-list'), reverse('task-detail', args=[self.task.pk])]:
+            with self.subTest(url):
+                etag = (await sync_to_async(self.client.get)(url))['ETag']
+                response = await self.async_client.get(url, headers={'if-none-match': etag})
+                self.assertEqual(response.status_code, 304)
+
+    async def test_search_with_a_pending_message(self):
+        await self.async_client.aforce_login(self.user)
+        filler = await Task.objects.aget(title='Filler 0')
+        # Leaves a flash message: the page skips the conditional probes
+        await self.async_client.post(reverse('task-delete', args=[filler.pk]))
+        with mock.patch.dict('hangarin.search._available', clear=True):
+            response = await self.async_client.get(reverse('task-list'), {'q': 'report'})
+        self.assertEqual([task.title for task in response.context['tasks']], ['Quarterly report'])
+        self.assertContains(response, 'deleted successfully')
+
+    async def test_archived_tasks(self):
+        await self.async_client.aforce_login(self.user)
+        await sync_to_async(archive_tasks)(Task.objects.filter(pk=self.task.pk))
+        response = await self.async_client.get(reverse('task-list'), {'archived': 'include', 'q': 'quarterly'})
+        self.assertEqual([task.archived for task in response.context['tasks']], [True])
+        response = await self.async_client.get(reverse('task-detail', args=[self.task.pk]))
+        self.assertRedirects(response, reverse('archived-task-detail', args=[self.task.pk]), fetch_redirect_response=False)
+
+    async def test_login_and_missing_task(self):
+        response = await self.async_client.get(reverse('task-list'))
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('task-detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_queries_are_counted_and_within_budget(self):
+        await self.async_client.aforce_login(self.user)
+        await sync_to_async(stats.get_counters)()
+        await sync_to_async(refdata.categories)()
+        await sync_to_async(refdata.priorities)()
+        for name, args in [('home', []), ('task-list', []), ('task-detail', [self.task.pk])]:
+            with self.subTest(name):
+                response = await self.async_client.get(reverse(name, args=args))
+                metrics = response.asgi_request.metrics
+                self.assertGreater(metrics.queries, 0)
+                self.assertLessEqual(metrics.queries, settings.HANGARIN_QUERY_BUDGETS[name])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite connection tuning')
+class SQLiteTuningTests(TestCase):
+    def test_connections_are_tuned(self):
+        pragmas = settings.SQLITE_PRAGMAS
+        with connection.cursor() as cursor:
+            for name in ('busy_timeout', 'cache_size'):
+                with self.subTest(name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], int(pragmas[name]))
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], {'default': 0, 'file': 1, 'memory': 2}[pragmas['temp_store']])
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+
+PRIMARY, REPLICA = 'test_primary', 'test_replica'
+
+
+@override_settings(HANGARIN_PRIMARY_DATABASE=PRIMARY, HANGARIN_REPLICA_DATABASE=REPLICA)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Two SQLite files stand in for a primary and its replica"""
+    # Both are registered in setUpClass(), after the runner checks aliases
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = Path(tempfile.mkdtemp(prefix='hangarin-replica-'))
+        cls.addClassCleanup(shutil.rmtree, cls.directory, ignore_errors=True)
+        for alias in (PRIMARY, REPLICA):
+            add_sqlite_database(alias, cls.directory / f'{alias}.sqlite3')
+            cls.addClassCleanup(remove_database, alias)
+        super().setUpClass()
+        # Migrated once; every test starts from a copy
+        call_command('migrate', database=PRIMARY, verbosity=0)
+        cls.copy_database(PRIMARY, cls.directory / 'migrated.sqlite3')
+
+    @classmethod
+    def copy_database(cls, alias, target):
+        connections[alias].close()
+        with closing(sqlite3.connect(connections[alias].settings_dict['NAME'])) as source:
+            with closing(sqlite3.connect(target)) as destination:
+                source.backup(destination)
+
+    @classmethod
+    def restore_database(cls, source, alias):
+        connections[alias].close()
+        with closing(sqlite3.connect(source)) as source:
+            with closing(sqlite3.connect(connections[alias].settings_dict['NAME'])) as destination:
+                source.backup(destination)
+
+    def replicate(self):
+        self.copy_database(PRIMARY, connections[REPLICA].settings_dict['NAME'])
+
+    def setUp(self):
+        self.restore_database(self.directory / 'migrated.sqlite3', PRIMARY)
+        cache.clear()
+        caches['fragments'].clear()
+        self.user = User.objects.create_user('replica', password='pw')
+        self.category, self.priority = Category.objects.create(name='Work'), Priority.objects.create(name='High')
+        make_task(self.category, self.priority, title='Replicated task')
+        self.replicate()
+        self.fresh = make_task(self.category, self.priority, title='Fresh task')
+        self.client.force_login(self.user)
+
+    def test_read_only_views_read_from_the_replica(self):
+        self.assertEqual(self.user._state.db, PRIMARY)
+        response = self.client.get(reverse('task-list'))
+        self.assertContains(response, 'Replicated task')
+        self.assertNotContains(response, 'Fresh task')
+        self.assertEqual(self.client.get(reverse('task-detail', args=[self.fresh.pk])).status_code, 404)
+        # Not a replica view: the edit form reads the primary
+        self.assertContains(self.client.get(reverse('task-update', args=[self.fresh.pk])), 'Fresh task')
+
+    def test_writes_pin_the_session_to_the_primary(self):
+        response = self.client.post(reverse('task-add'), {
+            'title': 'Just saved', 'description': 'x', 'status': 'Pending',
+            'deadline': '2030-01-01T10:00', 'category': self.category.pk, 'priority': self.priority.pk,
+        })
+        self.assertRedirects(response, reverse('task-list'), fetch_redirect_response=False)
+        self.assertContains(self.client.get(reverse('task-list')), 'Just saved')
+        detail = reverse('task-detail', args=[Task.objects.get(title='Just saved').pk])
+        self.assertEqual(self.client.get(detail).status_code, 200)
+
+        session = self.client.session
+        session[PIN_SESSION_KEY] = time.time() - 1
+        session.save()
+        # Back on the replica, which has not caught up
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_replica_reads_do_not_fill_versioned_caches(self):
+        Category.objects.create(name='Errands')
+        response = self.client.get(reverse('task-list'))
+        # Reference data comes from the primary
+        self.assertContains(response, '>Errands</option>')
+        self.assertNotContains(response, 'Fresh task')
+        # The rows read from the replica were not cached under the new task
+        # version, so they show up once the replica catches up
+        self.replicate()
+        self.assertContains(self.client.get(reverse('task-list')), 'Fresh task')
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_warns_about_a_per_process_default_cache(self):
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['hangarin.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}}
+        with mock.patch.object(settings, 'CACHES', shared):
+            self.assertEqual(check_shared_cache(None), [])
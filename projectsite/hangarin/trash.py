@@ -0,0 +1,166 @@
+"""
+Hangarin Task Management System - Soft delete and purge
+
+Deleting a task, subtask or note from its page only marks it: soft_delete()
+sets ``deleted_at`` and the default managers (see models.LiveManager) stop
+returning the row. A task takes its subtasks and notes along with one
+set-based ``UPDATE ... WHERE parent_task_id = ...`` per table, stamped with
+the same time, so nothing is loaded, no FTS trigger fires and the write lock
+is held for a few statements however big the task is. The counters follow
+from the usual save signals: a marked row leaves the dashboard counters and
+its task's progress, a restored one comes back.
+
+restore() is the undo: it clears the mark of the row and of whatever was
+marked along with it. Rows marked on their own earlier stay deleted.
+soft_delete_rows() and restore_rows() do the same for a whole queryset
+(bulk deletes, see hangarin.bulk), one UPDATE per table however many rows
+it holds; they leave the counters to their caller.
+
+Marked rows are removed for good by purge(), from ``manage.py
+purge_deleted``, once ``HANGARIN_TRASH_RETENTION_DAYS`` have passed: tasks
+through hangarin.deletion's batches, subtasks and notes deleted on their own
+in batches of the same size. Until then they sit outside the partial
+indexes of the list queries.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from hangarin import versions
+from hangarin.deletion import DEPENDENT_FIELDS, delete_rows, delete_tasks
+from hangarin.models import Task, SubTask, Note
+
+
+def _retention_days(days):
+    return days if days is not None else getattr(settings, 'HANGARIN_TRASH_RETENTION_DAYS', 30)
+
+
+def _dependents(task):
+    """Querysets of the subtasks and notes of ``task``, deleted ones included"""
+    return [
+        model.all_objects.using(task._state.db).filter(**{task_field: task})
+        for model, task_field in DEPENDENT_FIELDS.items()
+    ]
+
+
+def soft_delete(obj):
+    """Mark a task (with its subtasks and notes), a subtask or a note deleted"""
+    now = timezone.now()
+    with transaction.atomic(using=obj._state.db):
+        if isinstance(obj, Task):
+            for rows in _dependents(obj):
+                # Stamped with the task's time: restore() brings back these only
+                if rows.filter(deleted_at__isnull=True).update(deleted_at=now):
+                    versions.changed(rows.model, using=rows.db)
+        obj.deleted_at = now
+        obj.save(update_fields=['deleted_at', 'updated_at'])
+
+
+def restorable(obj):
+    """Whether ``obj`` can be restored: a subtask or note needs its task to be alive"""
+    if obj.deleted_at is None:
+        return False
+    if isinstance(obj, SubTask):
+        return obj.parent_task.deleted_at is None
+    if isinstance(obj, Note):
+        return obj.task.deleted_at is None
+    return True
+
+
+def restore(obj):
+    """Undo soft_delete(); raises ValueError if the row cannot come back alone"""
+    if not restorable(obj):
+        raise ValueError(f'{obj._meta.verbose_name} cannot be restored')
+    with transaction.atomic(using=obj._state.db):
+        if isinstance(obj, Task):
+            for rows in _dependents(obj):
+                if rows.filter(deleted_at=obj.deleted_at).update(deleted_at=None):
+                    versions.changed(rows.model, using=rows.db)
+        obj.deleted_at = None
+        obj.save(update_fields=['deleted_at', 'updated_at'])
+
+
+def soft_delete_rows(queryset):
+    """
+    Mark the live rows of ``queryset`` deleted, tasks with their subtasks
+    and notes, all with the same time; return the counts per model label
+    """
+    now = timezone.now()
+    using = queryset.db
+    rows = queryset.filter(deleted_at__isnull=True)
+    counts = Counter()
+    with transaction.atomic(using=using):
+        if queryset.model is Task:
+            for model, task_field in DEPENDENT_FIELDS.items():
+                counts[model._meta.label] = model.all_objects.using(using).filter(
+                    **{f'{task_field}__in': rows.values('pk')}, deleted_at__isnull=True,
+                ).update(deleted_at=now)
+        counts[queryset.model._meta.label] = rows.update(deleted_at=now, updated_at=now)
+        _changed(counts, using)
+    return +counts
+
+
+def restore_rows(queryset):
+    """
+    Undo soft_delete_rows() for the rows of ``queryset`` (an ``all_objects``
+    one) that can come back; return the counts per model label
+    """
+    using = queryset.db
+    rows = queryset.filter(deleted_at__isnull=False)
+    if queryset.model in DEPENDENT_FIELDS:
+        # As restorable(): a subtask or note needs its task to be alive
+        rows = rows.filter(**{f'{DEPENDENT_FIELDS[queryset.model]}__deleted_at__isnull': True})
+    counts = Counter()
+    with transaction.atomic(using=using):
+        if queryset.model is Task:
+            for model, task_field in DEPENDENT_FIELDS.items():
+                # Only what was marked along with its task
+                marked_with_task = Subquery(Task.all_objects.filter(pk=OuterRef(task_field)).values('deleted_at'))
+                counts[model._meta.label] = model.all_objects.using(using).filter(
+                    **{f'{task_field}__in': rows.values('pk')}, deleted_at=marked_with_task,
+                ).update(deleted_at=None)
+        counts[queryset.model._meta.label] = rows.update(deleted_at=None, updated_at=timezone.now())
+        _changed(counts, using)
+    return +counts
+
+
+def _changed(counts, using):
+    models = [model for model in (Task, SubTask, Note) if counts[model._meta.label]]
+    if models:
+        versions.changed(*models, using=using)
+
+
+def expired(model, days=None, now=None):
+    """Rows of ``model`` marked deleted more than ``days`` days ago (task_deleted_idx etc.)"""
+    cutoff = (now or timezone.now()) - timedelta(days=_retention_days(days))
+    return model.all_objects.filter(deleted_at__lt=cutoff)
+
+
+def purge(days=None, batch_size=None, progress=None):
+    """
+    Remove the rows marked deleted more than ``days`` days ago for good and
+    return a DeleteResult. ``progress`` is called with it after every batch.
+    """
+    batch_size = batch_size or getattr(settings, 'HANGARIN_DELETE_BATCH_SIZE', 1000)
+    now = timezone.now()
+    start = time.perf_counter()
+    # Tasks first, with everything marked along with them
+    result = delete_tasks(expired(Task, days, now), batch_size, progress)
+    for model in (SubTask, Note):
+        ids = expired(model, days, now).order_by().values_list('pk', flat=True)
+        while True:
+            batch = list(ids[:batch_size])
+            if not batch:
+                break
+            # Already out of the counters: removed without signals
+            result.deleted[model._meta.label] += delete_rows(model, batch, ids.db)
+            result.seconds = time.perf_counter() - start
+            if progress:
+                progress(result)
+    result.seconds = time.perf_counter() - start
+    return result
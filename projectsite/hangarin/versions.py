@@ -0,0 +1,80 @@
+"""
+Hangarin Task Management System - Model versions
+
+A version token per model, kept in Django's cache and replaced whenever a
+row of that model changes. Data derived from a table (the reference data
+kept in process memory, cached template fragments) carries the tokens it
+was built from in its key, so a change makes it unreachable instead of
+having to be found and deleted.
+
+Signals replace the token on every save and delete (see hangarin.signals).
+Bulk operations bypass signals and call changed() themselves.
+
+The tokens are only as shared as the 'default' cache: with a per-process
+backend (locmem) a change reaches the process that made it and no other.
+Deployments with several workers need a shared one (see the CACHES setting
+and the hangarin.W001 check).
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from hangarin.models import Task, SubTask, Note, Category, Priority, ArchivedTask
+
+
+VERSIONED_MODELS = (Task, SubTask, Note, Category, Priority, ArchivedTask)
+VERSION_CACHE_KEY = 'hangarin:version:{label}'
+
+
+def _key(model):
+    return VERSION_CACHE_KEY.format(label=model._meta.label_lower)
+
+
+def get_version(model):
+    """Current version token of ``model``"""
+    key = _key(model)
+    version = cache.get(key)
+    if version is None:
+        # First use or evicted: start a new generation (another process may
+        # have won the race, so read back whatever was stored)
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*models):
+    return tuple(get_version(model) for model in models)
+
+
+def bump(*models):
+    """Give ``models`` new version tokens"""
+    cache.set_many({_key(model): uuid.uuid4().hex for model in models}, None)
+
+
+def changed(*models, using=None):
+    """
+    Record a change to ``models``: bump now, so this process sees its own
+    write, and again on commit, so nothing built from the data as it was
+    before the commit survives.
+    """
+    bump(*models)
+    transaction.on_commit(lambda: bump(*models), using=using)
+
+
+class ModelVersions:
+    """
+    Template access to the version tokens by model name, e.g.
+    ``{{ model_versions.task }}``. Tokens are fetched on first use.
+    """
+
+    def __init__(self):
+        self._models = {model._meta.model_name: model for model in VERSIONED_MODELS}
+        self._versions = {}
+
+    def __getitem__(self, name):
+        if name not in self._models:
+            raise KeyError(name)
+        if name not in self._versions:
+            self._versions[name] = get_version(self._models[name])
+        return self._versions[name]
@@ -3,118 +3,275 @@ Hangarin Task Management System - Views
 Current Date and Time (UTC - YYYY-MM-DD HH:MM:SS formatted): 2025-10-14 04:03:58
 Current User's Login: hizoo5
 """
-from django.shortcuts import render, get_object_or_404, redirect
+import io
+
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+from django.views.generic import View, FormView, ListView, CreateView, UpdateView, DeleteView, DetailView
+from django.core.exceptions import BadRequest
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+from django.middleware.csrf import get_token
 from django.urls import reverse_lazy, reverse
-from django.db.models import Q
-from hangarin.models import Task, Category, Priority, SubTask, Note
-from hangarin.forms import TaskForm, SubTaskForm, SubTaskWithParentForm, CategoryForm, PriorityForm, NoteForm, NoteWithTaskForm
+from django.db.models import Max, OuterRef, Q, Subquery
+from django.db.models.functions import Length, Substr
+from hangarin.models import Task, Category, Priority, SubTask, Note, ArchivedTask
+from hangarin.export import FORMATS, INCLUDES, stream_export
+from hangarin import refdata
+from hangarin.archive import ARCHIVE_CHOICES, archived_rows, load_references, with_archived
+from hangarin.conditional import ConditionalGetMixin, conditional_response, freshness
+from hangarin.importer import detect_format, import_tasks
+from hangarin.bulk import bulk_update, bulk_delete, bulk_restore
+from hangarin.deletion import delete_object, dependent_tasks, schedule
+from hangarin.trash import restore, soft_delete
+from hangarin.forms import TaskBulkActionForm, SubTaskBulkActionForm, TaskImportForm, TaskForm, SubTaskForm, SubTaskWithParentForm, CategoryForm, PriorityForm, NoteForm, NoteWithTaskForm
+from hangarin.pagination import CursorPaginationMixin, CursorPaginator, InvalidCursor
+from hangarin.query import TASK_QUERY, NOTE_QUERY, filter_tasks, filter_subtasks
+from hangarin.search import autocomplete_tasks, search_notes
+from hangarin.sorting import SortMixin
+from hangarin.stats import get_dashboard_stats
 
 
 @login_required
 def home(request):
     """Dashboard home view"""
-    all_tasks = Task.objects.all()
-    
-    # Get all categories and priorities for stats
-    categories = Category.objects.all()
-    priorities = Priority.objects.all()
-    
-    # Build category stats
-    category_stats = []
-    for category in categories:
-        category_tasks = all_tasks.filter(category=category)
-        category_stats.append({
-            'name': category.name,
-            'total': category_tasks.count(),
-            'pending': category_tasks.filter(status='Pending').count(),
-            'in_progress': category_tasks.filter(status='In Progress').count(),
-            'completed': category_tasks.filter(status='Completed').count(),
-        })
-    
-    # Build priority stats
-    priority_stats = []
-    for priority in priorities:
-        priority_tasks = all_tasks.filter(priority=priority)
-        priority_stats.append({
-            'name': priority.name,
-            'total': priority_tasks.count(),
-            'pending': priority_tasks.filter(status='Pending').count(),
-            'in_progress': priority_tasks.filter(status='In Progress').count(),
-            'completed': priority_tasks.filter(status='Completed').count(),
-        })
-    
-    context = {
-        'total_tasks': all_tasks.count(),
-        'pending_tasks': all_tasks.filter(status='Pending').count(),
-        'in_progress_tasks': all_tasks.filter(status='In Progress').count(),
-        'completed_tasks': all_tasks.filter(status='Completed').count(),
-        'recent_tasks': all_tasks.select_related('category', 'priority').order_by('-created_at')[:5],
+    categories = refdata.categories()
+    priorities = refdata.priorities()
+
+    context = get_dashboard_stats(categories, priorities)
+    # The dashboard shows nothing but the cached counters
+    stats = dict(context)
+    context.update({
         'categories': categories,
         'priorities': priorities,
-        'category_stats': category_stats,
-        'priority_stats': priority_stats,
-    }
-    return render(request, 'home.html', context)
+    })
+    return conditional_response(
+        request,
+        lambda: ((stats,), None),
+        lambda: TemplateResponse(request, 'home.html', context),
+    )
 
 
-class TaskListView(LoginRequiredMixin, ListView):
+class TaskListView(LoginRequiredMixin, ConditionalGetMixin, SortMixin, CursorPaginationMixin, ListView):
     """Display list of all tasks"""
     model = Task
     template_name = 'task_list.html'
     context_object_name = 'tasks'
     paginate_by = 10
-    ordering = ['-created_at']
+    sort_options = {
+        'rank': ('Best Match', None),
+        '-created_at': ('Newest First', ['-created_at', '-id']),
+        'created_at': ('Oldest First', ['created_at', 'id']),
+        'title': ('Title (A-Z)', ['title', 'id']),
+        '-title': ('Title (Z-A)', ['-title', '-id']),
+        'deadline': ('Deadline (Earliest)', ['deadline', 'id']),
+        '-deadline': ('Deadline (Latest)', ['-deadline', '-id']),
+    }
+    
+    def get_parsed_query(self):
+        if not hasattr(self, '_parsed_query'):
+            query = self.request.GET.get('q')
+            self._parsed_query = TASK_QUERY.parse(query) if query else None
+        return self._parsed_query
+    
+    def has_search_text(self):
+        parsed = self.get_parsed_query()
+        return bool(parsed and parsed.text)
+    
+    def get_default_sort(self):
+        return 'rank' if self.has_search_text() else '-created_at'
+    
+    def get_archive_mode(self):
+        """``?archived=`` as 'include' or 'only' (see hangarin.archive); None lists live tasks alone"""
+        mode = self.request.GET.get('archived')
+        return mode if mode in ARCHIVE_CHOICES else None
+    
+    def can_rank(self):
+        # Relevance needs free text to rank by, and the full-text index the archive lacks
+        return self.has_search_text() and not self.get_archive_mode()
+    
+    def get_sort_key(self):
+        key = super().get_sort_key()
+        # Without relevance show newest first
+        if key == 'rank' and not self.can_rank():
+            return '-created_at'
+        return key
+    
+    def get_pagination_mode(self):
+        # A UNION cannot be filtered past a cursor
+        if self.get_archive_mode() == 'include':
+            return 'offset'
+        return super().get_pagination_mode()
     
     def get_queryset(self):
+        mode = self.get_archive_mode()
+        if mode:
+            archived = filter_tasks(ArchivedTask.objects.all(), self.request.GET)
+            tasks = filter_tasks(Task.objects.all(), self.request.GET)
+            return with_archived(tasks, archived, only=mode == 'only').order_by(*self.get_ordering())
         qs = super().get_queryset().select_related('category', 'priority')
-        
-        # Apply search filter
-        query = self.request.GET.get('q')
-        if query:
-            # Search in text fields and convert deadline to string for searching
-            qs = qs.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(category__name__icontains=query) |
-                Q(priority__name__icontains=query) |
-                Q(status__icontains=query) |
-                Q(deadline__icontains=query)  # Searches deadline as string (YYYY-MM-DD format)
-            )
-        
-        # Apply status filter
-        status_filter = self.request.GET.get('status')
-        if status_filter:
-            qs = qs.filter(status=status_filter)
-        
-        # Apply priority filter
-        priority_filter = self.request.GET.get('priority')
-        if priority_filter:
-            qs = qs.filter(priority__id=priority_filter)
-        
-        # Apply category filter
-        category_filter = self.request.GET.get('category')
-        if category_filter:
-            qs = qs.filter(category__id=category_filter)
-        
-        # Apply ordering
-        order_by = self.request.GET.get('order_by', '-created_at')
-        if order_by:
-            qs = qs.order_by(order_by)
-        
-        return qs
+        # Best matches first unless another ordering was requested
+        return filter_tasks(qs, self.request.GET, ranked=self.get_sort_key() == 'rank')
+    
+    def get_probe_querysets(self):
+        """The tables read by the list, with the filters applied, for freshness()"""
+        mode = self.get_archive_mode()
+        querysets = []
+        if mode != 'only':
+            querysets.append(filter_tasks(Task.objects.all(), self.request.GET))
+        if mode:
+            querysets.append(filter_tasks(ArchivedTask.objects.all(), self.request.GET))
+        return querysets
+    
+    def combine_probes(self, probes):
+        """Conditional state from the freshness() of each of get_probe_querysets()"""
+        # Same rows as the list: the paginator need not count them again
+        self.known_count = sum(count for count, _ in probes)
+        last_modified = max((modified for _, modified in probes if modified is not None), default=None)
+        # Per table: archiving a task moves it without changing either total
+        return tuple(probes), last_modified
+    
+    def get_conditional_state(self):
+        # The tasks matching the filters; pages and sort order are in the URL
+        return self.combine_probes([freshness(queryset) for queryset in self.get_probe_querysets()])
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_by'] = self.request.GET.get('order_by', '-created_at')
-        context['categories'] = Category.objects.all()
-        context['priorities'] = Priority.objects.all()
+        if not self.can_rank():
+            context['sort_choices'] = [choice for choice in context['sort_choices'] if choice[0] != 'rank']
+        if self.get_archive_mode():
+            load_references(context['object_list'])
+        context['archive_mode'] = self.get_archive_mode()
+        context['categories'] = refdata.categories()
+        context['priorities'] = refdata.priorities()
         context['status_choices'] = Task.STATUS_CHOICES
         return context
 
+class TaskExportView(LoginRequiredMixin, View):
+    """Stream the tasks selected by the task list filters as CSV or NDJSON"""
+    
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in FORMATS:
+            raise BadRequest(f'Unknown export format: {export_format}')
+        include = [name for name in request.GET.get('include', '').split(',') if name]
+        unknown = set(include) - set(INCLUDES)
+        if unknown:
+            raise BadRequest(f"Unknown include: {', '.join(sorted(unknown))}")
+        
+        tasks = filter_tasks(Task.objects.all(), request.GET)
+        content_type, extension = FORMATS[export_format]
+        response = StreamingHttpResponse(
+            stream_export(tasks, export_format, include),
+            content_type=f'{content_type}; charset=utf-8',
+        )
+        filename = f"tasks-{timezone.localdate():%Y-%m-%d}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, FormView):
+    """Bulk import tasks from an uploaded CSV or NDJSON file"""
+    form_class = TaskImportForm
+    template_name = 'task_import.html'
+    
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_tasks(
+            stream,
+            import_format=detect_format(upload.name),
+            create_missing=form.cleaned_data['create_missing'],
+        )
+        if result.tasks:
+            messages.success(self.request, f'{result.tasks} tasks imported successfully!')
+        return self.render_to_response(self.get_context_data(form=form, result=result))
+
+
+class BulkActionView(LoginRequiredMixin, View):
+    """
+    Apply a bulk action to the selected rows or to every row matching the
+    list filters (passed in the query string). Answers JSON counts when the
+    client accepts JSON, otherwise redirects back to the list.
+    """
+    model = None
+    form_class = None
+    list_url = None
+    # URL name of the BulkRestoreView undoing a delete
+    restore_url = None
+    
+    def filter_queryset(self, queryset):
+        return queryset
+    
+    def wants_json(self):
+        return 'application/json' in self.request.headers.get('Accept', '')
+    
+    def post(self, request, *args, **kwargs):
+        form = self.form_class(request.POST)
+        if not form.is_valid():
+            if self.wants_json():
+                return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+            for errors in form.errors.values():
+                messages.error(request, errors[0])
+            return redirect(self.get_list_url())
+        
+        if form.cleaned_data['scope'] == 'filter':
+            queryset = self.filter_queryset(self.model.objects.all())
+        else:
+            queryset = self.model.objects.filter(pk__in=form.cleaned_data['ids'])
+        
+        changes = form.changes()
+        if changes is None:
+            # Read first: the marked rows no longer match the queryset
+            ids = [] if self.wants_json() else list(queryset.values_list('pk', flat=True))
+            result = {'action': 'delete', 'deleted': bulk_delete(queryset)}
+            if not self.wants_json():
+                count = result['deleted'].get(self.model._meta.label, 0)
+                deleted_message(request, f'{count} {self.model._meta.verbose_name_plural}',
+                                reverse(self.restore_url), ids)
+        else:
+            result = {'action': form.cleaned_data['action'], 'updated': bulk_update(queryset, **changes)}
+            if not self.wants_json():
+                messages.success(request, f"{result['updated']} {self.model._meta.verbose_name_plural} updated successfully!")
+
+        if self.wants_json():
+            return JsonResponse(result)
+        return redirect(self.get_list_url())
+    
+    def get_list_url(self):
+        query = self.request.GET.urlencode()
+        return reverse(self.list_url) + (f'?{query}' if query else '')
+
+
+class TaskBulkActionView(BulkActionView):
+    """Bulk status/category/priority changes and deletion of tasks"""
+    model = Task
+    form_class = TaskBulkActionForm
+    list_url = 'task-list'
+    restore_url = 'task-bulk-restore'
+    
+    def filter_queryset(self, queryset):
+        return filter_tasks(queryset, self.request.GET)
+
+
+class TaskAutocompleteView(LoginRequiredMixin, View):
+    """JSON task suggestions for the parent task / task pickers"""
+    page_size = 10
+    
+    def get(self, request, *args, **kwargs):
+        tasks = autocomplete_tasks(Task.objects.all(), request.GET.get('q', ''))
+        rows = list(tasks.values_list('id', 'title')[:self.page_size + 1])
+        return JsonResponse({
+            'results': [{'id': pk, 'text': title} for pk, title in rows[:self.page_size]],
+            'more': len(rows) > self.page_size,
+        })
+
+
 class TaskCreateView(LoginRequiredMixin, CreateView):
     """Create a new task"""
     model = Task
@@ -127,18 +284,131 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class TaskDetailView(LoginRequiredMixin, DetailView):
+# Subtasks and notes shown per page on the task detail view
+DETAIL_PAGE_SIZE = 10
+# Characters of a note shown before "Show more"
+NOTE_PREVIEW_LENGTH = 200
+
+
+def _related_last_modified(model, field):
+    """Correlated MAX(updated_at) of ``model`` rows pointing at the outer task"""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Subquery(rows.annotate(last=Max('updated_at')).values('last'))
+
+
+def task_subtask_paginator(task_pk):
+    subtasks = SubTask.objects.filter(parent_task_id=task_pk).order_by('id')
+    return CursorPaginator(subtasks, DETAIL_PAGE_SIZE, count_total=False)
+
+
+def task_note_paginator(task_pk):
+    # Only a preview of each note leaves the database
+    notes = Note.objects.filter(task_id=task_pk).defer('content').annotate(
+        preview=Substr('content', 1, NOTE_PREVIEW_LENGTH),
+        content_length=Length('content'),
+    ).order_by('id')
+    return CursorPaginator(notes, DETAIL_PAGE_SIZE, count_total=False)
+
+
+class TaskDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
     """Display task details"""
     model = Task
     template_name = 'task_detail.html'
     context_object_name = 'task'
     
+    def get_queryset(self):
+        # The subtask and note counts are stored on the task (see hangarin.progress)
+        return super().get_queryset().select_related('category', 'priority').annotate(
+            subtask_modified=_related_last_modified(SubTask, 'parent_task'),
+            note_modified=_related_last_modified(Note, 'task'),
+        )
+    
+    def get_object(self, queryset=None):
+        # Loaded once for both the conditional check and the page
+        if not hasattr(self, '_object'):
+            self._object = super().get_object(queryset)
+        return self._object
+    
+    def get_conditional_state(self):
+        # The task and the counts and latest changes of its subtasks and notes
+        try:
+            task = self.get_object()
+        except Http404:
+            return None
+        timestamps = (task.updated_at, task.subtask_modified, task.note_modified)
+        parts = timestamps + (task.subtask_count, task.note_count)
+        return parts, max(timestamp for timestamp in timestamps if timestamp is not None)
+    
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except Http404:
+            # Archived since the link was made: the archive keeps the task's id
+            if not ArchivedTask.objects.filter(pk=self.kwargs['pk']).exists():
+                raise
+            return redirect('archived-task-detail', pk=self.kwargs['pk'])
+    
     def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        # Get related subtasks and notes
-        context['subtasks'] = self.object.subtasks.all()
-        context['notes'] = self.object.notes.all()
-        return context
+        # First page of subtasks and notes; the rest load on demand. The
+        # async view passes them in, fetched through the async ORM
+        if 'subtask_page' not in kwargs:
+            kwargs['subtask_page'] = task_subtask_paginator(self.object.pk).page()
+        if 'note_page' not in kwargs:
+            kwargs['note_page'] = task_note_paginator(self.object.pk).page()
+        return super().get_context_data(**kwargs)
+
+
+class ArchivedTaskDetailView(LoginRequiredMixin, ConditionalGetMixin, DetailView):
+    """Read-only page of an archived task with its subtasks and notes"""
+    model = ArchivedTask
+    template_name = 'archived_task_detail.html'
+    context_object_name = 'task'
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('category', 'priority')
+    
+    def get_object(self, queryset=None):
+        if not hasattr(self, '_object'):
+            self._object = super().get_object(queryset)
+        return self._object
+    
+    def get_conditional_state(self):
+        try:
+            task = self.get_object()
+        except Http404:
+            return None
+        # Archived rows are written once
+        return (task.pk, task.archived_at), task.archived_at
+    
+    def get_context_data(self, **kwargs):
+        kwargs['subtasks'] = archived_rows(self.object.subtasks)
+        kwargs['notes'] = archived_rows(self.object.notes)
+        return super().get_context_data(**kwargs)
+
+
+class TaskRelatedPageView(LoginRequiredMixin, View):
+    """Fragment with the next page of a task's subtasks or notes (``?cursor=``)"""
+    template_name = None
+    paginator = None
+    
+    def get(self, request, pk):
+        try:
+            page = self.paginator(pk).page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        if not page.object_list and not Task.objects.filter(pk=pk).exists():
+            raise Http404('No task found matching the query')
+        return TemplateResponse(request, self.template_name, {'task_pk': pk, 'page': page})
+
+
+class TaskSubTasksView(TaskRelatedPageView):
+    template_name = 'includes/task_subtask_items.html'
+    paginator = staticmethod(task_subtask_paginator)
+
+
+class TaskNotesView(TaskRelatedPageView):
+    template_name = 'includes/task_note_items.html'
+    paginator = staticmethod(task_note_paginator)
 
 
 class TaskUpdateView(LoginRequiredMixin, UpdateView):
@@ -157,57 +427,152 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
+class CascadeDeleteMixin:
+    """
+    DeleteView whose object takes tasks with it. The delete runs in batches
+    (see hangarin.deletion); one of more than HANGARIN_DELETE_INLINE_LIMIT
+    tasks is left to a background job.
+    """
+    
+    def get_task_count(self):
+        if not hasattr(self, '_task_count'):
+            self._task_count = dependent_tasks(self.object).count()
+        return self._task_count
+    
+    def runs_in_background(self):
+        return self.get_task_count() > getattr(settings, 'HANGARIN_DELETE_INLINE_LIMIT', 5000)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['task_count'] = self.get_task_count()
+        context['runs_in_background'] = self.runs_in_background()
+        return context
+    
+    def form_valid(self, form):
+        name = self.model._meta.verbose_name
+        if self.runs_in_background():
+            schedule(self.object)
+            messages.info(
+                self.request,
+                f'{name} "{self.object}" and its {self.get_task_count()} tasks are being deleted in the background.',
+            )
+        else:
+            delete_object(self.object)
+            messages.success(self.request, f'{name} deleted successfully!')
+        return HttpResponseRedirect(self.get_success_url())
+
+
+def deleted_message(request, name, restore_url, ids=()):
+    """
+    Success message of a soft delete, with an Undo button posting to
+    ``restore_url`` (and the ``ids`` of the deleted rows, for a bulk delete)
+    """
+    messages.success(request, format_html(
+        '{} deleted successfully! '
+        '<form method="post" action="{}" class="d-inline">'
+        '<input type="hidden" name="csrfmiddlewaretoken" value="{}">{}'
+        '<button type="submit" class="btn btn-link p-0 align-baseline">Undo</button>'
+        '</form>',
+        name, restore_url, get_token(request),
+        format_html_join('', '<input type="hidden" name="ids" value="{}">', ((pk,) for pk in ids)),
+    ))
+
+
 class TaskDeleteView(LoginRequiredMixin, DeleteView):
     """Delete a task"""
     model = Task
     template_name = 'task_del.html'
     success_url = reverse_lazy('task-list')
 
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, 'Task deleted successfully!')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        # Marked deleted with its subtasks and notes; purged later
+        soft_delete(self.object)
+        deleted_message(self.request, 'Task', reverse('task-restore', args=[self.object.pk]))
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class RestoreView(LoginRequiredMixin, View):
+    """
+    Undo the soft delete of a task, subtask or note (POST only), then go to
+    the ``success_url_name`` page of the row's ``success_url_field``
+    """
+    model = None
+    success_url_name = 'task-detail'
+    success_url_field = 'pk'
+
+    def post(self, request, pk):
+        obj = get_object_or_404(self.model.all_objects, pk=pk, deleted_at__isnull=False)
+        name = obj._meta.verbose_name.capitalize()
+        try:
+            restore(obj)
+        except ValueError:
+            messages.error(request, f'{name} cannot be restored: its task was deleted.')
+            return redirect('task-list')
+        messages.success(request, f'{name} restored.')
+        return redirect(self.success_url_name, getattr(obj, self.success_url_field))
+
+
+class BulkRestoreView(LoginRequiredMixin, View):
+    """Undo a bulk delete: restore the rows posted as ``ids`` (POST only)"""
+    model = None
+    success_url = None
+    # Bounded IN lists: SQLite limits the parameters of a statement
+    batch_size = 500
+
+    def post(self, request):
+        ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+        restored = 0
+        for start in range(0, len(ids), self.batch_size):
+            counts = bulk_restore(self.model.all_objects.filter(pk__in=ids[start:start + self.batch_size]))
+            restored += counts.get(self.model._meta.label, 0)
+        messages.success(request, f'{restored} {self.model._meta.verbose_name_plural} restored.')
+        return HttpResponseRedirect(self.success_url)
+
+
+class TaskRestoreView(RestoreView):
+    model = Task
+
 
+class TaskBulkRestoreView(BulkRestoreView):
+    model = Task
+    success_url = reverse_lazy('task-list')
 
 
 # SubTask Views
-class SubTaskListView(LoginRequiredMixin, ListView):
+class SubTaskListView(LoginRequiredMixin, SortMixin, CursorPaginationMixin, ListView):
     """Display list of all subtasks"""
     model = SubTask
     template_name = 'subtask_list.html'
     context_object_name = 'subtasks'
     paginate_by = 10
-    ordering = ['-created_at']
+    default_sort = '-created_at'
+    sort_options = {
+        '-created_at': ('Newest First', ['-created_at', '-id']),
+        'created_at': ('Oldest First', ['created_at', 'id']),
+        'title': ('Title (A-Z)', ['title', 'id']),
+        '-title': ('Title (Z-A)', ['-title', '-id']),
+    }
     
     def get_queryset(self):
         qs = super().get_queryset().select_related('parent_task')
-        
-        # Apply search filter
-        query = self.request.GET.get('q')
-        if query:
-            qs = qs.filter(
-                Q(title__icontains=query) |
-                Q(parent_task__title__icontains=query) |
-                Q(status__icontains=query)
-            )
-        
-        # Apply status filter
-        status_filter = self.request.GET.get('status')
-        if status_filter:
-            qs = qs.filter(status=status_filter)
-        
-        # Apply ordering
-        order_by = self.request.GET.get('order_by', '-created_at')
-        if order_by:
-            qs = qs.order_by(order_by)
-        
-        return qs
+        return filter_subtasks(qs, self.request.GET)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_by'] = self.request.GET.get('order_by', '-created_at')
         context['status_choices'] = SubTask.STATUS_CHOICES
         return context
 
+class SubTaskBulkActionView(BulkActionView):
+    """Bulk status changes and deletion of subtasks"""
+    model = SubTask
+    form_class = SubTaskBulkActionForm
+    list_url = 'subtask-list'
+    restore_url = 'subtask-bulk-restore'
+    
+    def filter_queryset(self, queryset):
+        return filter_subtasks(queryset, self.request.GET)
+
+
 class SubTaskCreateView(LoginRequiredMixin, CreateView):
     """Create a new subtask from task detail page"""
     model = SubTask
@@ -274,19 +639,36 @@ class SubTaskDeleteView(LoginRequiredMixin, DeleteView):
         context['parent_task'] = self.object.parent_task
         return context
     
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, 'SubTask deleted successfully!')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        soft_delete(self.object)
+        deleted_message(self.request, 'SubTask', reverse('subtask-restore', args=[self.object.pk]))
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class SubTaskRestoreView(RestoreView):
+    model = SubTask
+    success_url_field = 'parent_task_id'
+
+
+class SubTaskBulkRestoreView(BulkRestoreView):
+    model = SubTask
+    success_url = reverse_lazy('subtask-list')
 
 
 # Category Views
-class CategoryListView(LoginRequiredMixin, ListView):
+class CategoryListView(LoginRequiredMixin, SortMixin, ListView):
     """Display list of all categories"""
     model = Category
     template_name = 'category_list.html'
     context_object_name = 'categories_list'
     paginate_by = 10
-    ordering = ['name']
+    default_sort = 'name'
+    sort_options = {
+        'name': ('Name (A-Z)', ['name', 'id']),
+        '-name': ('Name (Z-A)', ['-name', '-id']),
+        '-created_at': ('Newest First', ['-created_at', '-id']),
+        'created_at': ('Oldest First', ['created_at', 'id']),
+    }
     
     def get_queryset(self):
         qs = super().get_queryset()
@@ -296,17 +678,7 @@ class CategoryListView(LoginRequiredMixin, ListView):
         if query:
             qs = qs.filter(Q(name__icontains=query))
         
-        # Apply ordering
-        order_by = self.request.GET.get('order_by', 'name')
-        if order_by:
-            qs = qs.order_by(order_by)
-        
         return qs
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['order_by'] = self.request.GET.get('order_by', 'name')
-        return context
 
 class CategoryCreateView(LoginRequiredMixin, CreateView):
     """Create a new category"""
@@ -337,25 +709,29 @@ class CategoryUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
-class CategoryDeleteView(LoginRequiredMixin, DeleteView):
+class CategoryDeleteView(LoginRequiredMixin, CascadeDeleteMixin, DeleteView):
     """Delete a category"""
     model = Category
     template_name = 'category_del.html'
     success_url = reverse_lazy('category-list')
-    
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, 'Priority deleted successfully!')
-        return super().delete(request, *args, **kwargs)
 
 
 # Note Views
-class NoteListView(LoginRequiredMixin, ListView):
+class NoteListView(LoginRequiredMixin, SortMixin, CursorPaginationMixin, ListView):
     """Display list of all notes"""
     model = Note
     template_name = 'note_list.html'
     context_object_name = 'notes'
     paginate_by = 10
-    ordering = ['-created_at']
+    default_sort = '-created_at'
+    sort_options = {
+        '-created_at': ('Newest First', ['-created_at', '-id']),
+        'created_at': ('Oldest First', ['created_at', 'id']),
+        # Sorting by the joined task title cannot use a note index; it is
+        # kept for the UI and grouped by task so ties stay cheap to break
+        'task__title': ('Task Name (A-Z)', ['task__title', 'task__id', 'id']),
+        '-task__title': ('Task Name (Z-A)', ['-task__title', '-task__id', '-id']),
+    }
     
     def get_queryset(self):
         qs = super().get_queryset().select_related('task')
@@ -363,24 +739,18 @@ class NoteListView(LoginRequiredMixin, ListView):
         # Apply search filter
         query = self.request.GET.get('q')
         if query:
-            qs = qs.filter(
-                Q(content__icontains=query) |
-                Q(task__title__icontains=query) |
-                Q(task__deadline__icontains=query) |  # Search by task's deadline
-                Q(created_at__icontains=query)  # Search by note's creation date
-            )
-        
-        # Apply ordering
-        order_by = self.request.GET.get('order_by', '-created_at')
-        if order_by:
-            qs = qs.order_by(order_by)
+            parsed = NOTE_QUERY.parse(query)
+            qs = qs.filter(parsed.filters)
+            if parsed.text:
+                qs = search_notes(qs, parsed.text)
         
         return qs
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['order_by'] = self.request.GET.get('order_by', '-created_at')
-        return context
+
+class NoteContentView(LoginRequiredMixin, DetailView):
+    """Fragment with the full content of a note"""
+    model = Note
+    template_name = 'includes/note_content.html'
+    context_object_name = 'note'
 
 
 class NoteCreateView(LoginRequiredMixin, CreateView):
@@ -447,19 +817,31 @@ class NoteDeleteView(LoginRequiredMixin, DeleteView):
         context['parent_task'] = self.object.task
         return context
     
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, 'Note deleted successfully!')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        soft_delete(self.object)
+        deleted_message(self.request, 'Note', reverse('note-restore', args=[self.object.pk]))
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class NoteRestoreView(RestoreView):
+    model = Note
+    success_url_field = 'task_id'
 
 
 # Priority Views
-class PriorityListView(LoginRequiredMixin, ListView):
+class PriorityListView(LoginRequiredMixin, SortMixin, ListView):
     """Display list of all priorities"""
     model = Priority
     template_name = 'priority_list.html'
     context_object_name = 'priorities_list'
     paginate_by = 10
-    ordering = ['name']
+    default_sort = 'name'
+    sort_options = {
+        'name': ('Name (A-Z)', ['name', 'id']),
+        '-name': ('Name (Z-A)', ['-name', '-id']),
+        '-created_at': ('Newest First', ['-created_at', '-id']),
+        'created_at': ('Oldest First', ['created_at', 'id']),
+    }
     
     def get_queryset(self):
         qs = super().get_queryset()
@@ -469,17 +851,7 @@ class PriorityListView(LoginRequiredMixin, ListView):
         if query:
             qs = qs.filter(Q(name__icontains=query))
         
-        # Apply ordering
-        order_by = self.request.GET.get('order_by', 'name')
-        if order_by:
-            qs = qs.order_by(order_by)
-        
         return qs
-    
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['order_by'] = self.request.GET.get('order_by', 'name')
-        return context
 
 class PriorityCreateView(LoginRequiredMixin, CreateView):
     """Create a new priority"""
@@ -509,12 +881,8 @@ class PriorityUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
-class PriorityDeleteView(LoginRequiredMixin, DeleteView):
+class PriorityDeleteView(LoginRequiredMixin, CascadeDeleteMixin, DeleteView):
     """Delete a priority"""
     model = Priority
     template_name = 'priority_del.html'
-    success_url = reverse_lazy('priority-list')
-    
-    def delete(self, request, *args, **kwargs):
-        messages.success(self.request, 'Priority deleted successfully!')
-        return super().delete(request, *args, **kwargs)
\ No newline at end of file
+    success_url = reverse_lazy('priority-list')
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Hangarin Task Management System - Form widgets
+"""
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    A ``<select>`` for a ModelChoiceField that renders only the selected
+    option instead of the whole queryset. static/js/autocomplete.js turns it
+    into a search box fed by the JSON endpoint at ``url_name``; the field
+    still validates the submitted id with a single lookup.
+    """
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if str(pk).isdigit()]
+        options = [self.create_option(name, '', '---------', not selected, 0)]
+        if selected:
+            for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected), start=1):
+                options.append(self.create_option(name, obj.pk, str(obj), True, index))
+        return [(None, options, 0)]
@@ -0,0 +1,26 @@
+"""
+URL configuration for requests served over ASGI.
+
+The routes of projectsite.urls, with the async views of hangarin.async_views
+in place of the sync dashboard, task list and task detail views. Selected by
+hangarin.async_views.AsyncURLConfMiddleware through HANGARIN_ASYNC_URLCONF.
+"""
+from django.urls import URLPattern
+
+from hangarin import async_views
+from projectsite.urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'home': async_views.home,
+    'task-list': async_views.TaskListView.as_view(),
+    'task-detail': async_views.TaskDetailView.as_view(),
+}
+
+
+def use_async_view(pattern):
+    if isinstance(pattern, URLPattern) and pattern.name in ASYNC_VIEWS:
+        return URLPattern(pattern.pattern, ASYNC_VIEWS[pattern.name], pattern.default_args, pattern.name)
+    return pattern
+
+
+urlpatterns = [use_async_view(pattern) for pattern in sync_urlpatterns]
@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 import socket
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -61,18 +63,28 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 MIDDLEWARE = [
+    'hangarin.instrumentation.QueryBudgetMiddleware',
+    'hangarin.async_views.AsyncURLConfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hangarin.routers.ReplicaRoutingMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'projectsite.urls'
-
+# Requests served over ASGI resolve against this URLconf instead, which swaps
+# in the async views of the dashboard, task list and task detail (None keeps
+# the sync views everywhere)
+HANGARIN_ASYNC_URLCONF = 'projectsite.asgi_urls'
+
+# With no 'loaders' option Django wraps the filesystem and app loaders in the
+# cached loader, so compiled templates are reused across requests (in DEBUG
+# the cache is reset whenever a template file changes)
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -83,6 +95,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'hangarin.context_processors.fragment_cache',
             ],
         },
     },
@@ -94,12 +107,204 @@ WSGI_APPLICATION = 'projectsite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# HANGARIN_DB_PROFILE picks the database: 'sqlite' (a file next to the
+# project, the default) or 'postgres'. Either profile gets a read replica
+# when its replica variable is set; see hangarin.routers for what reads it.
+HANGARIN_DB_PROFILE = os.environ.get('HANGARIN_DB_PROFILE', 'sqlite')
+
+if HANGARIN_DB_PROFILE == 'sqlite':
+    # SQLite tuning. Every value can be overridden from the environment; an
+    # empty HANGARIN_SQLITE_<PRAGMA> leaves SQLite's own default.
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('HANGARIN_SQLITE_JOURNAL_MODE', 'wal'), # readers and the writer stop blocking each other
+        'synchronous': os.environ.get('HANGARIN_SQLITE_SYNCHRONOUS', 'normal'), # fsync at WAL checkpoints only; durable enough with WAL
+        'busy_timeout': os.environ.get('HANGARIN_SQLITE_BUSY_TIMEOUT', '5000'), # ms to wait for a lock before "database is locked"
+        'mmap_size': os.environ.get('HANGARIN_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)), # bytes of the file read through mmap
+        'cache_size': os.environ.get('HANGARIN_SQLITE_CACHE_SIZE', str(-64 * 1024)), # page cache per connection (negative: KiB)
+        'temp_store': os.environ.get('HANGARIN_SQLITE_TEMP_STORE', 'memory'), # sorts and temp indexes stay off disk
+    }
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('HANGARIN_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            # Keep connections across requests (seconds; 0 closes them after every
+            # request). Use 0 under ASGI, where each request runs in a new thread
+            'CONN_MAX_AGE': int(os.environ.get('HANGARIN_DB_CONN_MAX_AGE', '600')),
+            # Check a reused connection at the start of a request, so a broken one
+            # is replaced instead of failing the request
+            'CONN_HEALTH_CHECKS': os.environ.get('HANGARIN_DB_CONN_HEALTH_CHECKS', '1') == '1',
+            'OPTIONS': {
+                # Run by Django on every new connection
+                'init_command': ';'.join(
+                    f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items() if value
+                ),
+                # Transactions take the write lock when they begin, where
+                # busy_timeout waits for it. A deferred transaction that reads and
+                # then writes fails at once with "database is locked" instead.
+                'transaction_mode': os.environ.get('HANGARIN_SQLITE_TRANSACTION_MODE', 'IMMEDIATE') or None,
+            },
+        }
     }
+    if os.environ.get('HANGARIN_SQLITE_REPLICA_PATH'):
+        # A copy of the file kept current by an external tool (e.g. Litestream)
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.environ['HANGARIN_SQLITE_REPLICA_PATH'],
+            'TEST': {'MIRROR': 'default'},
+        }
+
+elif HANGARIN_DB_PROFILE == 'postgres':
+    # Needs psycopg[pool]. Each process keeps a pool of connections, which
+    # replaces persistent connections (Django refuses both together)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('HANGARIN_PG_NAME', 'hangarin'),
+            'USER': os.environ.get('HANGARIN_PG_USER', 'hangarin'),
+            'PASSWORD': os.environ.get('HANGARIN_PG_PASSWORD', ''),
+            'HOST': os.environ.get('HANGARIN_PG_HOST', 'localhost'),
+            'PORT': os.environ.get('HANGARIN_PG_PORT', '5432'),
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': os.environ.get('HANGARIN_DB_CONN_HEALTH_CHECKS', '1') == '1',
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('HANGARIN_PG_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.environ.get('HANGARIN_PG_POOL_MAX_SIZE', '10')), # per process
+                    'timeout': int(os.environ.get('HANGARIN_PG_POOL_TIMEOUT', '10')), # seconds to wait for a free connection
+                },
+            },
+        }
+    }
+    if os.environ.get('HANGARIN_PG_REPLICA_HOST'):
+        # A streaming replica of the same database
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['HANGARIN_PG_REPLICA_HOST'],
+            'PORT': os.environ.get('HANGARIN_PG_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+else:
+    raise ImproperlyConfigured(f"Unknown HANGARIN_DB_PROFILE: {HANGARIN_DB_PROFILE!r} (use 'sqlite' or 'postgres')")
+
+DATABASE_ROUTERS = ['hangarin.routers.PrimaryReplicaRouter']
+HANGARIN_PRIMARY_DATABASE = 'default' # writes, sessions, and reads outside HANGARIN_REPLICA_VIEWS
+HANGARIN_REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+HANGARIN_REPLICA_VIEWS = [ # URL names whose GET requests read from the replica
+    'home',
+    'task-list',
+    'task-detail',
+    'archived-task-detail',
+    'task-subtasks',
+    'task-notes',
+    'subtask-list',
+    'category-list',
+    'priority-list',
+    'note-list',
+]
+HANGARIN_REPLICA_PIN_SECONDS = int(os.environ.get('HANGARIN_REPLICA_PIN_SECONDS', '10')) # reads stay on the primary this long after a write (replication lag)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# 'default' holds the model version tokens (hangarin.versions) and the
+# dashboard counters (hangarin.stats), which every worker process must see
+# alike: a change made through one worker reaches the others only through
+# this cache. Set HANGARIN_REDIS_URL (needs the redis package) to share it.
+# Without it the cache is per-process, which only suits a single process
+# (runserver, the tests); ``manage.py check --deploy`` warns about it.
+HANGARIN_REDIS_URL = os.environ.get('HANGARIN_REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': HANGARIN_REDIS_URL,
+        'KEY_PREFIX': 'hangarin',
+    } if HANGARIN_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hangarin',
+    },
+    # Rendered template fragments, kept apart so they cannot evict the
+    # dashboard counters or the model versions from 'default'
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hangarin-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+HANGARIN_STATS_CACHE_TIMEOUT = 3600 # seconds; Task signals keep the dashboard counters current, expiry bounds anything they missed
+HANGARIN_STATS_VERIFY_INTERVAL = 300 # seconds between drift checks (a grouped recount) of the cached counters
+
+HANGARIN_REFDATA_MAX_AGE = 300 # seconds a process keeps categories and priorities without seeing a new version (None: until the version changes)
+
+HANGARIN_FRAGMENT_CACHE_TIMEOUT = 3600 # seconds; keys carry the model versions, so this only bounds unused entries (0 disables)
+
+HANGARIN_PAGINATION_MODE = 'offset' # 'cursor' switches task/subtask/note lists to keyset pagination
+HANGARIN_PAGINATION_EXACT_COUNT = True # set False to skip COUNT(*) on cursor-paginated lists
+HANGARIN_ESTIMATED_COUNT_THRESHOLD = 100_000 # admin changelists of larger tables take their unfiltered total from table statistics (None: always COUNT(*))
+HANGARIN_DELETE_BATCH_SIZE = 1000 # rows per transaction when deleting categories, priorities and tasks (see hangarin.deletion)
+HANGARIN_DELETE_INLINE_LIMIT = 5000 # larger cascades run as a background job (manage.py run_deletion_jobs)
+HANGARIN_ARCHIVE_AFTER_DAYS = 90 # manage.py archive_tasks moves tasks completed and untouched this long out of the live tables
+HANGARIN_ARCHIVE_BATCH_SIZE = 500 # tasks moved per transaction (see hangarin.archive)
+HANGARIN_TRASH_RETENTION_DAYS = 30 # deleted tasks, subtasks and notes can be restored this long; then manage.py purge_deleted removes them
+
+# SQL queries allowed per request, by URL name (session and user lookups included),
+# once the dashboard counters and the reference data are cached
+HANGARIN_QUERY_BUDGETS = {
+    'home': 2,
+    'task-list': 7, # 5 for the live list; includes the conditional GET probe; ?archived=include adds a second probe and counts the UNION
+    'task-add': 2,
+    'task-detail': 5,
+    'archived-task-detail': 3,
+    'task-subtasks': 4, # an empty page also checks that the task exists
+    'task-notes': 4, # an empty page also checks that the task exists
+    'task-update': 5,
+    'task-delete': 3,
+    'task-restore': 2, # POST only
+    'task-export': 2, # the rows are queried while streaming, after the budget check
+    'task-import': 2,
+    'task-bulk': 2, # POST only
+    'task-bulk-restore': 2, # POST only
+    'task-autocomplete': 3,
+    'subtask-list': 4,
+    'subtask-add': 3,
+    'subtask-add-with-parent': 2,
+    'subtask-bulk': 2, # POST only
+    'subtask-bulk-restore': 2, # POST only
+    'subtask-update': 4,
+    'subtask-delete': 4,
+    'subtask-restore': 2, # POST only
+    'category-list': 4,
+    'category-add': 2,
+    'category-update': 3,
+    'category-delete': 4, # includes counting the tasks deleted with it
+    'priority-list': 4,
+    'priority-add': 2,
+    'priority-update': 3,
+    'priority-delete': 4, # includes counting the tasks deleted with it
+    'note-list': 4,
+    'note-add': 3,
+    'note-add-with-task': 2,
+    'note-content': 3,
+    'note-update': 4,
+    'note-delete': 4,
+    'note-restore': 2, # POST only
+}
+# Limits with cold caches, where rebuilding the counters or reloading the reference data
+# counts too; routes not listed here have the same limit cold and warm
+HANGARIN_COLD_QUERY_BUDGETS = {
+    'home': 6,
+    'task-list': 9,
+    'task-add': 4,
+    'task-update': 7,
 }
+HANGARIN_QUERY_BUDGET_MODE = 'log' # 'raise' turns an exceeded budget into an error
+HANGARIN_CONDITIONAL_GET = True # answer If-None-Match on the dashboard, task list and task detail with 304
+HANGARIN_ETAG_SALT = '' # change on deploy so browsers drop pages rendered by older templates
+HANGARIN_SERVER_TIMING = DEBUG # send Server-Timing headers with query count, DB and template time
 
 
 # Password validation
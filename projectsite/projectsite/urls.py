@@ -20,16 +20,28 @@ urlpatterns = [
     # Task URLs
     path('tasks/', views.TaskListView.as_view(), name='task-list'),
     path('tasks/add/', views.TaskCreateView.as_view(), name='task-add'),
+    path('tasks/export/', views.TaskExportView.as_view(), name='task-export'),
+    path('tasks/import/', views.TaskImportView.as_view(), name='task-import'),
+    path('tasks/bulk/', views.TaskBulkActionView.as_view(), name='task-bulk'),
+    path('tasks/bulk/restore/', views.TaskBulkRestoreView.as_view(), name='task-bulk-restore'),
+    path('tasks/autocomplete/', views.TaskAutocompleteView.as_view(), name='task-autocomplete'),
     path('tasks/<int:pk>/', views.TaskDetailView.as_view(), name='task-detail'),
+    path('tasks/archived/<int:pk>/', views.ArchivedTaskDetailView.as_view(), name='archived-task-detail'),
+    path('tasks/<int:pk>/subtasks/', views.TaskSubTasksView.as_view(), name='task-subtasks'),
+    path('tasks/<int:pk>/notes/', views.TaskNotesView.as_view(), name='task-notes'),
     path('tasks/<int:pk>/update/', views.TaskUpdateView.as_view(), name='task-update'),
     path('tasks/<int:pk>/delete/', views.TaskDeleteView.as_view(), name='task-delete'),
+    path('tasks/<int:pk>/restore/', views.TaskRestoreView.as_view(), name='task-restore'),
     
     # SubTask URLs
     path('subtasks/', views.SubTaskListView.as_view(), name='subtask-list'),
     path('subtasks/add/', views.SubTaskCreateWithParentView.as_view(), name='subtask-add-with-parent'),
+    path('subtasks/bulk/', views.SubTaskBulkActionView.as_view(), name='subtask-bulk'),
+    path('subtasks/bulk/restore/', views.SubTaskBulkRestoreView.as_view(), name='subtask-bulk-restore'),
     path('tasks/<int:task_pk>/subtasks/add/', views.SubTaskCreateView.as_view(), name='subtask-add'),
     path('subtasks/<int:pk>/update/', views.SubTaskUpdateView.as_view(), name='subtask-update'),
     path('subtasks/<int:pk>/delete/', views.SubTaskDeleteView.as_view(), name='subtask-delete'),
+    path('subtasks/<int:pk>/restore/', views.SubTaskRestoreView.as_view(), name='subtask-restore'),
     
     # Category URLs
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
@@ -47,8 +59,10 @@ urlpatterns = [
     path('notes/', views.NoteListView.as_view(), name='note-list'),
     path('notes/add/', views.NoteCreateWithTaskView.as_view(), name='note-add-with-task'),
     path('tasks/<int:task_pk>/notes/add/', views.NoteCreateView.as_view(), name='note-add'),
+    path('notes/<int:pk>/content/', views.NoteContentView.as_view(), name='note-content'),
     path('notes/<int:pk>/update/', views.NoteUpdateView.as_view(), name='note-update'),
     path('notes/<int:pk>/delete/', views.NoteDeleteView.as_view(), name='note-delete'),
+    path('notes/<int:pk>/restore/', views.NoteRestoreView.as_view(), name='note-restore'),
 ]
 
 # Serve static files in development
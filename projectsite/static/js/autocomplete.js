@@ -0,0 +1,85 @@
+/*
+ * Hangarin - autocomplete for <select data-autocomplete-url>
+ *
+ * The select only holds the chosen option. It is hidden behind a text box
+ * that queries the endpoint (debounced) and shows the matches in a
+ * dropdown; picking one makes it the select's only option.
+ */
+(function () {
+    var DELAY = 250;
+    var MIN_LENGTH = 2;
+
+    function setup(select) {
+        var wrapper = document.createElement('div');
+        var input = document.createElement('input');
+        var menu = document.createElement('div');
+        var timer = null;
+        var request = 0;
+
+        wrapper.className = 'position-relative flex-grow-1';
+        input.type = 'search';
+        input.className = select.className;
+        input.placeholder = 'Type to search tasks...';
+        input.autocomplete = 'off';
+        input.value = select.selectedIndex > 0 ? select.options[select.selectedIndex].text : '';
+        menu.className = 'dropdown-menu w-100';
+
+        select.style.display = 'none';
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.appendChild(input);
+        wrapper.appendChild(menu);
+        wrapper.appendChild(select);
+
+        function choose(id, text) {
+            select.innerHTML = '';
+            select.appendChild(new Option(text, id, true, true));
+            input.value = text;
+            menu.classList.remove('show');
+        }
+
+        function render(results) {
+            menu.innerHTML = '';
+            results.forEach(function (result) {
+                var item = document.createElement('a');
+                item.href = '#';
+                item.className = 'dropdown-item text-truncate';
+                item.textContent = result.text;
+                item.addEventListener('mousedown', function (event) {
+                    event.preventDefault();
+                    choose(result.id, result.text);
+                });
+                menu.appendChild(item);
+            });
+            menu.classList.toggle('show', results.length > 0);
+        }
+
+        function search() {
+            var query = input.value.trim();
+            var current = ++request;
+            if (query.length > 0 && query.length < MIN_LENGTH) {
+                return;
+            }
+            fetch(select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    // Ignore answers to queries the user has typed past
+                    if (current === request) {
+                        render(data.results);
+                    }
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(search, DELAY);
+        });
+        input.addEventListener('focus', search);
+        input.addEventListener('blur', function () {
+            menu.classList.remove('show');
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+    });
+})();